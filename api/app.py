@@ -3,9 +3,16 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from .db import lifespan
 from .routers.autofill_scores.autofill_scores import autofill_scores_router
+from .routers.courses.course_cache import course_cache
 from .routers.courses.courses import courses_router
-from .routers.rounds.rounds import rounds_router
+from .routers.courses.search_cache import search_cache
+from .routers.rounds.rounds import (
+    handicap_recompute_queue,
+    rounds_router,
+    user_rounds_router,
+)
 from .routers.users.users import users_router
+from .write_behind import write_behind_buffers
 
 app = FastAPI(lifespan=lifespan)
 app.add_middleware(
@@ -17,6 +24,7 @@ app.add_middleware(
 )
 
 app.include_router(users_router, prefix="/users", tags=["Users"])
+app.include_router(user_rounds_router, prefix="/users", tags=["Rounds"])
 app.include_router(
     courses_router,
     prefix="/courses",
@@ -29,3 +37,15 @@ app.include_router(autofill_scores_router)
 @app.post("/")
 def healthcheck():
     return {"status": "Good to go! Welcome to FORE!"}
+
+
+@app.get("/metrics")
+def metrics():
+    return {
+        "course_cache": course_cache.stats(),
+        "course_search_cache": search_cache.stats(),
+        "handicap_recompute_queue": handicap_recompute_queue.stats(),
+        "write_behind": {
+            buffer.collection_name: buffer.stats() for buffer in write_behind_buffers
+        },
+    }
@@ -0,0 +1,183 @@
+# Compare the original get_rounds (a find for the rounds, a find for their courses, then
+#   validating the models twice) against the $lookup aggregation sent as is.
+#   Needs a MongoDB server. Uses (then drops) a scratch database.
+#   Run from the repository root with: python -m api.benchmarks.get_rounds
+import asyncio
+import json
+import os
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from bson import ObjectId
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+from pydantic import TypeAdapter
+
+from ..routers.rounds.models import GetRound
+from ..routers.rounds.pipelines import get_rounds_pipeline
+from ..utils import encode_bson_value
+
+load_dotenv("../.env")
+
+DATABASE_NAME = "fore_benchmark_get_rounds"
+HISTORY_SIZES = [10, 100, 1000]
+NUM_COURSES = 20
+REPETITIONS = 20
+
+
+def make_course(rng: random.Random) -> dict:
+    num_tees = 4
+    return {
+        "_id": ObjectId(),
+        "address": "1 Fairway Dr",
+        "city": "Springfield",
+        "coordinates": "39.78, -89.65",
+        "country": "Usa",
+        "created_at": "2024-01-01T00:00:00.000Z",
+        "fairway_grass": "Bentgrass",
+        "green_grass": "Bentgrass",
+        "num_holes": 18,
+        "length_format": "Y",
+        "name": f"Course {rng.randrange(10**6)}",
+        "par": 72,
+        "phone": "555-0100",
+        "scorecard": [
+            {
+                "hole_number": hole,
+                "par": 4,
+                "handicap": hole,
+                "tees": {
+                    f"teeBox{tee}": {"color": f"Tee {tee}", "yards": 400 - 20 * tee}
+                    for tee in range(1, num_tees + 1)
+                },
+            }
+            for hole in range(1, 19)
+        ],
+        "state": "Il",
+        "tee_boxes": [
+            {
+                "tee": f"Tee {tee}",
+                "slope_rating": 113 + tee,
+                "course_rating": 70 + tee / 2,
+                "total_yards": 7000 - 300 * tee,
+            }
+            for tee in range(1, num_tees + 1)
+        ],
+        "updated_at": "2024-01-01T00:00:00.000Z",
+        "website": "",
+        "zip": "62701",
+    }
+
+
+def make_round(rng: random.Random, user_id: ObjectId, course: dict, day: int) -> dict:
+    return {
+        "_id": ObjectId(),
+        "user_id": user_id,
+        "course_id": course["_id"],
+        "tee_box_index": rng.randrange(len(course["tee_boxes"])),
+        "caption": "Nice day out",
+        "scorecard_mode": "all-holes",
+        "scorecard": {str(hole): rng.randint(3, 7) for hole in range(1, 19)},
+        "score_differential": rng.uniform(0, 30),
+        "pcc_adjustment": 0,
+        "date_posted": datetime(2024, 1, 1, tzinfo=timezone.utc) + timedelta(days=day),
+    }
+
+
+# The original implementation, including the validation FastAPI did through response_model
+async def get_rounds_with_two_finds(
+    round_ids, rounds_collection, courses_collection
+) -> bytes:
+    rounds = (
+        await rounds_collection.find({"_id": {"$in": round_ids}})
+        .sort("date_posted", -1)
+        .to_list(None)
+    )
+
+    courses = {}
+    for course in await courses_collection.find(
+        {"_id": {"$in": list({golf_round["course_id"] for golf_round in rounds})}}
+    ).to_list(None):
+        courses[course["_id"]] = course
+    for golf_round in rounds:
+        golf_round["course"] = courses[golf_round["course_id"]]
+
+    models = [GetRound(**golf_round) for golf_round in rounds]
+
+    response_adapter = TypeAdapter(list[GetRound])
+    return response_adapter.dump_json(
+        response_adapter.validate_python(
+            [model.model_dump(by_alias=False) for model in models]
+        )
+    )
+
+
+async def get_rounds_with_lookup(round_ids, rounds_collection) -> bytes:
+    rounds = await rounds_collection.aggregate(
+        get_rounds_pipeline(round_ids, -1, True, False)
+    ).to_list(None)
+
+    return json.dumps(rounds, default=encode_bson_value, separators=(",", ":")).encode()
+
+
+async def time_async(function, *args) -> float:
+    start = time.perf_counter()
+    for _ in range(REPETITIONS):
+        await function(*args)
+    return (time.perf_counter() - start) / REPETITIONS
+
+
+async def main() -> None:
+    rng = random.Random(0)
+    client = AsyncIOMotorClient(os.environ["MONGODB_URL"])
+    db = client.get_database(DATABASE_NAME)
+    rounds_collection = db.get_collection("rounds")
+    courses_collection = db.get_collection("courses")
+
+    try:
+        courses = [make_course(rng) for _ in range(NUM_COURSES)]
+        await courses_collection.insert_many(courses)
+
+        user_id = ObjectId()
+        rounds = [
+            make_round(rng, user_id, rng.choice(courses), day)
+            for day in range(max(HISTORY_SIZES))
+        ]
+        await rounds_collection.insert_many(rounds)
+
+        print(
+            f"{'rounds':>8} {'two finds (ms)':>15} {'$lookup (ms)':>13} "
+            f"{'speedup':>8} {'two finds (KB)':>15} {'$lookup (KB)':>13}"
+        )
+        for history_size in HISTORY_SIZES:
+            round_ids = [golf_round["_id"] for golf_round in rounds[-history_size:]]
+
+            two_finds_body = await get_rounds_with_two_finds(
+                round_ids, rounds_collection, courses_collection
+            )
+            lookup_body = await get_rounds_with_lookup(round_ids, rounds_collection)
+
+            two_finds_seconds = await time_async(
+                get_rounds_with_two_finds,
+                round_ids,
+                rounds_collection,
+                courses_collection,
+            )
+            lookup_seconds = await time_async(
+                get_rounds_with_lookup, round_ids, rounds_collection
+            )
+
+            print(
+                f"{history_size:>8} {two_finds_seconds * 1000:>15.2f} "
+                f"{lookup_seconds * 1000:>13.2f} "
+                f"{two_finds_seconds / lookup_seconds:>7.1f}x "
+                f"{len(two_finds_body) / 1024:>15.1f} {len(lookup_body) / 1024:>13.1f}"
+            )
+    finally:
+        await client.drop_database(DATABASE_NAME)
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,78 @@
+# Compare the sorted window handicap calculation against the original heap approach.
+#   Run from the repository root with: python -m api.benchmarks.handicap_window
+import heapq
+import random
+from statistics import mean
+from timeit import timeit
+
+from ..routers.users.handicap import (
+    HANDICAP_ADJUSTMENTS,
+    HANDICAP_WINDOW_SIZE,
+    NUM_ROUNDS_TO_LOWEST_K,
+    ScoreDifferentialWindow,
+)
+
+HISTORY_SIZES = [20, 100, 1000]
+REPETITIONS = 20
+
+
+# The original approach: push every differential into a heap on every post.
+#   Uses nsmallest and the most recent 20 rounds so it returns correct results to compare against
+def calculate_handicap_with_heap(score_differentials: list[float]) -> float:
+    heap = []
+    for score_differential in score_differentials:
+        heapq.heappush(heap, score_differential)
+
+    num_rounds = min(len(heap), HANDICAP_WINDOW_SIZE)
+    recent = score_differentials[-HANDICAP_WINDOW_SIZE:]
+    k = NUM_ROUNDS_TO_LOWEST_K[num_rounds]
+    return mean(heapq.nsmallest(k, recent)) + HANDICAP_ADJUSTMENTS.get(num_rounds, 0)
+
+
+# Post every round in order and calculate the handicap after each one
+def post_rounds_with_heap(score_differentials: list[float]) -> list[float]:
+    return [
+        calculate_handicap_with_heap(score_differentials[: i + 1])
+        for i in range(2, len(score_differentials))
+    ]
+
+
+def post_rounds_with_window(score_differentials: list[float]) -> list[float]:
+    window = ScoreDifferentialWindow(score_differentials[:2])
+    handicaps = []
+    for score_differential in score_differentials[2:]:
+        window.add(score_differential)
+        handicaps.append(window.handicap())
+    return handicaps
+
+
+def main() -> None:
+    rng = random.Random(0)
+
+    print(f"{'rounds':>8} {'heap (ms)':>12} {'window (ms)':>12} {'speedup':>8}")
+    for history_size in HISTORY_SIZES:
+        score_differentials = [rng.uniform(-2, 40) for _ in range(history_size)]
+
+        heap_handicaps = post_rounds_with_heap(score_differentials)
+        window_handicaps = post_rounds_with_window(score_differentials)
+        assert all(
+            abs(heap - window) < 1e-9
+            for heap, window in zip(heap_handicaps, window_handicaps)
+        )
+
+        heap_seconds = timeit(
+            lambda: post_rounds_with_heap(score_differentials), number=REPETITIONS
+        )
+        window_seconds = timeit(
+            lambda: post_rounds_with_window(score_differentials), number=REPETITIONS
+        )
+
+        print(
+            f"{history_size:>8} {heap_seconds / REPETITIONS * 1000:>12.3f} "
+            f"{window_seconds / REPETITIONS * 1000:>12.3f} "
+            f"{heap_seconds / window_seconds:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# Compare the in-memory KD-tree behind /courses/nearby against a brute force scan of every course.
+#   Runs without MongoDB.
+#   Run from the repository root with: python -m api.benchmarks.nearby_courses
+from timeit import timeit
+
+import numpy as np
+
+from ..routers.courses.geo import (
+    CourseLocationIndex,
+    chord_to_meters,
+    meters_to_chord,
+    to_unit_vectors,
+)
+
+NUM_COURSES = [1_000, 10_000, 100_000]
+NUM_QUERIES = 200
+RADIUS_METERS = 25_000
+LIMIT = 20
+
+
+# Distance to every course, then the nearest within the radius
+def nearby_brute_force(
+    points: np.ndarray, point: np.ndarray, radius: float, limit: int
+) -> np.ndarray:
+    chords = np.linalg.norm(points - point, axis=1)
+    within = np.flatnonzero(chords <= meters_to_chord(radius))
+    return within[np.argsort(chords[within])[:limit]]
+
+
+def main() -> None:
+    rng = np.random.default_rng(0)
+
+    print(
+        f"{'courses':>8} {'build (ms)':>11} {'brute force (us)':>17} "
+        f"{'kd-tree (us)':>13} {'speedup':>8}"
+    )
+    for num_courses in NUM_COURSES:
+        # Courses spread over the continental US
+        latitudes = rng.uniform(25, 49, num_courses)
+        longitudes = rng.uniform(-124, -67, num_courses)
+        courses = [
+            {
+                "_id": str(i),
+                "name": f"Course {i}",
+                "location": {"type": "Point", "coordinates": [lon, lat]},
+            }
+            for i, (lat, lon) in enumerate(zip(latitudes, longitudes))
+        ]
+        points = to_unit_vectors(latitudes, longitudes)
+
+        index = CourseLocationIndex()
+        build_seconds = timeit(lambda: index.build(courses), number=1)
+
+        queries = list(
+            zip(rng.uniform(25, 49, NUM_QUERIES), rng.uniform(-124, -67, NUM_QUERIES))
+        )
+        for lat, lon in queries:
+            point = to_unit_vectors(np.array([lat]), np.array([lon]))[0]
+            expected = nearby_brute_force(points, point, RADIUS_METERS, LIMIT)
+            nearby = index.nearby(lat, lon, RADIUS_METERS, LIMIT)
+            assert [int(course.id) for course in nearby] == expected.tolist()
+            assert all(
+                abs(
+                    course.distance - chord_to_meters(np.linalg.norm(points[i] - point))
+                )
+                < 1e-3
+                for course, i in zip(nearby, expected)
+            )
+
+        def run_brute_force():
+            for lat, lon in queries:
+                point = to_unit_vectors(np.array([lat]), np.array([lon]))[0]
+                nearby_brute_force(points, point, RADIUS_METERS, LIMIT)
+
+        def run_kd_tree():
+            for lat, lon in queries:
+                index.tree.query_radius(
+                    to_unit_vectors(np.array([lat]), np.array([lon]))[0],
+                    meters_to_chord(RADIUS_METERS),
+                )
+
+        brute_force_seconds = timeit(run_brute_force, number=1)
+        kd_tree_seconds = timeit(run_kd_tree, number=1)
+
+        print(
+            f"{num_courses:>8} {build_seconds * 1000:>11.1f} "
+            f"{brute_force_seconds / NUM_QUERIES * 1e6:>17.1f} "
+            f"{kd_tree_seconds / NUM_QUERIES * 1e6:>13.1f} "
+            f"{brute_force_seconds / kd_tree_seconds:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+# Compare the latency of posting a round through the original write path (full user and course
+#   reads one after another, the round insert, then a re-read of all the user's rounds for the
+#   handicap and separate user and course updates) against the current one (concurrent
+#   projected reads, then one transaction).
+#   Both paths include all of their writes, since the original finished them in background tasks.
+#   The course cache is cleared before every post so both paths read the database.
+#   Needs a MongoDB server. Uses (then drops) a scratch database.
+#   Run from the repository root with: python -m api.benchmarks.post_round
+import asyncio
+import os
+import random
+import time
+from datetime import datetime, timezone
+from statistics import median, quantiles
+
+from bson import ObjectId
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from .. import db as app_db
+from ..routers.courses.course_cache import course_cache
+from ..routers.courses.models import Course
+from ..routers.rounds.models import GetRound, PostRound, Round
+from ..routers.rounds.rounds import post_round
+from ..routers.users.handicap import (
+    HANDICAP_WINDOW_SIZE,
+    MIN_ROUNDS_FOR_HANDICAP,
+    calculate_handicap,
+    calculate_score_differential,
+)
+from ..routers.users.models import HandicapData, User
+from .get_rounds import make_course, make_round
+
+load_dotenv("../.env")
+
+DATABASE_NAME = "fore_benchmark_post_round"
+HISTORY_SIZES = [10, 100, 1000]
+REPETITIONS = 50
+
+
+def make_user(rng: random.Random, course: dict, history_size: int) -> dict:
+    user_id = ObjectId()
+    rounds = [make_round(rng, user_id, course, day) for day in range(history_size)]
+    return {
+        "_id": user_id,
+        "name": "Benchmark",
+        "username": f"benchmark{rng.randrange(10**9)}",
+        "email": f"benchmark{rng.randrange(10**9)}@example.com",
+        "password_hash": "x" * 60,
+        "rounds": [golf_round["_id"] for golf_round in rounds],
+        "handicap_data": [
+            HandicapData(
+                handicap=rng.uniform(0, 30), date=golf_round["date_posted"]
+            ).model_dump()
+            for golf_round in rounds[MIN_ROUNDS_FOR_HANDICAP - 1 :]
+        ],
+        "recent_score_differentials": [
+            golf_round["score_differential"]
+            for golf_round in rounds[-HANDICAP_WINDOW_SIZE:]
+        ],
+    }
+
+
+def make_post_round(rng: random.Random, user: dict, course: dict) -> PostRound:
+    return PostRound(
+        user_id=str(user["_id"]),
+        course_id=str(course["_id"]),
+        tee_box_index=0,
+        scorecard_mode="all-holes",
+        scorecard={str(hole): rng.randint(3, 7) for hole in range(1, 19)},
+    )
+
+
+# The original implementation, with the writes its background tasks made: the user update
+#   re-read every one of the user's rounds to calculate the handicap
+async def post_round_original(
+    post: PostRound, users_collection, courses_collection, rounds_collection
+) -> None:
+    user = User(**await users_collection.find_one({"_id": ObjectId(post.user_id)}))
+    course = Course(
+        **await courses_collection.find_one({"_id": ObjectId(post.course_id)})
+    )
+
+    current_user_handicap = (
+        user.handicap_data[-1].handicap if user.handicap_data else None
+    )
+    score_differential = calculate_score_differential(
+        post.scorecard,
+        post.scorecard_mode,
+        post.tee_box_index,
+        course,
+        current_user_handicap,
+    )
+    date_posted = datetime.now(tz=timezone.utc)
+    finalized_round = Round(
+        user_id=user.id,
+        course_id=course.id,
+        tee_box_index=post.tee_box_index,
+        caption=post.caption,
+        scorecard_mode=post.scorecard_mode,
+        scorecard=post.scorecard,
+        score_differential=score_differential,
+        date_posted=date_posted,
+    ).model_dump(exclude=["id"])
+    finalized_round["user_id"] = ObjectId(user.id)
+    finalized_round["course_id"] = ObjectId(course.id)
+    inserted_id = (await rounds_collection.insert_one(finalized_round)).inserted_id
+
+    round_ids = [ObjectId(round_id) for round_id in user.rounds] + [inserted_id]
+    push_query = {"rounds": {"$each": [inserted_id]}}
+    if len(round_ids) >= MIN_ROUNDS_FOR_HANDICAP:
+        rounds = [
+            GetRound(**golf_round)
+            for golf_round in await rounds_collection.find({"_id": {"$in": round_ids}})
+            .sort("date_posted", 1)
+            .to_list(None)
+        ]
+        handicap_data = HandicapData(
+            handicap=calculate_handicap(
+                [golf_round.score_differential for golf_round in rounds]
+            ),
+            date=date_posted,
+        ).model_dump()
+        push_query["handicap_data"] = {"$each": [handicap_data]}
+
+    await users_collection.update_one({"_id": ObjectId(user.id)}, {"$push": push_query})
+
+    await courses_collection.update_one(
+        {"_id": ObjectId(course.id)}, {"$push": {"rounds": {"$each": [inserted_id]}}}
+    )
+
+
+# Median and 95th percentile latency in milliseconds
+async def time_posts(function, rng, user, course, *collections) -> tuple[float, float]:
+    latencies = []
+    for _ in range(REPETITIONS):
+        post = make_post_round(rng, user, course)
+        course_cache.clear()
+
+        start = time.perf_counter()
+        await function(post, *collections)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    return median(latencies), quantiles(latencies, n=20)[-1]
+
+
+async def main() -> None:
+    rng = random.Random(0)
+    client = AsyncIOMotorClient(os.environ["MONGODB_URL"])
+    db = client.get_database(DATABASE_NAME)
+    users_collection = db.get_collection("users")
+    courses_collection = db.get_collection("courses")
+    rounds_collection = db.get_collection("rounds")
+    collections = (users_collection, courses_collection, rounds_collection)
+
+    # post_round writes through the app's client
+    hello = await client.admin.command("hello")
+    app_db.client = client
+    app_db.supports_transactions = "setName" in hello or hello.get("msg") == "isdbgrid"
+
+    try:
+        course = make_course(rng)
+        course["rounds"] = []
+        await courses_collection.insert_one(course)
+
+        print(f"Transactions: {app_db.supports_transactions}")
+        print(
+            f"{'rounds':>8} {'original p50':>13} {'original p95':>13} "
+            f"{'current p50':>12} {'current p95':>12} {'speedup':>8}"
+        )
+        for history_size in HISTORY_SIZES:
+            user = make_user(rng, course, history_size)
+            await users_collection.insert_one(user)
+
+            # The original path runs first, so the rounds collection already exists
+            #   by the time a transaction inserts into it
+            original_p50, original_p95 = await time_posts(
+                post_round_original, rng, user, course, *collections
+            )
+            current_p50, current_p95 = await time_posts(
+                post_round, rng, user, course, *collections
+            )
+
+            print(
+                f"{history_size:>8} {original_p50:>13.2f} {original_p95:>13.2f} "
+                f"{current_p50:>12.2f} {current_p95:>12.2f} "
+                f"{original_p50 / current_p50:>7.1f}x"
+            )
+    finally:
+        await client.drop_database(DATABASE_NAME)
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
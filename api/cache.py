@@ -0,0 +1,158 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, Iterable
+
+
+# A size-bounded in-memory cache that evicts the least recently used entry when full.
+#   If a ttl (in seconds) is given, entries also expire that long after being set
+class LRUCache:
+    def __init__(self, max_size: int, ttl: float | None = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        # Maps each key to its value and the time it expires (None if it never does)
+        self._entries: OrderedDict[Hashable, tuple[Any, float | None]] = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        if key not in self:
+            return default
+
+        # Mark the entry as most recently used
+        self._entries.move_to_end(key)
+        return self._entries[key][0]
+
+    # ttl overrides the cache's ttl for this entry
+    def set(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        ttl = ttl if ttl is not None else self.ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        if key not in self._entries:
+            return False
+
+        expires_at = self._entries[key][1]
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._entries[key]
+            return False
+
+        return True
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# An LRUCache for values loaded asynchronously, e.g. from MongoDB.
+#   Concurrent loads of the same key share a single call to the loader (single-flight).
+#   A loader returns None when there's nothing to cache, which is only cached
+#   (for negative_ttl seconds) if a negative_ttl is given
+class AsyncLRUCache:
+    def __init__(
+        self,
+        max_size: int,
+        ttl: float | None = None,
+        negative_ttl: float | None = None,
+    ):
+        self._entries = LRUCache(max_size, ttl)
+        self.negative_ttl = negative_ttl
+        self._in_flight: dict[Hashable, asyncio.Future] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0  # Lookups that waited on another lookup's load
+
+    async def get_or_load(
+        self, key: Hashable, load: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        if key in self._entries:
+            self.hits += 1
+            return self._entries.get(key)
+
+        if key in self._in_flight:
+            self.coalesced += 1
+            in_flight = self._in_flight[key]
+            try:
+                return await asyncio.shield(in_flight)
+            except asyncio.CancelledError:
+                # Only this lookup was cancelled
+                if not in_flight.cancelled():
+                    raise
+            # The lookup loading the value was cancelled, so load it again
+            return await self.get_or_load(key, load)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+
+        try:
+            value = await load()
+        except Exception as exception:
+            future.set_exception(exception)
+            # Mark the exception as retrieved in case nothing else is waiting on it
+            future.exception()
+            raise
+        except BaseException:
+            # E.g. the request loading the value was cancelled. Waiters load it again
+            future.cancel()
+            raise
+        else:
+            future.set_result(value)
+
+            # Don't cache values invalidated while they were loading
+            if self._in_flight.get(key) is future:
+                if value is not None:
+                    self._entries.set(key, value)
+                elif self.negative_ttl is not None:
+                    self._entries.set(key, None, ttl=self.negative_ttl)
+        finally:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+
+        return value
+
+    # Look up many keys at once. Returns the cached values and the keys that still need loading
+    def get_many(self, keys: Iterable[Hashable]) -> tuple[dict, list]:
+        found = {}
+        missing = []
+        for key in keys:
+            if key in self._entries:
+                self.hits += 1
+                found[key] = self._entries.get(key)
+            else:
+                self.misses += 1
+                missing.append(key)
+
+        return found, missing
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self._entries.set(key, value)
+
+    def invalidate(self, key: Hashable) -> None:
+        self._entries.invalidate(key)
+        # A load already in progress may have read the old value, so don't let it be cached
+        self._in_flight.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._in_flight.clear()
+
+    def stats(self) -> dict[str, int | float]:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "size": len(self._entries),
+            "max_size": self._entries.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": (self.hits + self.coalesced) / lookups if lookups else 0,
+        }
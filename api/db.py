@@ -1,27 +1,59 @@
+import asyncio
 import os
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable
 
 from dotenv import load_dotenv
 from fastapi import FastAPI
 from motor.motor_asyncio import (
     AsyncIOMotorClient,
+    AsyncIOMotorClientSession,
     AsyncIOMotorCollection,
     AsyncIOMotorDatabase,
 )
 
+from .indexes import ensure_indexes
+from .routers.courses.autocomplete import (
+    course_search_index,
+    refresh_course_search_index,
+)
+from .work_queue import start_work_queues, stop_work_queues
+from .write_behind import drain_write_behind_buffers, start_write_behind_buffers
+
 load_dotenv("../.env")
 MONGODB_URL = os.environ["MONGODB_URL"]
 
+client: AsyncIOMotorClient = None
 db: AsyncIOMotorDatabase = None  # Global db instance
+# Transactions need a replica set or sharded cluster, which a local server may not be
+supports_transactions = False
 
 
 # Create and close the MongoDB client on app startup/shutdown
-def lifespan(app: FastAPI):
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global client, db, supports_transactions
     client = AsyncIOMotorClient(MONGODB_URL)
-    global db
     db = client.get_database("fore_database")
 
+    hello = await client.admin.command("hello")
+    supports_transactions = "setName" in hello or hello.get("msg") == "isdbgrid"
+
+    await ensure_indexes(db)
+
+    courses_collection = db.get_collection("courses")
+    await course_search_index.build(courses_collection)
+    refresh_task = asyncio.create_task(refresh_course_search_index(courses_collection))
+
+    await start_work_queues(db)
+    start_write_behind_buffers(db)
+
     yield
 
+    await stop_work_queues()
+    # Write the updates still buffered before the client is closed
+    await drain_write_behind_buffers()
+    refresh_task.cancel()
     client.close()
 
 
@@ -30,3 +62,15 @@ def get_collection(collection_name: str):
         return db.get_collection(collection_name)
 
     return _get_collection
+
+
+# Run the callback's writes in one transaction, retrying it on transient errors.
+#   Without transaction support, the callback's writes are made one after another
+async def run_in_transaction(
+    callback: Callable[[AsyncIOMotorClientSession | None], Awaitable[Any]],
+) -> Any:
+    if not supports_transactions:
+        return await callback(None)
+
+    async with await client.start_session() as session:
+        return await session.with_transaction(callback)
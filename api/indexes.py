@@ -0,0 +1,21 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING, DESCENDING, GEOSPHERE
+
+
+# Create the indexes the API's queries rely on. Creating an index that already exists is a no-op
+async def ensure_indexes(db: AsyncIOMotorDatabase) -> None:
+    # A course's rounds, newest first
+    await db.get_collection("rounds").create_index(
+        [("course_id", ASCENDING), ("date_posted", DESCENDING), ("_id", DESCENDING)]
+    )
+
+    # A user's rounds, newest first
+    await db.get_collection("rounds").create_index(
+        [("user_id", ASCENDING), ("date_posted", DESCENDING), ("_id", DESCENDING)]
+    )
+
+    # Courses changed by the ingestion job since the search index was last refreshed
+    await db.get_collection("courses").create_index("synced_at")
+
+    # Courses near a point
+    await db.get_collection("courses").create_index([("location", GEOSPHERE)])
@@ -0,0 +1,227 @@
+# Calculate the Playing Conditions Calculation (PCC) adjustment for every course and day,
+#   then recompute the score differentials and handicaps of the users it affects.
+#   Run daily from the repository root with: python -m api.jobs.calculate_pcc [--date YYYY-MM-DD] [--days N]
+import argparse
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from math import sqrt
+
+from dotenv import load_dotenv
+from pymongo import ASCENDING, MongoClient, UpdateMany, UpdateOne
+
+from ..routers.rounds.pcc import get_pcc_day
+from .recompute_handicaps import (
+    DEFAULT_CHUNK_SIZE,
+    DEFAULT_CURSOR_BATCH_SIZE,
+    DEFAULT_WORKERS,
+    RecomputeHandicapsJob,
+)
+
+load_dotenv("../.env")
+
+logger = logging.getLogger()
+logging.basicConfig(level=logging.INFO)
+
+JOB_NAME = "calculate_pcc"
+
+# A course needs this many rounds on a day for its conditions to be judged
+MIN_ROUNDS_FOR_PCC = 8
+# A day is compared against the course's rounds over this many previous days
+BASELINE_DAYS = 365
+MIN_BASELINE_ROUNDS = 20
+
+MIN_PCC_ADJUSTMENT = -1
+MAX_PCC_ADJUSTMENT = 3
+
+# The differential before any PCC adjustment. The adjustment is scaled by 113 / slope rating
+#   in the differential, which is close enough to 1 to judge conditions by
+UNADJUSTED_DIFFERENTIAL = {
+    "$add": ["$score_differential", {"$ifNull": ["$pcc_adjustment", 0]}]
+}
+
+
+def get_daily_differentials_pipeline(day: datetime) -> list[dict]:
+    return [
+        {"$match": {"date_posted": {"$gte": day, "$lt": day + timedelta(days=1)}}},
+        {
+            "$group": {
+                "_id": "$course_id",
+                "num_rounds": {"$sum": 1},
+                "mean": {"$avg": UNADJUSTED_DIFFERENTIAL},
+                "standard_deviation": {"$stdDevPop": UNADJUSTED_DIFFERENTIAL},
+            }
+        },
+        {"$match": {"num_rounds": {"$gte": MIN_ROUNDS_FOR_PCC}}},
+    ]
+
+
+def get_baseline_differentials_pipeline(course_ids: list, day: datetime) -> list[dict]:
+    return [
+        {
+            "$match": {
+                "course_id": {"$in": course_ids},
+                "date_posted": {
+                    "$gte": day - timedelta(days=BASELINE_DAYS),
+                    "$lt": day,
+                },
+            }
+        },
+        {
+            "$group": {
+                "_id": "$course_id",
+                "num_rounds": {"$sum": 1},
+                "mean": {"$avg": UNADJUSTED_DIFFERENTIAL},
+            }
+        },
+        {"$match": {"num_rounds": {"$gte": MIN_BASELINE_ROUNDS}}},
+    ]
+
+
+def calculate_pcc_adjustment(
+    mean: float, standard_deviation: float, num_rounds: int, baseline_mean: float
+) -> int:
+    shift = mean - baseline_mean
+
+    # A shift within the day's standard error is just the spread of the field, not the conditions
+    if abs(shift) <= standard_deviation / sqrt(num_rounds):
+        return 0
+
+    return max(MIN_PCC_ADJUSTMENT, min(MAX_PCC_ADJUSTMENT, round(shift)))
+
+
+# Calculate and store the adjustments for one day. Returns the IDs of the users whose rounds changed
+def calculate_pcc_for_day(db, day: datetime) -> list:
+    rounds_collection = db.get_collection("rounds")
+    pcc_adjustments_collection = db.get_collection("pcc_adjustments")
+
+    daily_differentials = {
+        group["_id"]: group
+        for group in rounds_collection.aggregate(get_daily_differentials_pipeline(day))
+    }
+    baseline_means = {
+        group["_id"]: group["mean"]
+        for group in rounds_collection.aggregate(
+            get_baseline_differentials_pipeline(list(daily_differentials), day)
+        )
+    }
+
+    adjustments = {
+        course_id: calculate_pcc_adjustment(
+            group["mean"],
+            group["standard_deviation"],
+            group["num_rounds"],
+            baseline_means[course_id],
+        )
+        for course_id, group in daily_differentials.items()
+        if course_id in baseline_means
+    }
+
+    # Courses that had an adjustment from an earlier run but no longer qualify go back to 0
+    previous_adjustments = {
+        document["course_id"]: document["adjustment"]
+        for document in pcc_adjustments_collection.find({"date": day})
+    }
+    for course_id in previous_adjustments:
+        adjustments.setdefault(course_id, 0)
+
+    changed_adjustments = {
+        course_id: adjustment
+        for course_id, adjustment in adjustments.items()
+        if adjustment != previous_adjustments.get(course_id, 0)
+    }
+
+    if not changed_adjustments:
+        return []
+
+    pcc_adjustments_collection.bulk_write(
+        [
+            UpdateOne(
+                {"course_id": course_id, "date": day},
+                {
+                    "$set": {
+                        "adjustment": adjustment,
+                        "num_rounds": daily_differentials.get(course_id, {}).get(
+                            "num_rounds", 0
+                        ),
+                    }
+                },
+                upsert=True,
+            )
+            for course_id, adjustment in changed_adjustments.items()
+        ],
+        ordered=False,
+    )
+
+    day_query = {"$gte": day, "$lt": day + timedelta(days=1)}
+    rounds_collection.bulk_write(
+        [
+            UpdateMany(
+                {"course_id": course_id, "date_posted": day_query},
+                {"$set": {"pcc_adjustment": adjustment}},
+            )
+            for course_id, adjustment in changed_adjustments.items()
+        ],
+        ordered=False,
+    )
+
+    logger.info(
+        "%s: %d courses with a new PCC adjustment",
+        day.date().isoformat(),
+        len(changed_adjustments),
+    )
+
+    return rounds_collection.distinct(
+        "user_id",
+        {"course_id": {"$in": list(changed_adjustments)}, "date_posted": day_query},
+    )
+
+
+def main() -> None:
+    yesterday = get_pcc_day(datetime.now(tz=timezone.utc)) - timedelta(days=1)
+
+    parser = argparse.ArgumentParser(
+        description="Calculate PCC adjustments and recompute the affected handicaps"
+    )
+    parser.add_argument(
+        "--date",
+        type=datetime.fromisoformat,
+        default=yesterday,
+        help="Last day to calculate (UTC), defaults to yesterday",
+    )
+    parser.add_argument(
+        "--days", type=int, default=1, help="Number of days ending at --date"
+    )
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    args = parser.parse_args()
+
+    client = MongoClient(os.environ["MONGODB_URL"])
+    db = client.get_database("fore_database")
+
+    try:
+        db.get_collection("pcc_adjustments").create_index(
+            [("course_id", ASCENDING), ("date", ASCENDING)], unique=True
+        )
+
+        last_day = get_pcc_day(args.date)
+        affected_user_ids = set()
+        for days_before in reversed(range(args.days)):
+            affected_user_ids.update(
+                calculate_pcc_for_day(db, last_day - timedelta(days=days_before))
+            )
+
+        # Recompute the affected users' histories through the bulk recompute path
+        if affected_user_ids:
+            RecomputeHandicapsJob(
+                db,
+                args.workers,
+                DEFAULT_CHUNK_SIZE,
+                DEFAULT_CURSOR_BATCH_SIZE,
+                job_name=JOB_NAME,
+            ).run(restart=True, user_ids=sorted(affected_user_ids))
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
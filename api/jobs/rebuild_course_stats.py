@@ -0,0 +1,158 @@
+# Rebuild courses' scoring stats and leaderboards from their rounds, e.g. to repair stats whose
+#   buffered updates were lost, or to refill leaderboards after rounds on them were edited.
+#   Run from the repository root with: python -m api.jobs.rebuild_course_stats [--course-id ID ...]
+import argparse
+import logging
+import os
+from collections import defaultdict
+from datetime import datetime, timezone
+from itertools import groupby
+
+from bson import ObjectId
+from dotenv import load_dotenv
+from pymongo import DeleteOne, MongoClient, UpdateOne
+
+from ..routers.courses.models import Course
+from ..routers.courses.stats import (
+    get_course_stats_increments,
+    get_leaderboard_entry,
+    get_leaderboard_field,
+    get_leaderboard_push,
+    is_on_leaderboard,
+)
+from ..write_behind import merge_update
+from .recompute_handicaps import DEFAULT_CURSOR_BATCH_SIZE
+
+load_dotenv("../.env")
+
+logger = logging.getLogger()
+logging.basicConfig(level=logging.INFO)
+
+REPORT_EVERY_N_COURSES = 100
+
+STATS_ROUND_PROJECTION = {
+    "user_id": 1,
+    "course_id": 1,
+    "scorecard_mode": 1,
+    "scorecard": 1,
+    "date_posted": 1,
+}
+
+
+# The update that builds a course's stats from nothing. Only the days still on the
+#   leaderboard get leaderboards
+def get_course_stats_update(
+    round_documents: list[dict], course: Course, now: datetime
+) -> dict:
+    update = {}
+    leaderboard_entries = defaultdict(list)
+
+    for round_document in round_documents:
+        merge_update(
+            update,
+            {
+                "$inc": get_course_stats_increments(
+                    round_document["scorecard"],
+                    round_document["scorecard_mode"],
+                    course,
+                )
+            },
+        )
+
+        if not is_on_leaderboard(round_document["date_posted"], now):
+            continue
+        leaderboard_entries[
+            get_leaderboard_field(round_document["date_posted"])
+        ].append(
+            get_leaderboard_entry(
+                round_document["_id"],
+                round_document["user_id"],
+                round_document["scorecard"],
+                course,
+                round_document["date_posted"],
+            )
+        )
+
+    if leaderboard_entries:
+        update["$push"] = {
+            field: get_leaderboard_push(entries)
+            for field, entries in leaderboard_entries.items()
+        }
+
+    return update
+
+
+def rebuild_course_stats(db, course_ids: list[ObjectId] | None = None) -> None:
+    rounds_collection = db.get_collection("rounds")
+    courses_collection = db.get_collection("courses")
+    course_stats_collection = db.get_collection("course_stats")
+
+    query = {"course_id": {"$in": course_ids}} if course_ids else {}
+    # Served by the (course_id, date_posted, _id) index
+    cursor = (
+        rounds_collection.find(query, STATS_ROUND_PROJECTION)
+        .sort("course_id", 1)
+        .batch_size(DEFAULT_CURSOR_BATCH_SIZE)
+    )
+
+    now = datetime.now(tz=timezone.utc)
+    rebuilt_course_ids = set()
+
+    for course_id, course_rounds in groupby(cursor, key=lambda r: r["course_id"]):
+        course = courses_collection.find_one({"_id": course_id})
+        if course is None:
+            continue
+
+        # Replace the course's stats: clear them, then add up all of its rounds
+        course_stats_collection.bulk_write(
+            [
+                DeleteOne({"_id": course_id}),
+                UpdateOne(
+                    {"_id": course_id},
+                    get_course_stats_update(list(course_rounds), Course(**course), now),
+                    upsert=True,
+                ),
+            ],
+            ordered=True,
+        )
+        rebuilt_course_ids.add(course_id)
+
+        if len(rebuilt_course_ids) % REPORT_EVERY_N_COURSES == 0:
+            logger.info("Rebuilt stats for %d courses", len(rebuilt_course_ids))
+
+    # Courses without any rounds left have no stats
+    if course_ids:
+        stale_course_ids = [
+            course_id for course_id in course_ids if course_id not in rebuilt_course_ids
+        ]
+        course_stats_collection.delete_many({"_id": {"$in": stale_course_ids}})
+    else:
+        course_stats_collection.delete_many({"_id": {"$nin": list(rebuilt_course_ids)}})
+
+    logger.info("Rebuilt stats for %d courses", len(rebuilt_course_ids))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Rebuild courses' scoring stats and leaderboards from their rounds"
+    )
+    parser.add_argument(
+        "--course-id",
+        dest="course_ids",
+        type=ObjectId,
+        action="append",
+        help="Only rebuild this course's stats. Can be given more than once",
+    )
+    args = parser.parse_args()
+
+    client = MongoClient(os.environ["MONGODB_URL"])
+    db = client.get_database("fore_database")
+
+    try:
+        rebuild_course_stats(db, args.course_ids)
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+# Rebuild users' scoring stats from their rounds, e.g. to repair stats whose buffered updates
+#   were lost when the API was stopped abruptly.
+#   Run from the repository root with: python -m api.jobs.rebuild_user_stats [--user-id ID ...]
+import argparse
+import logging
+import os
+from itertools import groupby
+
+from bson import ObjectId
+from dotenv import load_dotenv
+from pymongo import DeleteOne, MongoClient, UpdateOne
+
+from ..cache import LRUCache
+from ..routers.courses.models import Course
+from ..routers.users.stats import get_round_stats_increments
+from ..write_behind import merge_update
+from .recompute_handicaps import (
+    COURSE_CACHE_SIZE,
+    DEFAULT_CHUNK_SIZE,
+    DEFAULT_CURSOR_BATCH_SIZE,
+    REPORT_EVERY_N_USERS,
+    get_courses_for_rounds,
+    skip_rounds_without_course,
+)
+
+load_dotenv("../.env")
+
+logger = logging.getLogger()
+logging.basicConfig(level=logging.INFO)
+
+STATS_ROUND_PROJECTION = {
+    "user_id": 1,
+    "course_id": 1,
+    "scorecard_mode": 1,
+    "scorecard": 1,
+}
+
+
+# The $inc update that builds a user's stats from nothing
+def get_user_stats_update(round_documents: list[dict], courses: dict) -> dict:
+    update = {}
+    for round_document in round_documents:
+        merge_update(
+            update,
+            {
+                "$inc": get_round_stats_increments(
+                    round_document["scorecard"],
+                    round_document["scorecard_mode"],
+                    courses[round_document["course_id"]],
+                )
+            },
+        )
+
+    return update
+
+
+def rebuild_user_stats(db, user_ids: list[ObjectId] | None = None) -> None:
+    rounds_collection = db.get_collection("rounds")
+    courses_collection = db.get_collection("courses")
+    user_stats_collection = db.get_collection("user_stats")
+
+    query = {"user_id": {"$in": user_ids}} if user_ids else {}
+    cursor = (
+        rounds_collection.find(query, STATS_ROUND_PROJECTION)
+        .sort("user_id", 1)
+        .batch_size(DEFAULT_CURSOR_BATCH_SIZE)
+    )
+
+    course_cache = LRUCache(COURSE_CACHE_SIZE)
+    operations = []
+    rebuilt_user_ids = set()
+
+    for user_id, user_rounds in groupby(cursor, key=lambda r: r["user_id"]):
+        round_documents = list(user_rounds)
+        course_documents = get_courses_for_rounds(
+            round_documents, course_cache, courses_collection
+        )
+        round_documents = skip_rounds_without_course(
+            user_id, round_documents, course_documents
+        )
+        if not round_documents:
+            continue
+
+        courses = {
+            course_id: Course(**course)
+            for course_id, course in course_documents.items()
+            if course is not None
+        }
+
+        # Replace the user's stats: clear them, then add up all of their rounds
+        operations.append(DeleteOne({"_id": user_id}))
+        operations.append(
+            UpdateOne(
+                {"_id": user_id},
+                get_user_stats_update(round_documents, courses),
+                upsert=True,
+            )
+        )
+        rebuilt_user_ids.add(user_id)
+
+        if len(operations) >= DEFAULT_CHUNK_SIZE:
+            user_stats_collection.bulk_write(operations, ordered=True)
+            operations = []
+
+        if len(rebuilt_user_ids) % REPORT_EVERY_N_USERS == 0:
+            logger.info("Rebuilt stats for %d users", len(rebuilt_user_ids))
+
+    if operations:
+        user_stats_collection.bulk_write(operations, ordered=True)
+
+    # Users without any rounds left have no stats
+    if user_ids:
+        stale_user_ids = [
+            user_id for user_id in user_ids if user_id not in rebuilt_user_ids
+        ]
+        user_stats_collection.delete_many({"_id": {"$in": stale_user_ids}})
+    else:
+        user_stats_collection.delete_many({"_id": {"$nin": list(rebuilt_user_ids)}})
+
+    logger.info("Rebuilt stats for %d users", len(rebuilt_user_ids))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Rebuild users' scoring stats from their rounds"
+    )
+    parser.add_argument(
+        "--user-id",
+        dest="user_ids",
+        type=ObjectId,
+        action="append",
+        help="Only rebuild this user's stats. Can be given more than once",
+    )
+    args = parser.parse_args()
+
+    client = MongoClient(os.environ["MONGODB_URL"])
+    db = client.get_database("fore_database")
+
+    try:
+        rebuild_user_stats(db, args.user_ids)
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
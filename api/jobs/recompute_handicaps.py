@@ -0,0 +1,325 @@
+# Recompute every user's score differentials and handicap history, e.g. after a rules change
+#   or a course rating correction.
+#   Run from the repository root with: python -m api.jobs.recompute_handicaps [--workers N] [--restart]
+import argparse
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime, timezone
+from itertools import groupby
+
+from dotenv import load_dotenv
+from pymongo import MongoClient, UpdateOne
+from pymongo.collection import Collection
+
+from ..cache import LRUCache
+from ..routers.courses.models import Course
+from ..routers.rounds.models import GetRound
+from ..routers.users.handicap import HANDICAP_WINDOW_SIZE, recalculate_handicap_history
+from ..routers.users.models import HandicapData
+
+load_dotenv("../.env")
+
+logger = logging.getLogger()
+logging.basicConfig(level=logging.INFO)
+
+JOB_NAME = "recompute_handicaps"
+
+DEFAULT_WORKERS = os.cpu_count() or 1
+DEFAULT_CHUNK_SIZE = 500  # Operations per bulk_write
+DEFAULT_CURSOR_BATCH_SIZE = 1000
+COURSE_CACHE_SIZE = 2048
+REPORT_EVERY_N_USERS = 1000
+
+ROUND_PROJECTION = {
+    "user_id": 1,
+    "course_id": 1,
+    "tee_box_index": 1,
+    "caption": 1,
+    "scorecard_mode": 1,
+    "scorecard": 1,
+    "score_differential": 1,
+    "pcc_adjustment": 1,
+    "date_posted": 1,
+}
+
+
+# Runs in a worker process. Recomputes one user's rounds, which are in posting order.
+#   Returns the user ID, the (round ID, score differential) pairs that changed,
+#   and the user's new handicap data and score differential window
+def recompute_user(
+    user_id, round_documents: list[dict], course_documents: dict
+) -> tuple:
+    courses = {
+        course_id: Course(**course_document)
+        for course_id, course_document in course_documents.items()
+        if course_document is not None
+    }
+    rounds = [
+        GetRound(**round_document, course=courses[round_document["course_id"]])
+        for round_document in round_documents
+    ]
+
+    score_differentials, handicaps = recalculate_handicap_history(rounds, 0)
+
+    changed_score_differentials = [
+        (round_document["_id"], score_differential)
+        for round_document, score_differential in zip(
+            round_documents, score_differentials
+        )
+        if score_differential != round_document["score_differential"]
+    ]
+
+    handicap_data = [
+        HandicapData(handicap=handicap, date=golf_round.date_posted).model_dump()
+        for golf_round, handicap in zip(rounds, handicaps)
+        if handicap is not None
+    ]
+
+    return (
+        user_id,
+        changed_score_differentials,
+        handicap_data,
+        score_differentials[-HANDICAP_WINDOW_SIZE:],
+    )
+
+
+# Loads the courses a user's rounds were played on, hitting the database only for courses not already cached
+def get_courses_for_rounds(
+    round_documents: list[dict],
+    course_cache: LRUCache,
+    courses_collection: Collection,
+) -> dict:
+    course_ids = {round_document["course_id"] for round_document in round_documents}
+
+    missing_course_ids = [
+        course_id for course_id in course_ids if course_id not in course_cache
+    ]
+    if missing_course_ids:
+        for course in courses_collection.find({"_id": {"$in": missing_course_ids}}):
+            course_cache.set(course["_id"], course)
+
+    return {course_id: course_cache.get(course_id) for course_id in course_ids}
+
+
+# Drops the rounds played on courses that have since been deleted, logging how many were skipped
+def skip_rounds_without_course(
+    user_id, round_documents: list[dict], course_documents: dict
+) -> list[dict]:
+    kept_round_documents = [
+        round_document
+        for round_document in round_documents
+        if course_documents[round_document["course_id"]] is not None
+    ]
+
+    num_skipped = len(round_documents) - len(kept_round_documents)
+    if num_skipped:
+        logger.warning(
+            "Skipped %d of user %s's rounds whose course no longer exists",
+            num_skipped,
+            user_id,
+        )
+
+    return kept_round_documents
+
+
+class RecomputeHandicapsJob:
+    def __init__(
+        self,
+        db,
+        workers: int,
+        chunk_size: int,
+        cursor_batch_size: int,
+        job_name: str = JOB_NAME,
+    ):
+        self.job_name = job_name
+        self.rounds_collection = db.get_collection("rounds")
+        self.users_collection = db.get_collection("users")
+        self.courses_collection = db.get_collection("courses")
+        self.checkpoints_collection = db.get_collection("job_checkpoints")
+
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.cursor_batch_size = cursor_batch_size
+        # Bounds how many users are held in memory at once
+        self.max_in_flight = workers * 4
+
+        self.course_cache = LRUCache(COURSE_CACHE_SIZE)
+        self.round_updates: list[UpdateOne] = []
+        self.user_updates: list[UpdateOne] = []
+
+        self.num_users = 0
+        self.num_rounds = 0
+        self.start_time = time.monotonic()
+
+    def get_checkpoint(self):
+        checkpoint = self.checkpoints_collection.find_one({"_id": self.job_name})
+        return checkpoint["last_user_id"] if checkpoint else None
+
+    def save_checkpoint(self, last_user_id) -> None:
+        self.checkpoints_collection.update_one(
+            {"_id": self.job_name},
+            {
+                "$set": {
+                    "last_user_id": last_user_id,
+                    "updated_at": datetime.now(tz=timezone.utc),
+                }
+            },
+            upsert=True,
+        )
+
+    def clear_checkpoint(self) -> None:
+        self.checkpoints_collection.delete_one({"_id": self.job_name})
+
+    # Stream every round grouped by user, in posting order, picking up after the last checkpoint.
+    #   If user_ids is given, only those users' rounds are streamed
+    def stream_users_rounds(self, after_user_id, user_ids: list | None = None):
+        user_query = {}
+        if after_user_id:
+            user_query["$gt"] = after_user_id
+        if user_ids is not None:
+            user_query["$in"] = user_ids
+        query = {"user_id": user_query} if user_query else {}
+
+        cursor = (
+            self.rounds_collection.find(query, ROUND_PROJECTION)
+            .sort([("user_id", 1), ("date_posted", 1)])
+            .batch_size(self.cursor_batch_size)
+        )
+
+        for user_id, user_rounds in groupby(
+            cursor, key=lambda round_document: round_document["user_id"]
+        ):
+            yield user_id, list(user_rounds)
+
+    def add_result(self, result: tuple) -> None:
+        user_id, changed_score_differentials, handicap_data, window = result
+
+        self.round_updates.extend(
+            UpdateOne(
+                {"_id": round_id},
+                {"$set": {"score_differential": score_differential}},
+            )
+            for round_id, score_differential in changed_score_differentials
+        )
+        self.user_updates.append(
+            UpdateOne(
+                {"_id": user_id},
+                {
+                    "$set": {
+                        "handicap_data": handicap_data,
+                        "recent_score_differentials": window,
+                    }
+                },
+            )
+        )
+
+        self.num_users += 1
+        if self.num_users % REPORT_EVERY_N_USERS == 0:
+            self.report()
+
+        if len(self.round_updates) + len(self.user_updates) >= self.chunk_size:
+            self.flush(user_id)
+
+    # Write out the pending updates, then record that every user up to last_user_id is done
+    def flush(self, last_user_id) -> None:
+        if self.round_updates:
+            self.rounds_collection.bulk_write(self.round_updates, ordered=False)
+        if self.user_updates:
+            self.users_collection.bulk_write(self.user_updates, ordered=False)
+
+        self.round_updates = []
+        self.user_updates = []
+
+        if last_user_id is not None:
+            self.save_checkpoint(last_user_id)
+
+    def report(self) -> None:
+        elapsed = time.monotonic() - self.start_time
+        logger.info(
+            "%d users (%d rounds) recomputed in %.1fs: %.1f users/s, %.1f rounds/s",
+            self.num_users,
+            self.num_rounds,
+            elapsed,
+            self.num_users / elapsed if elapsed else 0,
+            self.num_rounds / elapsed if elapsed else 0,
+        )
+
+    def run(self, restart: bool, user_ids: list | None = None) -> None:
+        if restart:
+            self.clear_checkpoint()
+
+        after_user_id = self.get_checkpoint()
+        if after_user_id:
+            logger.info("Resuming after user %s", after_user_id)
+
+        in_flight: deque[Future] = deque()
+        last_user_id = None
+
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            for user_id, round_documents in self.stream_users_rounds(
+                after_user_id, user_ids
+            ):
+                course_documents = get_courses_for_rounds(
+                    round_documents, self.course_cache, self.courses_collection
+                )
+                round_documents = skip_rounds_without_course(
+                    user_id, round_documents, course_documents
+                )
+                if not round_documents:
+                    continue
+
+                in_flight.append(
+                    executor.submit(
+                        recompute_user, user_id, round_documents, course_documents
+                    )
+                )
+                self.num_rounds += len(round_documents)
+
+                # Results are consumed in user order so the checkpoint only ever moves forward
+                while len(in_flight) >= self.max_in_flight:
+                    result = in_flight.popleft().result()
+                    last_user_id = result[0]
+                    self.add_result(result)
+
+            while in_flight:
+                result = in_flight.popleft().result()
+                last_user_id = result[0]
+                self.add_result(result)
+
+        self.flush(last_user_id)
+        self.clear_checkpoint()
+        self.report()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Recompute every user's score differentials and handicap history"
+    )
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument(
+        "--cursor-batch-size", type=int, default=DEFAULT_CURSOR_BATCH_SIZE
+    )
+    parser.add_argument(
+        "--restart",
+        action="store_true",
+        help="Ignore any saved checkpoint and start from the first user",
+    )
+    args = parser.parse_args()
+
+    client = MongoClient(os.environ["MONGODB_URL"])
+    db = client.get_database("fore_database")
+
+    try:
+        RecomputeHandicapsJob(
+            db, args.workers, args.chunk_size, args.cursor_batch_size
+        ).run(args.restart)
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# Parse each course's coordinates string into a GeoJSON location and create the 2dsphere index
+#   that /courses/nearby searches with.
+#   Run from the repository root with: python -m api.migrations.backfill_course_locations
+import os
+
+from dotenv import load_dotenv
+from pymongo import GEOSPHERE, MongoClient, UpdateOne
+
+from ..routers.courses.geo import parse_coordinates
+
+load_dotenv("../.env")
+
+BATCH_SIZE = 500
+
+
+def main() -> None:
+    client = MongoClient(os.environ["MONGODB_URL"])
+    db = client.get_database("fore_database")
+
+    courses_collection = db.get_collection("courses")
+
+    num_updated = 0
+    num_unparsable = 0
+    updates = []
+
+    try:
+        for course in courses_collection.find(
+            {"location": {"$exists": False}}, {"coordinates": 1}
+        ):
+            location = parse_coordinates(course.get("coordinates"))
+            if location is None:
+                num_unparsable += 1
+                continue
+
+            updates.append(
+                UpdateOne({"_id": course["_id"]}, {"$set": {"location": location}})
+            )
+
+            if len(updates) >= BATCH_SIZE:
+                num_updated += courses_collection.bulk_write(
+                    updates, ordered=False
+                ).modified_count
+                updates = []
+
+        if updates:
+            num_updated += courses_collection.bulk_write(
+                updates, ordered=False
+            ).modified_count
+
+        courses_collection.create_index([("location", GEOSPHERE)])
+
+        print(f"{num_updated} courses were updated.")
+        print(f"{num_unparsable} courses have no valid coordinates.")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# Fill in each user's rolling window of recent score differentials from their existing rounds.
+#   Run from the repository root with: python -m api.migrations.backfill_recent_score_differentials
+import os
+
+from dotenv import load_dotenv
+from pymongo import MongoClient, UpdateOne
+
+from ..routers.users.handicap import HANDICAP_WINDOW_SIZE
+
+load_dotenv("../.env")
+
+BATCH_SIZE = 500
+
+
+def get_recent_score_differentials_pipeline() -> list[dict]:
+    return [
+        {"$sort": {"user_id": 1, "date_posted": 1}},
+        {
+            "$group": {
+                "_id": "$user_id",
+                "recent_score_differentials": {
+                    "$lastN": {
+                        "input": "$score_differential",
+                        "n": HANDICAP_WINDOW_SIZE,
+                    }
+                },
+            }
+        },
+    ]
+
+
+def main() -> None:
+    client = MongoClient(os.environ["MONGODB_URL"])
+    db = client.get_database("fore_database")
+
+    rounds_collection = db.get_collection("rounds")
+    users_collection = db.get_collection("users")
+
+    num_updated = 0
+    updates = []
+
+    try:
+        for user_window in rounds_collection.aggregate(
+            get_recent_score_differentials_pipeline(), allowDiskUse=True
+        ):
+            updates.append(
+                UpdateOne(
+                    {"_id": user_window["_id"]},
+                    {
+                        "$set": {
+                            "recent_score_differentials": user_window[
+                                "recent_score_differentials"
+                            ]
+                        }
+                    },
+                )
+            )
+
+            if len(updates) >= BATCH_SIZE:
+                num_updated += users_collection.bulk_write(
+                    updates, ordered=False
+                ).modified_count
+                updates = []
+
+        if updates:
+            num_updated += users_collection.bulk_write(
+                updates, ordered=False
+            ).modified_count
+
+        print(f"{num_updated} users were updated.")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+# Remove the rounds arrays from course documents. Which rounds were played at a course is
+#   now looked up through the rounds collection's course_id index instead.
+#   Run from the repository root with: python -m api.migrations.remove_course_rounds
+import os
+
+from dotenv import load_dotenv
+from pymongo import ASCENDING, DESCENDING, MongoClient
+
+load_dotenv("../.env")
+
+
+def main() -> None:
+    client = MongoClient(os.environ["MONGODB_URL"])
+    db = client.get_database("fore_database")
+
+    try:
+        # Make sure the index exists before anything reads rounds by course
+        db.get_collection("rounds").create_index(
+            [
+                ("course_id", ASCENDING),
+                ("date_posted", DESCENDING),
+                ("_id", DESCENDING),
+            ]
+        )
+
+        result = db.get_collection("courses").update_many(
+            {"rounds": {"$exists": True}}, {"$unset": {"rounds": ""}}
+        )
+
+        print(f"{result.modified_count} courses were updated.")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
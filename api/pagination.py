@@ -0,0 +1,47 @@
+import base64
+import json
+from datetime import datetime
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import HTTPException
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+# Keyset pagination cursors. A cursor holds the sort key of the last item on a page
+#   and is opaque to clients, so the sort key can change without breaking the API
+def encode_cursor(sort_value: datetime | str, object_id: ObjectId) -> str:
+    if isinstance(sort_value, datetime):
+        value = {"date": sort_value.isoformat()}
+    else:
+        value = {"str": sort_value}
+
+    cursor = json.dumps({**value, "id": str(object_id)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(cursor.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime | str, ObjectId]:
+    try:
+        decoded = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if "date" in decoded:
+            sort_value = datetime.fromisoformat(decoded["date"])
+        else:
+            sort_value = decoded["str"]
+        return sort_value, ObjectId(decoded["id"])
+    except (ValueError, KeyError, TypeError, InvalidId) as exception:
+        raise HTTPException(status_code=422, detail="Invalid cursor") from exception
+
+
+# Query for the items after the cursor when sorting by (field, _id), both in the given direction
+def after_cursor_query(field: str, cursor: str, direction: int) -> dict:
+    sort_value, object_id = decode_cursor(cursor)
+    operator = "$gt" if direction == 1 else "$lt"
+
+    return {
+        "$or": [
+            {field: {operator: sort_value}},
+            {field: sort_value, "_id": {operator: object_id}},
+        ]
+    }
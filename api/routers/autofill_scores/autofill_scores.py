@@ -1,8 +1,21 @@
-from random import shuffle
-
-from fastapi import APIRouter
-
-from .models import AutofillScores, FilledScorecard, Scorecard
+from math import floor
+from random import Random
+
+from fastapi import APIRouter, Depends, HTTPException
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+from ...db import get_collection
+from .batch import autofill_scores_batch
+from .hole_profiles import HoleProfile, get_hole_profile
+from .models import (
+    MIN_HOLE_SCORE,
+    AutofillModeEnum,
+    AutofillScores,
+    BatchAutofillResult,
+    BatchAutofillScores,
+    FilledScorecard,
+    Scorecard,
+)
 
 autofill_scores_router = APIRouter()
 
@@ -11,7 +24,7 @@ def calculate_total_score(scorecard: Scorecard) -> int:
     return sum([hole.score for hole in scorecard.values()])
 
 
-def get_unfixed_hole_numbers(scorecard: Scorecard) -> Scorecard:
+def get_unfixed_hole_numbers(scorecard: Scorecard) -> list[int]:
     hole_numbers = []
     for hole_number, hole_info in scorecard.items():
         if not hole_info.fixed:
@@ -20,29 +33,154 @@ def get_unfixed_hole_numbers(scorecard: Scorecard) -> Scorecard:
     return hole_numbers
 
 
-def autofill_scores(scorecard: Scorecard, target_total: int) -> Scorecard:
-    if calculate_total_score(scorecard) == target_total:
-        return scorecard
+# Raises an error if the target total can never be reached by changing the unfixed holes
+def validate_target_total(scorecard: Scorecard, target_total: int) -> None:
+    fixed_total = sum(hole.score for hole in scorecard.values() if hole.fixed)
+    num_unfixed_holes = len(get_unfixed_hole_numbers(scorecard))
+
+    if num_unfixed_holes == 0:
+        if fixed_total != target_total:
+            raise HTTPException(
+                status_code=422,
+                detail="All holes have scores, but they do not add up to the target total",
+            )
+        return
+
+    # Every unfixed hole needs at least one stroke
+    if target_total - fixed_total < num_unfixed_holes * MIN_HOLE_SCORE:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Target total is too low, the remaining {num_unfixed_holes} holes need at least {num_unfixed_holes * MIN_HOLE_SCORE} strokes",
+        )
+
+
+# Spread `strokes` as evenly as possible over the scores, in the given order.
+#   The first holes in the order receive the leftover strokes
+def spread_strokes(scores: list[int], strokes: int) -> list[int]:
+    num_holes = len(scores)
+    base, remainder = divmod(strokes, num_holes)
+
+    return [
+        score + base + (1 if position < remainder else 0)
+        for position, score in enumerate(scores)
+    ]
+
+
+# Split `strokes` between the holes in proportion to their weights.
+#   Leftover strokes go to the largest remainders, ties going to the earlier holes
+def apportion_strokes(
+    scores: list[int], strokes: int, weights: list[float]
+) -> list[int]:
+    total_weight = sum(weights)
+    quotas = [strokes * weight / total_weight for weight in weights]
+    shares = [floor(quota) for quota in quotas]
+
+    leftover = strokes - sum(shares)
+    by_remainder = sorted(
+        range(len(scores)), key=lambda position: shares[position] - quotas[position]
+    )
+    for position in by_remainder[:leftover]:
+        shares[position] += 1
+
+    return [score + share for score, share in zip(scores, shares)]
+
+
+# Removing strokes can push some holes below the minimum score.
+#   Clamp those holes and take the difference from the holes that still have room.
+#   Every pass clamps at least one more hole, so this runs at most once per hole
+def clamp_to_min_score(scores: list[int]) -> list[int]:
+    deficit = sum(MIN_HOLE_SCORE - score for score in scores if score < MIN_HOLE_SCORE)
+    while deficit > 0:
+        scores = [max(score, MIN_HOLE_SCORE) for score in scores]
+
+        positions_with_room = [
+            position for position, score in enumerate(scores) if score > MIN_HOLE_SCORE
+        ]
+        spread = spread_strokes(
+            [scores[position] for position in positions_with_room], -deficit
+        )
+        for position, score in zip(positions_with_room, spread):
+            scores[position] = score
+
+        deficit = sum(
+            MIN_HOLE_SCORE - score for score in scores if score < MIN_HOLE_SCORE
+        )
+
+    return scores
+
+
+def distribute_strokes(scores: list[int], strokes: int) -> list[int]:
+    return clamp_to_min_score(spread_strokes(scores, strokes))
+
+
+def autofill_scores(
+    scorecard: Scorecard, target_total: int, seed: int | None = None
+) -> Scorecard:
+    validate_target_total(scorecard, target_total)
 
     # Get the unfixed holes and shuffle them to make score filling more natural
     unfixed_hole_numbers = get_unfixed_hole_numbers(scorecard)
-    shuffle(unfixed_hole_numbers)
+    Random(seed).shuffle(unfixed_hole_numbers)
+
+    # Compute how far off the target we are once, then spread it over the unfixed holes
+    delta = target_total - calculate_total_score(scorecard)
+    if delta == 0:
+        return scorecard
 
-    # Loop thru the unfixed holes
-    for unfixed_hole_number in unfixed_hole_numbers:
-        current_total_score = calculate_total_score(scorecard)
+    filled_scores = distribute_strokes(
+        [scorecard[hole_number].score for hole_number in unfixed_hole_numbers], delta
+    )
+
+    for hole_number, score in zip(unfixed_hole_numbers, filled_scores):
+        scorecard[hole_number].score = score
+
+    return scorecard
 
-        # If we are currently under the target total
-        if current_total_score < target_total:
-            # Need to bring the hole over par (increment by 1)
-            scorecard[unfixed_hole_number].score += 1
 
-        # If we are currently over the target total
-        elif current_total_score > target_total:
-            # Need to bring the hole under par (decrement by 1)
-            scorecard[unfixed_hole_number].score -= 1
+# Like autofill_scores, but extra strokes land on the hardest holes first
+#   and removed strokes come off the easiest holes first
+def autofill_scores_by_difficulty(
+    scorecard: Scorecard, target_total: int, hole_profile: HoleProfile
+) -> Scorecard:
+    validate_target_total(scorecard, target_total)
+
+    delta = target_total - calculate_total_score(scorecard)
+    if delta == 0:
+        return scorecard
 
-    return autofill_scores(scorecard, target_total)
+    # Holes on the scorecard that the course profile doesn't know about go last
+    difficulty_rank = {
+        hole_number: rank for rank, hole_number in enumerate(hole_profile.hole_numbers)
+    }
+    unfixed_hole_numbers = sorted(
+        get_unfixed_hole_numbers(scorecard),
+        key=lambda hole_number: difficulty_rank.get(hole_number, len(difficulty_rank)),
+    )
+
+    if delta > 0:
+        profile_weights = hole_profile.over_par_weights
+    else:
+        profile_weights = hole_profile.under_par_weights
+
+    weights = [
+        profile_weights.get(hole_number, scorecard[hole_number].score)
+        for hole_number in unfixed_hole_numbers
+    ]
+    unfixed_scores = [
+        scorecard[hole_number].score for hole_number in unfixed_hole_numbers
+    ]
+
+    # Apportion the number of strokes to move, then apply them in the right direction
+    sign = 1 if delta > 0 else -1
+    moved_strokes = apportion_strokes([0] * len(weights), abs(delta), weights)
+    filled_scores = clamp_to_min_score(
+        [score + sign * moved for score, moved in zip(unfixed_scores, moved_strokes)]
+    )
+
+    for hole_number, score in zip(unfixed_hole_numbers, filled_scores):
+        scorecard[hole_number].score = score
+
+    return scorecard
 
 
 @autofill_scores_router.post(
@@ -50,20 +188,51 @@ def autofill_scores(scorecard: Scorecard, target_total: int) -> Scorecard:
     response_model=FilledScorecard,
     description="Given a partially complete scorecard and a target final score, fill in the empty scores",
 )
-def autofill_scores_api(autofill_scores: AutofillScores) -> dict[str, int]:
+async def autofill_scores_api(
+    autofill_scores_request: AutofillScores,
+    courses_collection: AsyncIOMotorCollection = Depends(get_collection("courses")),
+) -> dict[str, int]:
     # Set holes to be fixed or unfixed, and
     #   set the scores for holes that are not fixed as pars
-    for hole in autofill_scores.scorecard.values():
+    for hole in autofill_scores_request.scorecard.values():
         if not hole.score:
             hole.score = hole.par or 4  # Default to 4 if no par is provided
             hole.fixed = False
         else:
             hole.fixed = True
 
-    filled_scorecard = autofill_scores(
-        autofill_scores.scorecard, autofill_scores.target_total
-    )
+    if autofill_scores_request.mode == AutofillModeEnum.difficulty:
+        hole_profile = await get_hole_profile(
+            autofill_scores_request.course_id, courses_collection
+        )
+        filled_scorecard = autofill_scores_by_difficulty(
+            autofill_scores_request.scorecard,
+            autofill_scores_request.target_total,
+            hole_profile,
+        )
+
+    else:
+        filled_scorecard = autofill_scores(
+            autofill_scores_request.scorecard,
+            autofill_scores_request.target_total,
+            autofill_scores_request.seed,
+        )
 
     return {
         str(hole_number): hole.score for hole_number, hole in filled_scorecard.items()
     }
+
+
+@autofill_scores_router.post(
+    "/autofill-scores/batch",
+    response_model=list[BatchAutofillResult],
+    description="Fill in many scorecards at once. Results are returned in input order, with an error for each target that cannot be reached",
+)
+def autofill_scores_batch_api(
+    batch_autofill_scores: BatchAutofillScores,
+) -> list[BatchAutofillResult]:
+    return autofill_scores_batch(
+        batch_autofill_scores.scorecards,
+        batch_autofill_scores.target_totals,
+        batch_autofill_scores.seed,
+    )
@@ -0,0 +1,122 @@
+import numpy as np
+
+from .models import MIN_HOLE_SCORE, BatchAutofillResult, Scorecard
+
+DEFAULT_PAR = 4
+
+
+# Rank each cell among the cells of its row where mask is set, using the keys as the ordering.
+#   Cells outside the mask get ranks past the end of the row
+def rank_within_rows(keys: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    masked_keys = np.where(mask, keys, np.inf)
+    order = np.argsort(masked_keys, axis=1)
+
+    ranks = np.empty_like(order)
+    np.put_along_axis(
+        ranks, order, np.broadcast_to(np.arange(keys.shape[1]), keys.shape), axis=1
+    )
+    return ranks
+
+
+# Add `strokes[i]` to the masked cells of row i as evenly as possible,
+#   giving the leftover strokes to the cells with the lowest keys
+def spread_strokes(
+    scores: np.ndarray, strokes: np.ndarray, mask: np.ndarray, keys: np.ndarray
+) -> np.ndarray:
+    num_cells = np.maximum(mask.sum(axis=1), 1)
+    base, remainder = np.divmod(strokes, num_cells)
+
+    ranks = rank_within_rows(keys, mask)
+    extra = base[:, None] + (ranks < remainder[:, None])
+
+    return scores + np.where(mask, extra, 0)
+
+
+def distribute_strokes(
+    scores: np.ndarray, strokes: np.ndarray, unfixed: np.ndarray, keys: np.ndarray
+) -> np.ndarray:
+    scores = spread_strokes(scores, strokes, unfixed, keys)
+
+    # Clamp holes that went below the minimum and take the difference from the holes
+    #   that still have room, for every row at once
+    deficit = np.where(unfixed & (scores < MIN_HOLE_SCORE), MIN_HOLE_SCORE - scores, 0)
+    deficit = deficit.sum(axis=1)
+    while deficit.any():
+        scores = np.where(unfixed, np.maximum(scores, MIN_HOLE_SCORE), scores)
+        has_room = unfixed & (scores > MIN_HOLE_SCORE)
+        scores = spread_strokes(scores, -deficit, has_room, keys)
+
+        deficit = np.where(
+            unfixed & (scores < MIN_HOLE_SCORE), MIN_HOLE_SCORE - scores, 0
+        )
+        deficit = deficit.sum(axis=1)
+
+    return scores
+
+
+def autofill_scores_batch(
+    scorecards: list[Scorecard], target_totals: list[int], seed: int | None = None
+) -> list[BatchAutofillResult]:
+    num_scorecards = len(scorecards)
+    hole_numbers = [sorted(scorecard) for scorecard in scorecards]
+    max_holes = max((len(numbers) for numbers in hole_numbers), default=0)
+
+    # Hold every scorecard in one padded matrix, one row per scorecard
+    scores = np.zeros((num_scorecards, max_holes), dtype=np.int64)
+    fixed = np.zeros((num_scorecards, max_holes), dtype=bool)
+    unfixed = np.zeros((num_scorecards, max_holes), dtype=bool)
+
+    for row, (scorecard, numbers) in enumerate(zip(scorecards, hole_numbers)):
+        for column, hole_number in enumerate(numbers):
+            hole = scorecard[hole_number]
+            if hole.score:
+                scores[row, column] = hole.score
+                fixed[row, column] = True
+            else:
+                # Unfilled holes start at par
+                scores[row, column] = hole.par or DEFAULT_PAR
+                unfixed[row, column] = True
+
+    targets = np.asarray(target_totals, dtype=np.int64)
+    fixed_totals = np.where(fixed, scores, 0).sum(axis=1)
+    num_unfixed = unfixed.sum(axis=1)
+
+    # Flag the targets that can never be reached before doing any work
+    all_fixed_mismatch = (num_unfixed == 0) & (fixed_totals != targets)
+    too_low = (num_unfixed > 0) & (
+        targets - fixed_totals < num_unfixed * MIN_HOLE_SCORE
+    )
+    reachable = ~(all_fixed_mismatch | too_low)
+
+    unfixed &= reachable[:, None]
+    deltas = np.where(reachable, targets - scores.sum(axis=1), 0)
+
+    # Random keys give each row its own shuffle of the unfixed holes
+    keys = np.random.default_rng(seed).random(scores.shape)
+    scores = distribute_strokes(scores, deltas, unfixed, keys)
+
+    results = []
+    for row, numbers in enumerate(hole_numbers):
+        if all_fixed_mismatch[row]:
+            results.append(
+                BatchAutofillResult(
+                    error="All holes have scores, but they do not add up to the target total"
+                )
+            )
+        elif too_low[row]:
+            results.append(
+                BatchAutofillResult(
+                    error=f"Target total is too low, the remaining {num_unfixed[row]} holes need at least {num_unfixed[row] * MIN_HOLE_SCORE} strokes"
+                )
+            )
+        else:
+            results.append(
+                BatchAutofillResult(
+                    scorecard={
+                        str(hole_number): int(scores[row, column])
+                        for column, hole_number in enumerate(numbers)
+                    }
+                )
+            )
+
+    return results
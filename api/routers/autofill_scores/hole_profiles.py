@@ -0,0 +1,77 @@
+from dataclasses import dataclass
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+from ...cache import LRUCache
+from ...utils import PyObjectId
+from ..courses.courses import get_course
+from ..courses.models import CourseHole
+
+HOLE_PROFILE_CACHE_SIZE = 1024
+# Pars above this weigh the same as it
+MAX_WEIGHTED_PAR = 6
+
+
+# Per-course weights used to decide which holes take strokes when autofilling
+@dataclass(frozen=True)
+class HoleProfile:
+    updated_at: str  # The course's updated_at when the profile was built
+    hole_numbers: tuple[int, ...]  # Hardest hole first
+    over_par_weights: dict[int, float]  # Share of extra strokes each hole takes
+    under_par_weights: dict[int, float]  # Share of removed strokes each hole gives up
+
+
+hole_profile_cache = LRUCache(HOLE_PROFILE_CACHE_SIZE)
+
+
+def build_hole_profile(
+    course_scorecard: list[CourseHole], updated_at: str
+) -> HoleProfile:
+    # Order by stroke index (1 is the hardest hole). Missing or invalid stroke indexes go last
+    holes = sorted(
+        course_scorecard,
+        key=lambda hole: (
+            hole.handicap if hole.handicap > 0 else float("inf"),
+            hole.hole_number,
+        ),
+    )
+    num_holes = len(holes)
+
+    over_par_weights = {}
+    under_par_weights = {}
+    for rank, hole in enumerate(holes):
+        # 1 for the hardest hole down to 1 / num_holes for the easiest
+        difficulty = (num_holes - rank) / num_holes
+        # Longer holes weigh a little more, but always less than one step of difficulty,
+        #   so the stroke index decides the order and par only shifts the shares
+        par = min(hole.par or 4, MAX_WEIGHTED_PAR)
+        par_weight = par / (MAX_WEIGHTED_PAR + 1) / num_holes
+
+        # Harder holes take more bogeys. Easier holes give up more birdies
+        over_par_weights[hole.hole_number] = 1 + difficulty + par_weight
+        under_par_weights[hole.hole_number] = 2 - difficulty + par_weight
+
+    return HoleProfile(
+        updated_at=updated_at,
+        hole_numbers=tuple(hole.hole_number for hole in holes),
+        over_par_weights=over_par_weights,
+        under_par_weights=under_par_weights,
+    )
+
+
+# Get the profile for a course, rebuilding it if the course has changed since it was built.
+#   The course comes through the course cache, so the profile is rebuilt once a course's
+#   edit invalidates it there
+async def get_hole_profile(
+    course_id: PyObjectId,
+    courses_collection: AsyncIOMotorCollection,
+) -> HoleProfile:
+
+    course = await get_course(course_id, courses_collection)
+
+    hole_profile = hole_profile_cache.get(course.id)
+    if hole_profile is None or hole_profile.updated_at != course.updated_at:
+        hole_profile = build_hole_profile(course.scorecard, course.updated_at)
+        hole_profile_cache.set(course.id, hole_profile)
+
+    return hole_profile
@@ -1,6 +1,11 @@
-from typing import Optional
+from enum import Enum
+from typing import Any, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
+
+from ...utils import PyObjectId
+
+MIN_HOLE_SCORE = 1  # Every hole takes at least one stroke
 
 
 class AutofillHole(BaseModel):
@@ -12,9 +17,46 @@ class AutofillHole(BaseModel):
 Scorecard = dict[int, AutofillHole]
 
 
+class AutofillModeEnum(str, Enum):
+    uniform = "uniform"  # Spread strokes evenly over randomly ordered holes
+    difficulty = "difficulty"  # Weight strokes by the course's stroke index and par
+
+
 class AutofillScores(BaseModel):
     scorecard: dict[int, AutofillHole]
     target_total: int
+    seed: Optional[int] = None  # Seed for the hole shuffle, for reproducible results
+    mode: AutofillModeEnum = AutofillModeEnum.uniform
+    course_id: Optional[PyObjectId] = None  # Required for difficulty mode
+
+    @model_validator(mode="after")
+    def check_course_id_for_difficulty_mode(self) -> "AutofillScores":
+        if self.mode == AutofillModeEnum.difficulty and self.course_id is None:
+            raise ValueError("A course ID is required for difficulty mode")
+        return self
 
 
 FilledScorecard = dict[str, int]
+
+
+class BatchAutofillScores(BaseModel):
+    scorecards: list[Scorecard]
+    target_totals: list[int]  # target_totals[i] is the target for scorecards[i]
+    seed: Optional[int] = None
+
+    @model_validator(mode="before")
+    @classmethod
+    def check_lengths_match(cls, data: dict[str, Any]) -> dict[str, Any]:
+        if (
+            "scorecards" in data
+            and "target_totals" in data
+            and len(data["scorecards"]) != len(data["target_totals"])
+        ):
+            raise ValueError("Must provide exactly one target total per scorecard")
+        return data
+
+
+class BatchAutofillResult(BaseModel):
+    scorecard: Optional[FilledScorecard] = None
+    # Set instead of scorecard if the target cannot be reached
+    error: Optional[str] = None
@@ -0,0 +1,301 @@
+import asyncio
+import heapq
+import logging
+import re
+import unicodedata
+from array import array
+from bisect import bisect_left, insort
+from collections import defaultdict
+from datetime import datetime
+
+import numpy as np
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+from .course_cache import invalidate_course
+from .models import CourseSuggestion
+from .search_cache import invalidate_search_results
+
+logger = logging.getLogger(__name__)
+
+# Only the fields suggestions are built from are read from the courses collection
+SUGGESTION_PROJECTION = {
+    "name": 1,
+    "city": 1,
+    "state": 1,
+    "country": 1,
+    "synced_at": 1,
+}
+
+REFRESH_INTERVAL_SECONDS = 60
+
+# A short prefix like "s" matches thousands of tokens, so only this many are expanded
+MAX_PREFIX_EXPANSIONS = 256
+# How similar (by shared trigrams) a token has to be to a misspelled query token
+MIN_TRIGRAM_SIMILARITY = 0.3
+MAX_FUZZY_EXPANSIONS = 16
+
+# Relevance of a query token matching a token of the course's name or location
+NAME_EXACT_SCORE = 4.0
+NAME_PREFIX_SCORE = 3.0
+LOCATION_EXACT_SCORE = 2.0
+LOCATION_PREFIX_SCORE = 1.5
+FUZZY_SCORE_FACTOR = 0.5  # Fuzzy matches score this fraction of an exact match
+
+MAX_NAME_LENGTH = 255
+# Shorter names win ties, but never outweigh a difference in relevance
+NAME_LENGTH_TIEBREAK = 0.001
+
+# Compact tombstoned entries once they make up this fraction of the index
+COMPACT_DEAD_FRACTION = 0.25
+
+
+# Lowercase, strip accents and split on anything that isn't a letter or digit
+def tokenize(text: str | None) -> list[str]:
+    if not text:
+        return []
+
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return re.findall(r"[a-z0-9]+", text)
+
+
+# Tokens are padded so their start and end are trigrams of their own, e.g. "  pe", "ble "
+def get_trigrams(token: str) -> set[str]:
+    padded = f"  {token} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+# The distinct tokens of one field (e.g. course names) and, for each token,
+#   the sorted entry numbers of the courses containing it
+class TokenPostings:
+    def __init__(self):
+        self.tokens: list[str] = []
+        self.token_ids: dict[str, int] = {}
+        self.postings: list[array] = []
+
+        # Tokens in sorted order, for prefix lookups by binary search
+        self.sorted_tokens: list[str] = []
+        # Maps each trigram to the IDs of the tokens containing it, for fuzzy lookups
+        self.trigram_tokens: dict[str, array] = defaultdict(lambda: array("I"))
+
+    def add(self, token: str, entry: int) -> None:
+        token_id = self.token_ids.get(token)
+        if token_id is None:
+            token_id = len(self.tokens)
+            self.token_ids[token] = token_id
+            self.tokens.append(token)
+            self.postings.append(array("I"))
+            insort(self.sorted_tokens, token)
+            for trigram in get_trigrams(token):
+                self.trigram_tokens[trigram].append(token_id)
+
+        postings = self.postings[token_id]
+        # Entries are only ever added in increasing order, so postings stay sorted
+        if not postings or postings[-1] != entry:
+            postings.append(entry)
+
+    # The tokens starting with the prefix
+    def prefix_matches(self, prefix: str) -> list[str]:
+        matches = []
+        index = bisect_left(self.sorted_tokens, prefix)
+        while (
+            index < len(self.sorted_tokens)
+            and self.sorted_tokens[index].startswith(prefix)
+            and len(matches) < MAX_PREFIX_EXPANSIONS
+        ):
+            matches.append(self.sorted_tokens[index])
+            index += 1
+
+        return matches
+
+    # The tokens sharing enough trigrams with the token, and how similar they are
+    def fuzzy_matches(self, token: str) -> list[tuple[str, float]]:
+        query_trigrams = get_trigrams(token)
+        shared_counts: dict[int, int] = defaultdict(int)
+        for trigram in query_trigrams:
+            for token_id in self.trigram_tokens.get(trigram, ()):
+                shared_counts[token_id] += 1
+
+        matches = []
+        for token_id, shared in shared_counts.items():
+            candidate = self.tokens[token_id]
+            # Jaccard similarity of the two trigram sets
+            similarity = shared / (len(query_trigrams) + len(candidate) + 1 - shared)
+            if similarity >= MIN_TRIGRAM_SIMILARITY:
+                matches.append((candidate, similarity))
+
+        return heapq.nlargest(MAX_FUZZY_EXPANSIONS, matches, key=lambda m: m[1])
+
+
+# In-memory typeahead index over course names and locations, supporting prefix and fuzzy
+#   (trigram) matching. Courses are stored as numbered entries in parallel arrays.
+#   A changed course gets a new entry and its old one is tombstoned
+class CourseSearchIndex:
+    def __init__(self):
+        self.suggestions: list[CourseSuggestion | None] = []
+        self.entries: dict[str, int] = {}  # Maps a course ID to its live entry
+        self.alive = bytearray()  # 1 for live entries, 0 for tombstoned ones
+        self.name_lengths = array("H")  # Breaks ties in favour of shorter names
+        self.num_dead = 0
+
+        self.name_postings = TokenPostings()
+        self.location_postings = TokenPostings()
+
+        # Only courses synced after this need to be read on refresh
+        self.last_synced_at: datetime | None = None
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def add(self, course: dict) -> None:
+        suggestion = CourseSuggestion(**course)
+
+        previous_entry = self.entries.get(suggestion.id)
+        if previous_entry is not None:
+            self.suggestions[previous_entry] = None
+            self.alive[previous_entry] = 0
+            self.num_dead += 1
+
+        entry = len(self.suggestions)
+        self.suggestions.append(suggestion)
+        self.alive.append(1)
+        self.name_lengths.append(min(len(suggestion.name), MAX_NAME_LENGTH))
+        self.entries[suggestion.id] = entry
+
+        for token in tokenize(suggestion.name):
+            self.name_postings.add(token, entry)
+        for field in (suggestion.city, suggestion.state):
+            for token in tokenize(field):
+                self.location_postings.add(token, entry)
+
+        synced_at = course.get("synced_at")
+        if synced_at is not None and (
+            self.last_synced_at is None or synced_at > self.last_synced_at
+        ):
+            self.last_synced_at = synced_at
+
+    # Rebuild the postings without the tombstoned entries
+    def compact(self) -> None:
+        live_suggestions = [s for s in self.suggestions if s is not None]
+        last_synced_at = self.last_synced_at
+
+        self.__init__()
+        for suggestion in live_suggestions:
+            self.add(suggestion.model_dump(by_alias=True))
+        self.last_synced_at = last_synced_at
+
+    # The relevance of every entry to the query token, 0 where it doesn't match
+    def score_token(self, token: str, is_last: bool) -> np.ndarray:
+        scores = np.zeros(len(self.suggestions), dtype=np.float32)
+
+        def add_scores(postings: TokenPostings, matched: str, score: float) -> None:
+            # A zero-copy view of the postings array
+            entries = np.frombuffer(
+                postings.postings[postings.token_ids[matched]], dtype=np.uint32
+            )
+            scores[entries] = np.maximum(scores[entries], score)
+
+        # Only the token being typed is treated as a prefix
+        for postings, exact_score, prefix_score in (
+            (self.name_postings, NAME_EXACT_SCORE, NAME_PREFIX_SCORE),
+            (self.location_postings, LOCATION_EXACT_SCORE, LOCATION_PREFIX_SCORE),
+        ):
+            if is_last:
+                for matched in postings.prefix_matches(token):
+                    if matched == token:
+                        add_scores(postings, matched, exact_score)
+                    else:
+                        # Prefer completions that are closer in length to what was typed
+                        add_scores(
+                            postings,
+                            matched,
+                            prefix_score * len(token) / len(matched),
+                        )
+            elif token in postings.token_ids:
+                add_scores(postings, token, exact_score)
+
+        # Fall back to similarly spelled tokens if nothing matched
+        if not scores.any() and len(token) >= 3:
+            for postings, exact_score in (
+                (self.name_postings, NAME_EXACT_SCORE),
+                (self.location_postings, LOCATION_EXACT_SCORE),
+            ):
+                for matched, similarity in postings.fuzzy_matches(token):
+                    add_scores(
+                        postings, matched, exact_score * FUZZY_SCORE_FACTOR * similarity
+                    )
+
+        return scores
+
+    def search(self, query: str, limit: int) -> list[CourseSuggestion]:
+        tokens = tokenize(query)
+        if not tokens or not self.suggestions:
+            return []
+
+        # Every query token has to match
+        total_scores = np.zeros(len(self.suggestions), dtype=np.float32)
+        is_match = np.frombuffer(self.alive, dtype=np.uint8).astype(bool)
+        for position, token in enumerate(tokens):
+            token_scores = self.score_token(token, position == len(tokens) - 1)
+            total_scores += token_scores
+            is_match &= token_scores > 0
+
+        matches = np.flatnonzero(is_match)
+        # Highest score first, then shortest name
+        name_lengths = np.frombuffer(self.name_lengths, dtype=np.uint16)[matches]
+        total_scores[matches] -= name_lengths * (NAME_LENGTH_TIEBREAK / MAX_NAME_LENGTH)
+        if len(matches) > limit:
+            top = np.argpartition(-total_scores[matches], limit)[:limit]
+            matches = matches[top]
+
+        ranked = sorted(
+            matches,
+            key=lambda entry: (-total_scores[entry], self.suggestions[entry].name),
+        )
+        return [self.suggestions[entry] for entry in ranked]
+
+    async def build(self, courses_collection: AsyncIOMotorCollection) -> None:
+        async for course in courses_collection.find({}, SUGGESTION_PROJECTION):
+            self.add(course)
+
+        logger.info("Indexed %d courses for autocomplete", len(self))
+
+    # Index the courses synced since the last build or refresh
+    async def refresh(self, courses_collection: AsyncIOMotorCollection) -> int:
+        if self.last_synced_at is None:
+            query = {"synced_at": {"$exists": True}}
+        else:
+            query = {"synced_at": {"$gt": self.last_synced_at}}
+
+        num_refreshed = 0
+        async for course in courses_collection.find(query, SUGGESTION_PROJECTION):
+            self.add(course)
+            # The course may also be in the course cache
+            invalidate_course(course["_id"])
+            num_refreshed += 1
+
+        # Any cached search could now be missing these courses
+        if num_refreshed:
+            invalidate_search_results()
+
+        if self.num_dead > COMPACT_DEAD_FRACTION * len(self.suggestions):
+            self.compact()
+
+        return num_refreshed
+
+
+course_search_index = CourseSearchIndex()
+
+
+# Runs for the lifetime of the app, picking up courses added or updated by the ingestion job
+async def refresh_course_search_index(
+    courses_collection: AsyncIOMotorCollection,
+) -> None:
+    while True:
+        await asyncio.sleep(REFRESH_INTERVAL_SECONDS)
+        try:
+            num_refreshed = await course_search_index.refresh(courses_collection)
+            if num_refreshed:
+                logger.info("Refreshed %d courses for autocomplete", num_refreshed)
+        except Exception:
+            logger.exception("Failed to refresh the course search index")
@@ -0,0 +1,19 @@
+from bson import ObjectId
+
+from ...cache import AsyncLRUCache
+
+COURSE_CACHE_SIZE = 2048
+# Courses almost never change, and the ingestion job runs outside the API
+COURSE_CACHE_TTL_SECONDS = 60 * 60
+
+# Validated Course models keyed by the course's ObjectId
+course_cache = AsyncLRUCache(COURSE_CACHE_SIZE, ttl=COURSE_CACHE_TTL_SECONDS)
+
+
+# Call whenever a course document is changed so the next read gets the new version
+def invalidate_course(course_id: ObjectId) -> None:
+    course_cache.invalidate(ObjectId(course_id))
+
+
+def invalidate_all_courses() -> None:
+    course_cache.clear()
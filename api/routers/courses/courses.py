@@ -1,20 +1,98 @@
+import logging
+
 from bson import ObjectId
 from bson.errors import InvalidId
 from fastapi import APIRouter, Depends, HTTPException, Query
 from motor.motor_asyncio import AsyncIOMotorCollection
 from pymongo import UpdateOne
+from pymongo.errors import OperationFailure
 
 from ...db import get_collection
+from ...pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    after_cursor_query,
+    encode_cursor,
+)
 from ...utils import PyObjectId
-from .models import Course, SearchCourses
+from ..rounds.models import RoundsPage
+from .autocomplete import course_search_index
+from .course_cache import course_cache
+from .geo import course_location_index
+from .models import (
+    Course,
+    CourseSearchPage,
+    CourseStats,
+    CourseSuggestion,
+    CourseSummary,
+    NearbyCourse,
+    SearchCourses,
+)
+from .search_cache import normalize_search_name, search_cache
+from .stats import get_course_stats
+
+logger = logging.getLogger(__name__)
+
+COURSE_SUMMARY_PROJECTION = {
+    "name": 1,
+    "city": 1,
+    "state": 1,
+    "country": 1,
+    "num_holes": 1,
+    "par": 1,
+    "tee_boxes.tee": 1,
+}
 
 courses_router = APIRouter()
 
+DEFAULT_NEARBY_RADIUS_METERS = 25_000
+MAX_NEARBY_RADIUS_METERS = 200_000
+
+
+def to_course_summary(course: dict) -> CourseSummary:
+    tee_names = [tee_box["tee"] for tee_box in course.pop("tee_boxes", [])]
+    return CourseSummary(**course, tee_names=tee_names)
+
+
+# Returns None if no courses match
+async def find_courses_page(
+    name: str,
+    limit: int,
+    cursor: str | None,
+    courses_collection: AsyncIOMotorCollection,
+) -> CourseSearchPage | None:
+
+    query = {"$text": {"$search": f'"{name}"'}}
+    if cursor is not None:
+        query.update(after_cursor_query("name", cursor, 1))
+
+    # Sorted by (name, _id) so pages don't overlap or skip courses.
+    #   One extra course tells us if there's another page
+    courses = (
+        await courses_collection.find(query, COURSE_SUMMARY_PROJECTION)
+        .sort([("name", 1), ("_id", 1)])
+        .limit(limit + 1)
+        .to_list(None)
+    )
+
+    if not courses:
+        return None
+
+    next_cursor = None
+    if len(courses) > limit:
+        courses = courses[:limit]
+        next_cursor = encode_cursor(courses[-1]["name"], courses[-1]["_id"])
+
+    return CourseSearchPage(
+        courses=[to_course_summary(course) for course in courses],
+        next_cursor=next_cursor,
+    )
+
 
 @courses_router.post(
     "/search",
     response_description="Search for a course",
-    response_model=list[Course],
+    response_model=CourseSearchPage,
     response_model_by_alias=False,
 )
 async def search_courses(
@@ -22,12 +100,105 @@ async def search_courses(
     courses_collection: AsyncIOMotorCollection = Depends(get_collection("courses")),
 ):
 
-    query = {"$text": {"$search": f'"{course_search.name}"'}}
+    name = normalize_search_name(course_search.name)
 
-    # Return first 20 results
-    results = await courses_collection.find(query).to_list(length=20)
+    # Popular searches are served from the cache, and identical searches
+    #   that arrive together share one query
+    page = await search_cache.get_or_load(
+        (name, course_search.limit, course_search.cursor),
+        lambda: find_courses_page(
+            name, course_search.limit, course_search.cursor, courses_collection
+        ),
+    )
 
-    return results
+    return page if page is not None else CourseSearchPage(courses=[])
+
+
+@courses_router.get(
+    "/autocomplete",
+    response_model=list[CourseSuggestion],
+    description="Suggest courses as a course name, city or state is typed",
+    response_model_by_alias=False,
+)
+async def autocomplete_courses(
+    q: str = Query(..., min_length=2, max_length=100),
+    limit: int = Query(10, ge=1, le=20),
+):
+    return course_search_index.search(q, limit)
+
+
+@courses_router.get(
+    "/nearby",
+    response_model=list[NearbyCourse],
+    description="Get the courses near a point, nearest first",
+    response_model_by_alias=False,
+)
+async def get_nearby_courses(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    radius: float = Query(
+        DEFAULT_NEARBY_RADIUS_METERS,
+        gt=0,
+        le=MAX_NEARBY_RADIUS_METERS,
+        description="Search radius in meters",
+    ),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    courses_collection: AsyncIOMotorCollection = Depends(get_collection("courses")),
+):
+    # Served by the 2dsphere index on location, which $geoNear requires
+    pipeline = [
+        {
+            "$geoNear": {
+                "near": {"type": "Point", "coordinates": [lon, lat]},
+                "key": "location",
+                "distanceField": "distance",
+                "maxDistance": radius,
+                "spherical": True,
+            }
+        },
+        {"$limit": limit},
+        {"$project": {"name": 1, "city": 1, "state": 1, "country": 1, "distance": 1}},
+    ]
+
+    try:
+        return await courses_collection.aggregate(pipeline).to_list(None)
+    except OperationFailure:
+        logger.warning("$geoNear failed, using the in-memory location index")
+
+    await course_location_index.refresh_if_stale(courses_collection)
+    return course_location_index.nearby(lat, lon, radius, limit)
+
+
+# Get a course through the course cache, or None if it doesn't exist.
+#   Cached courses are shared between requests, so callers must not modify them
+async def get_cached_course(
+    course_object_id: ObjectId,
+    courses_collection: AsyncIOMotorCollection,
+) -> Course | None:
+
+    async def load_course() -> Course | None:
+        course = await courses_collection.find_one({"_id": course_object_id})
+        return Course(**course) if course is not None else None
+
+    return await course_cache.get_or_load(course_object_id, load_course)
+
+
+# Get many courses through the course cache, fetching the ones that aren't cached in one query.
+#   Courses that don't exist are left out
+async def get_cached_courses(
+    course_object_ids: set[ObjectId],
+    courses_collection: AsyncIOMotorCollection,
+) -> dict[ObjectId, Course]:
+
+    courses, missing_course_ids = course_cache.get_many(course_object_ids)
+    if missing_course_ids:
+        for course in await courses_collection.find(
+            {"_id": {"$in": missing_course_ids}}
+        ).to_list(None):
+            courses[course["_id"]] = Course(**course)
+            course_cache.set(course["_id"], courses[course["_id"]])
+
+    return courses
 
 
 async def get_course(
@@ -40,12 +211,12 @@ async def get_course(
     except InvalidId as exception:
         raise HTTPException(status_code=422, detail="Invalid Course ID") from exception
 
-    course = await courses_collection.find_one({"_id": course_object_id})
+    course = await get_cached_course(course_object_id, courses_collection)
 
     if course is None:
         raise HTTPException(status_code=404, detail="Course not found")
 
-    return Course(**course)
+    return course
 
 
 @courses_router.get(
@@ -59,3 +230,57 @@ async def get_course_api(
     courses_collection: AsyncIOMotorCollection = Depends(get_collection("courses")),
 ):
     return await get_course(ObjectId(course_id), courses_collection)
+
+
+@courses_router.get(
+    "/{course_id}/stats",
+    response_model=CourseStats,
+    description="Get a course's scoring averages, per-hole averages and recent low scores",
+)
+async def get_course_stats_api(
+    course_id: PyObjectId,
+    courses_collection: AsyncIOMotorCollection = Depends(get_collection("courses")),
+    course_stats_collection: AsyncIOMotorCollection = Depends(
+        get_collection("course_stats")
+    ),
+):
+    course = await get_course(course_id, courses_collection)
+
+    return await get_course_stats(course, course_stats_collection)
+
+
+@courses_router.get(
+    "/{course_id}/rounds",
+    response_model=RoundsPage,
+    description="Get the rounds played at a course, newest first",
+    response_model_by_alias=False,
+)
+async def get_course_rounds(
+    course_id: PyObjectId,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = Query(None, description="next_cursor of the previous page"),
+    rounds_collection: AsyncIOMotorCollection = Depends(get_collection("rounds")),
+):
+    try:
+        course_object_id = ObjectId(course_id)
+    except InvalidId as exception:
+        raise HTTPException(status_code=422, detail="Invalid Course ID") from exception
+
+    query = {"course_id": course_object_id}
+    if cursor is not None:
+        query.update(after_cursor_query("date_posted", cursor, -1))
+
+    # Served by the (course_id, date_posted, _id) index. One extra round tells us if there's another page
+    rounds = (
+        await rounds_collection.find(query)
+        .sort([("date_posted", -1), ("_id", -1)])
+        .limit(limit + 1)
+        .to_list(None)
+    )
+
+    next_cursor = None
+    if len(rounds) > limit:
+        rounds = rounds[:limit]
+        next_cursor = encode_cursor(rounds[-1]["date_posted"], rounds[-1]["_id"])
+
+    return RoundsPage(rounds=rounds, next_cursor=next_cursor)
@@ -0,0 +1,172 @@
+import re
+import time
+
+import numpy as np
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+from .models import NearbyCourse
+
+EARTH_RADIUS_METERS = 6_371_000
+
+# Points per leaf of the KD-tree, which are compared by brute force
+KD_TREE_LEAF_SIZE = 16
+# How long the fallback index is used before it's rebuilt from the database
+LOCATION_INDEX_TTL_SECONDS = 10 * 60
+
+NEARBY_COURSE_PROJECTION = {
+    "name": 1,
+    "city": 1,
+    "state": 1,
+    "country": 1,
+    "location": 1,
+}
+
+
+# Parse a "latitude, longitude" string into a GeoJSON point, or None if it isn't valid
+def parse_coordinates(coordinates: str | None) -> dict | None:
+    if not coordinates:
+        return None
+
+    numbers = re.findall(r"-?\d+(?:\.\d+)?", coordinates)
+    if len(numbers) != 2:
+        return None
+
+    latitude, longitude = float(numbers[0]), float(numbers[1])
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return None
+
+    # GeoJSON puts the longitude first
+    return {"type": "Point", "coordinates": [longitude, latitude]}
+
+
+# Points on the unit sphere, so straight-line distance increases with distance along the surface
+def to_unit_vectors(latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+    latitudes = np.radians(latitudes)
+    longitudes = np.radians(longitudes)
+
+    return np.column_stack(
+        (
+            np.cos(latitudes) * np.cos(longitudes),
+            np.cos(latitudes) * np.sin(longitudes),
+            np.sin(latitudes),
+        )
+    )
+
+
+def chord_to_meters(chord: np.ndarray) -> np.ndarray:
+    return 2 * np.arcsin(np.clip(chord / 2, 0, 1)) * EARTH_RADIUS_METERS
+
+
+def meters_to_chord(meters: float) -> float:
+    return 2 * np.sin(min(meters / EARTH_RADIUS_METERS, np.pi) / 2)
+
+
+# A static KD-tree over 3D points. The points are reordered so every subtree is a contiguous
+#   range whose middle point splits it along the axis with the largest spread
+class KDTree:
+    def __init__(self, points: np.ndarray):
+        self.order = np.arange(len(points))
+        self.points = points.copy()
+        self.split_axes = np.zeros(len(points), dtype=np.int8)
+        self._build(0, len(points))
+
+    def _build(self, start: int, end: int) -> None:
+        if end - start <= KD_TREE_LEAF_SIZE:
+            return
+
+        points = self.points[start:end]
+        axis = int(np.argmax(points.max(axis=0) - points.min(axis=0)))
+        middle = (end - start) // 2
+
+        partition = np.argpartition(points[:, axis], middle)
+        self.points[start:end] = points[partition]
+        self.order[start:end] = self.order[start:end][partition]
+        self.split_axes[start + middle] = axis
+
+        self._build(start, start + middle)
+        self._build(start + middle + 1, end)
+
+    # The indexes (into the original points) of the points within the radius, and their distances
+    def query_radius(
+        self, point: np.ndarray, radius: float
+    ) -> tuple[np.ndarray, np.ndarray]:
+        ranges = []
+        stack = [(0, len(self.points))]
+
+        while stack:
+            start, end = stack.pop()
+            if end - start <= KD_TREE_LEAF_SIZE:
+                ranges.append((start, end))
+                continue
+
+            middle = start + (end - start) // 2
+            axis = self.split_axes[middle]
+            difference = point[axis] - self.points[middle, axis]
+
+            ranges.append((middle, middle + 1))
+            # Only visit the far side if the splitting plane is within the radius
+            if difference <= radius:
+                stack.append((start, middle))
+            if difference >= -radius:
+                stack.append((middle + 1, end))
+
+        if not ranges:
+            return np.empty(0, dtype=int), np.empty(0)
+
+        candidates = np.concatenate([np.arange(start, end) for start, end in ranges])
+        distances = np.linalg.norm(self.points[candidates] - point, axis=1)
+        within = distances <= radius
+
+        return self.order[candidates[within]], distances[within]
+
+
+# Fallback for /courses/nearby when the database can't run the $geoNear query.
+#   Built from the courses' locations and rebuilt once it's older than the TTL
+class CourseLocationIndex:
+    def __init__(self):
+        self.courses: list[dict] = []
+        self.tree: KDTree | None = None
+        self.built_at: float | None = None
+
+    def build(self, courses: list[dict]) -> None:
+        self.courses = courses
+        longitudes = np.array([c["location"]["coordinates"][0] for c in courses])
+        latitudes = np.array([c["location"]["coordinates"][1] for c in courses])
+        self.tree = KDTree(to_unit_vectors(latitudes, longitudes))
+        self.built_at = time.monotonic()
+
+    def is_stale(self) -> bool:
+        return (
+            self.built_at is None
+            or time.monotonic() - self.built_at > LOCATION_INDEX_TTL_SECONDS
+        )
+
+    def nearby(
+        self, latitude: float, longitude: float, radius: float, limit: int
+    ) -> list[NearbyCourse]:
+        if not self.courses:
+            return []
+
+        point = to_unit_vectors(np.array([latitude]), np.array([longitude]))[0]
+        indexes, chords = self.tree.query_radius(point, meters_to_chord(radius))
+
+        nearest = np.argsort(chords)[:limit]
+        return [
+            NearbyCourse(
+                **self.courses[indexes[i]], distance=float(chord_to_meters(chords[i]))
+            )
+            for i in nearest
+        ]
+
+    async def refresh_if_stale(
+        self, courses_collection: AsyncIOMotorCollection
+    ) -> None:
+        if self.is_stale():
+            self.build(
+                await courses_collection.find(
+                    {"location": {"$exists": True}}, NEARBY_COURSE_PROJECTION
+                ).to_list(None)
+            )
+
+
+course_location_index = CourseLocationIndex()
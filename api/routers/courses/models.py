@@ -1,7 +1,9 @@
+from datetime import datetime
 from typing import Optional
 
 from pydantic import BaseModel, Field
 
+from ...pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 from ...utils import PyObjectId
 
 
@@ -24,11 +26,18 @@ class CourseHole(BaseModel):
     handicap: int
 
 
+# A GeoJSON point, [longitude, latitude]
+class GeoPoint(BaseModel):
+    type: str = "Point"
+    coordinates: list[float]
+
+
 class Course(BaseModel):
     id: Optional[PyObjectId] = Field(alias="_id", default=None)
     address: str
     city: str
     coordinates: str
+    location: Optional[GeoPoint] = None  # Parsed from coordinates
     country: str
     created_at: str
     fairway_grass: str
@@ -38,7 +47,6 @@ class Course(BaseModel):
     name: str
     par: int | None
     phone: str
-    rounds: list[PyObjectId]
     scorecard: list[CourseHole]
     state: str
     tee_boxes: list[TeeBox]
@@ -47,5 +55,57 @@ class Course(BaseModel):
     zip: str
 
 
+# Just enough of a course to show it as a search suggestion
+class CourseSuggestion(BaseModel):
+    id: PyObjectId = Field(alias="_id")
+    name: str
+    city: Optional[str] = None
+    state: Optional[str] = None
+    country: Optional[str] = None
+
+
+class NearbyCourse(CourseSuggestion):
+    distance: float  # Meters from the searched point
+
+
+# What list views need of a course. The full course is only returned from GET /courses/{id}
+class CourseSummary(CourseSuggestion):
+    num_holes: int
+    par: int | None
+    tee_names: list[str] = Field(default=[])
+
+
 class SearchCourses(BaseModel):
     name: str
+    limit: int = Field(default=DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+    cursor: Optional[str] = None  # next_cursor of the previous page
+
+
+class CourseSearchPage(BaseModel):
+    courses: list[CourseSummary]
+    next_cursor: Optional[str] = None  # Pass back as the cursor to get the next page
+
+
+class HoleStats(BaseModel):
+    hole_number: int
+    par: int
+    num_rounds: int  # Rounds with hole by hole scores
+    scoring_average: float | None
+    average_over_par: float | None
+
+
+class LeaderboardEntry(BaseModel):
+    round_id: PyObjectId
+    user_id: PyObjectId
+    score: int
+    to_par: int
+    date_posted: datetime
+
+
+class CourseStats(BaseModel):
+    num_rounds: int
+    scoring_average: float | None
+    average_to_par: float | None
+    holes: list[HoleStats]
+    # The lowest scores posted recently, lowest first
+    leaderboard: list[LeaderboardEntry]
@@ -0,0 +1,24 @@
+from ...cache import AsyncLRUCache
+
+SEARCH_CACHE_SIZE = 1024
+SEARCH_CACHE_TTL_SECONDS = 5 * 60
+# Searches with no results are cached for less time, so new courses show up sooner
+NEGATIVE_SEARCH_CACHE_TTL_SECONDS = 60
+
+# Pages of search results keyed by the normalized search, page size and cursor.
+#   Searches with no results are cached as None
+search_cache = AsyncLRUCache(
+    SEARCH_CACHE_SIZE,
+    ttl=SEARCH_CACHE_TTL_SECONDS,
+    negative_ttl=NEGATIVE_SEARCH_CACHE_TTL_SECONDS,
+)
+
+
+# Searches that differ only in case or spacing share a cache entry
+def normalize_search_name(name: str) -> str:
+    return " ".join(name.casefold().split())
+
+
+# Call whenever courses are added or changed, since any cached search could now be out of date
+def invalidate_search_results() -> None:
+    search_cache.clear()
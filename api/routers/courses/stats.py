@@ -0,0 +1,217 @@
+from datetime import datetime, timedelta, timezone
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+from ...write_behind import WriteBehindBuffer
+from ..rounds.models import ScorecardModeEnum
+from ..users.stats import get_total_score
+from ..users.timeline import to_naive_utc
+from .models import Course, CourseStats, HoleStats, LeaderboardEntry
+
+LEADERBOARD_SIZE = 10
+# The leaderboard shows the lowest scores from this many days, today included
+LEADERBOARD_DAYS = 30
+# Adding a round removes the course's month leaderboards from this many months before its
+#   window. Ones left by a course without rounds for longer are removed by a stats rebuild
+LEADERBOARD_PRUNE_MONTHS = 12
+
+# A course's stats are running sums and counts, plus the lowest scores of each day,
+#   kept in one document per course. Only ever changed with $inc, $push and $unset,
+#   so a popular course's updates are merged into one write per flush and rounds
+#   are never rescanned
+course_stats_buffer = WriteBehindBuffer("course_stats")
+
+
+# Leaderboards are kept per UTC day and grouped by month, e.g. "leaderboards.2024-06.03".
+#   The leaderboard is made of whole days, so the lowest scores of each day are all it needs
+def get_leaderboard_field(date: datetime) -> str:
+    return f"leaderboards.{to_naive_utc(date).strftime('%Y-%m.%d')}"
+
+
+# The days on the leaderboard at the given time, today first
+def get_leaderboard_days(now: datetime) -> list[datetime]:
+    today = to_naive_utc(now).replace(hour=0, minute=0, second=0, microsecond=0)
+    return [today - timedelta(days=days_ago) for days_ago in range(LEADERBOARD_DAYS)]
+
+
+def is_on_leaderboard(date: datetime, now: datetime) -> bool:
+    return to_naive_utc(date) >= get_leaderboard_days(now)[-1]
+
+
+# The month leaderboards a round on the given date removes. They're well before the window
+#   of any round that can still be buffered with it, so never one that round is pushed to
+def get_stale_leaderboard_fields(date: datetime) -> list[str]:
+    oldest_kept = to_naive_utc(date) - timedelta(days=2 * LEADERBOARD_DAYS)
+    months = oldest_kept.year * 12 + oldest_kept.month - 1
+
+    return [
+        f"leaderboards.{(months - n) // 12:04d}-{(months - n) % 12 + 1:02d}"
+        for n in range(1, LEADERBOARD_PRUNE_MONTHS + 1)
+    ]
+
+
+# Push entries onto a leaderboard, keeping only the lowest scores (earliest first on ties)
+def get_leaderboard_push(entries: list[dict]) -> dict:
+    return {
+        "$each": entries,
+        "$sort": {"score": 1, "date_posted": 1},
+        "$slice": LEADERBOARD_SIZE,
+    }
+
+
+# The changes a round makes to its course's stats, as $inc fields.
+#   A sign of -1 gives the changes that remove the round again
+def get_course_stats_increments(
+    scorecard: dict[str, int],
+    scorecard_mode: ScorecardModeEnum,
+    course: Course,
+    sign: int = 1,
+) -> dict[str, int]:
+    total_score = get_total_score(scorecard)
+    course_par = sum(hole.par for hole in course.scorecard)
+
+    increments = {
+        "num_rounds": sign,
+        "strokes": sign * total_score,
+        "to_par": sign * (total_score - course_par),
+    }
+
+    if scorecard_mode == ScorecardModeEnum.all_holes:
+        for hole in course.scorecard:
+            increments[f"holes.{hole.hole_number}.num_rounds"] = sign
+            increments[f"holes.{hole.hole_number}.strokes"] = (
+                sign * scorecard[str(hole.hole_number)]
+            )
+
+    return increments
+
+
+def get_leaderboard_entry(
+    round_id: ObjectId,
+    user_id: ObjectId,
+    scorecard: dict[str, int],
+    course: Course,
+    date_posted: datetime,
+) -> dict:
+    total_score = get_total_score(scorecard)
+    return {
+        "round_id": round_id,
+        "user_id": user_id,
+        "score": total_score,
+        "to_par": total_score - sum(hole.par for hole in course.scorecard),
+        "date_posted": to_naive_utc(date_posted),
+    }
+
+
+def add_round_to_course_stats(
+    round_id: ObjectId,
+    user_id: ObjectId,
+    scorecard: dict[str, int],
+    scorecard_mode: ScorecardModeEnum,
+    course: Course,
+    date_posted: datetime,
+) -> None:
+    update = {"$inc": get_course_stats_increments(scorecard, scorecard_mode, course)}
+
+    # Older rounds, e.g. imported ones, can't be on the leaderboard
+    if is_on_leaderboard(date_posted, datetime.now(tz=timezone.utc)):
+        update["$push"] = {
+            get_leaderboard_field(date_posted): get_leaderboard_push(
+                [
+                    get_leaderboard_entry(
+                        round_id, user_id, scorecard, course, date_posted
+                    )
+                ]
+            )
+        }
+        update["$unset"] = {
+            field: "" for field in get_stale_leaderboard_fields(date_posted)
+        }
+
+    course_stats_buffer.update(ObjectId(course.id), update)
+
+
+# Take a round's original scores back out of its course's stats, e.g. before it's updated.
+#   A score that was pushed off its day's leaderboard by this round doesn't come back
+#   until the stats are rebuilt
+async def remove_round_from_course_stats(
+    round_id: ObjectId,
+    scorecard: dict[str, int],
+    scorecard_mode: ScorecardModeEnum,
+    course: Course,
+    date_posted: datetime,
+) -> None:
+    course_stats_buffer.update(
+        ObjectId(course.id),
+        {
+            "$inc": get_course_stats_increments(
+                scorecard, scorecard_mode, course, sign=-1
+            )
+        },
+    )
+
+    if is_on_leaderboard(date_posted, datetime.now(tz=timezone.utc)):
+        # Pulled through the buffer, so it can't run before the round's entry is written
+        await course_stats_buffer.pull(
+            ObjectId(course.id),
+            get_leaderboard_field(date_posted),
+            {"round_id": round_id},
+        )
+
+
+def to_course_stats(course_stats: dict, course: Course, now: datetime) -> CourseStats:
+    num_rounds = course_stats.get("num_rounds", 0)
+    hole_sums = course_stats.get("holes", {})
+
+    holes = []
+    for hole in course.scorecard:
+        hole_sum = hole_sums.get(str(hole.hole_number), {})
+        hole_rounds = hole_sum.get("num_rounds", 0)
+        scoring_average = hole_sum["strokes"] / hole_rounds if hole_rounds else None
+        holes.append(
+            HoleStats(
+                hole_number=hole.hole_number,
+                par=hole.par,
+                num_rounds=hole_rounds,
+                scoring_average=scoring_average,
+                average_over_par=(
+                    scoring_average - hole.par if scoring_average is not None else None
+                ),
+            )
+        )
+
+    leaderboards = course_stats.get("leaderboards", {})
+    entries = [
+        entry
+        for day in get_leaderboard_days(now)
+        for entry in leaderboards.get(day.strftime("%Y-%m"), {}).get(
+            day.strftime("%d"), []
+        )
+    ]
+    entries.sort(key=lambda entry: (entry["score"], entry["date_posted"]))
+
+    return CourseStats(
+        num_rounds=num_rounds,
+        scoring_average=course_stats["strokes"] / num_rounds if num_rounds else None,
+        average_to_par=course_stats["to_par"] / num_rounds if num_rounds else None,
+        holes=holes,
+        leaderboard=[LeaderboardEntry(**entry) for entry in entries[:LEADERBOARD_SIZE]],
+    )
+
+
+async def get_course_stats(
+    course: Course, course_stats_collection: AsyncIOMotorCollection
+) -> CourseStats:
+    now = datetime.now(tz=timezone.utc)
+
+    # Only the days on the leaderboard are read
+    leaderboard_fields = {
+        get_leaderboard_field(day): 1 for day in get_leaderboard_days(now)
+    }
+    course_stats = await course_stats_collection.find_one(
+        {"_id": ObjectId(course.id)},
+        {"num_rounds": 1, "strokes": 1, "to_par": 1, "holes": 1, **leaderboard_fields},
+    )
+
+    return to_course_stats(course_stats or {}, course, now)
@@ -0,0 +1,128 @@
+import csv
+import io
+import json
+from typing import AsyncIterator
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+from ...utils import encode_bson_value
+from ..courses.courses import get_cached_course
+from ..users.stats import get_total_score
+
+# Rounds fetched from the database per round trip, and written per response chunk
+EXPORT_BATCH_SIZE = 500
+
+EXPORT_ROUND_PROJECTION = {
+    "course_id": 1,
+    "tee_box_index": 1,
+    "caption": 1,
+    "scorecard_mode": 1,
+    "scorecard": 1,
+    "score_differential": 1,
+    "pcc_adjustment": 1,
+    "date_posted": 1,
+}
+
+MAX_HOLES = 18
+CSV_COLUMNS = [
+    "id",
+    "date_posted",
+    "course_id",
+    "course_name",
+    "tee_box_index",
+    "scorecard_mode",
+    "total_score",
+    "front",
+    "back",
+    *(f"hole_{hole_number}" for hole_number in range(1, MAX_HOLES + 1)),
+    "score_differential",
+    "pcc_adjustment",
+    "caption",
+]
+
+
+# Stream a user's rounds oldest first, each with the name of its course.
+#   Only one batch of rounds is held in memory at a time
+async def stream_user_rounds(
+    user_object_id: ObjectId,
+    rounds_collection: AsyncIOMotorCollection,
+    courses_collection: AsyncIOMotorCollection,
+) -> AsyncIterator[dict]:
+    cursor = (
+        rounds_collection.find({"user_id": user_object_id}, EXPORT_ROUND_PROJECTION)
+        .sort([("date_posted", 1), ("_id", 1)])
+        .batch_size(EXPORT_BATCH_SIZE)
+    )
+
+    # Golfers play a handful of courses over and over, so names are looked up once each
+    course_names: dict[ObjectId, str | None] = {}
+
+    async for golf_round in cursor:
+        course_id = golf_round["course_id"]
+        if course_id not in course_names:
+            course = await get_cached_course(course_id, courses_collection)
+            course_names[course_id] = course.name if course is not None else None
+
+        yield {
+            "id": golf_round.pop("_id"),
+            **golf_round,
+            "course_name": course_names[course_id],
+        }
+
+
+async def export_rounds_as_ndjson(rounds: AsyncIterator[dict]) -> AsyncIterator[str]:
+    lines = []
+    async for golf_round in rounds:
+        lines.append(json.dumps(golf_round, default=encode_bson_value) + "\n")
+
+        if len(lines) >= EXPORT_BATCH_SIZE:
+            yield "".join(lines)
+            lines = []
+
+    if lines:
+        yield "".join(lines)
+
+
+def to_csv_row(golf_round: dict) -> dict:
+    scorecard = golf_round.get("scorecard", {})
+    hole_scores = {
+        f"hole_{hole_number}": score
+        for hole_number, score in scorecard.items()
+        if hole_number.isdigit()
+    }
+
+    return {
+        "id": str(golf_round["id"]),
+        "date_posted": golf_round["date_posted"].isoformat(),
+        "course_id": str(golf_round["course_id"]),
+        "course_name": golf_round["course_name"],
+        "tee_box_index": golf_round.get("tee_box_index"),
+        "scorecard_mode": golf_round["scorecard_mode"],
+        "total_score": get_total_score(scorecard),
+        "front": scorecard.get("front"),
+        "back": scorecard.get("back"),
+        **hole_scores,
+        "score_differential": golf_round["score_differential"],
+        "pcc_adjustment": golf_round.get("pcc_adjustment", 0),
+        "caption": golf_round.get("caption"),
+    }
+
+
+async def export_rounds_as_csv(rounds: AsyncIterator[dict]) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_COLUMNS)
+    writer.writeheader()
+
+    num_buffered = 0
+    async for golf_round in rounds:
+        writer.writerow(to_csv_row(golf_round))
+        num_buffered += 1
+
+        if num_buffered >= EXPORT_BATCH_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            num_buffered = 0
+
+    yield buffer.getvalue()
@@ -0,0 +1,73 @@
+import csv
+import io
+import json
+
+from fastapi import HTTPException
+from fastapi.exceptions import RequestValidationError
+from pydantic import TypeAdapter, ValidationError
+
+from .export import MAX_HOLES
+from .models import ImportRound, ScorecardModeEnum
+
+MAX_IMPORT_ROUNDS = 1000
+
+import_rounds_adapter = TypeAdapter(list[ImportRound])
+
+
+# Turn a row of a CSV in the export's format back into a round. Empty cells are left out,
+#   so a missing score is reported by the scorecard validation
+def from_csv_row(row: dict[str, str]) -> dict:
+    scorecard_mode = row.get("scorecard_mode")
+
+    if scorecard_mode == ScorecardModeEnum.front_and_back:
+        scorecard = {"front": row.get("front"), "back": row.get("back")}
+    elif scorecard_mode == ScorecardModeEnum.total_score:
+        scorecard = {"total": row.get("total_score")}
+    else:
+        scorecard = {
+            str(hole_number): row.get(f"hole_{hole_number}")
+            for hole_number in range(1, MAX_HOLES + 1)
+        }
+
+    return {
+        "id": row.get("id") or None,
+        "course_id": row.get("course_id"),
+        "tee_box_index": row.get("tee_box_index") or None,
+        "caption": row.get("caption") or None,
+        "scorecard_mode": scorecard_mode,
+        "scorecard": {hole: score for hole, score in scorecard.items() if score},
+        "date_posted": row.get("date_posted"),
+    }
+
+
+# Parse an import sent as a JSON array of rounds or as a CSV
+def parse_import_rounds(content_type: str, body: bytes) -> list[ImportRound]:
+    try:
+        if content_type.startswith("text/csv"):
+            rows = [
+                from_csv_row(row)
+                for row in csv.DictReader(io.StringIO(body.decode("utf-8-sig")))
+            ]
+        elif content_type.startswith("application/json"):
+            rows = json.loads(body)
+        else:
+            raise HTTPException(
+                status_code=415,
+                detail="Rounds must be imported as application/json or text/csv",
+            )
+    except (UnicodeDecodeError, json.JSONDecodeError, csv.Error) as exception:
+        raise HTTPException(
+            status_code=400, detail=f"Could not parse the import: {exception}"
+        )
+
+    if isinstance(rows, list) and len(rows) > MAX_IMPORT_ROUNDS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Cannot import more than {MAX_IMPORT_ROUNDS} rounds at once",
+        )
+
+    try:
+        return import_rounds_adapter.validate_python(rows)
+    except ValidationError as exception:
+        # Reported the same way as an invalid request body
+        raise RequestValidationError(exception.errors(include_url=False))
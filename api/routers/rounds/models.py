@@ -2,10 +2,11 @@ from datetime import datetime
 from enum import Enum
 from typing import Annotated, Optional
 
-from pydantic import BaseModel, Field, model_validator
+from bson import ObjectId
+from pydantic import BaseModel, Field, field_validator, model_validator
 
 from ...utils import PyObjectId
-from ..courses.models import Course
+from ..courses.models import Course, CourseHole, TeeBox
 
 ScoreRange = Annotated[int, Field(gt=0)]
 RoundScorecard = dict[str, ScoreRange]
@@ -17,6 +18,11 @@ class ScorecardModeEnum(str, Enum):
     total_score = "total-score"
 
 
+class ExportFormatEnum(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+
 class PostRound(BaseModel):
     user_id: PyObjectId
     course_id: PyObjectId
@@ -26,6 +32,27 @@ class PostRound(BaseModel):
     scorecard: RoundScorecard
 
 
+# A past round from a bulk import. The date it was played is kept as its date_posted,
+#   the same as in an export, so exported rounds can be imported again
+class ImportRound(BaseModel):
+    # The round's ID when it comes from an export. Rounds the user already has are skipped
+    id: Optional[PyObjectId] = None
+    course_id: PyObjectId
+    tee_box_index: Optional[int] = None
+    caption: Optional[str] = None
+    scorecard_mode: ScorecardModeEnum
+    scorecard: RoundScorecard
+    date_posted: datetime
+
+    # Imports aren't checked one ID at a time, so malformed IDs are reported with the rest
+    @field_validator("id", "course_id")
+    @classmethod
+    def check_object_id(cls, value: Optional[str]) -> Optional[str]:
+        if value is not None and not ObjectId.is_valid(value):
+            raise ValueError("Invalid ID")
+        return value
+
+
 class Round(BaseModel):
     id: Optional[PyObjectId] = Field(alias="_id", default=None)
     user_id: PyObjectId
@@ -37,8 +64,39 @@ class Round(BaseModel):
     scorecard_mode: ScorecardModeEnum
     scorecard: RoundScorecard
     score_differential: float
+    # Playing Conditions Calculation adjustment applied to the score differential
+    pcc_adjustment: float = 0
     date_posted: datetime
 
 
 class GetRound(Round):
     course: Optional[Course] = None  # Course data associated with the course_id
+
+
+# The fields of a course shown alongside a round
+class RoundCourse(BaseModel):
+    id: PyObjectId
+    name: str
+    num_holes: int
+    length_format: str
+    par: int | None
+    # Holes only include the tee the round was played from unless all tees are requested
+    scorecard: list[CourseHole]
+    tee_boxes: list[TeeBox]
+
+
+# A round as returned from GET /rounds
+class RoundWithCourse(Round):
+    course: Optional[RoundCourse] = None
+
+
+# A page of rounds from a keyset paginated endpoint
+class RoundsPage(BaseModel):
+    rounds: list[Round]
+    next_cursor: Optional[str] = None  # Pass back as the cursor to get the next page
+
+
+# A page of a user's rounds, newest first
+class UserRoundsPage(BaseModel):
+    rounds: list[RoundWithCourse]
+    next_cursor: Optional[str] = None  # Pass back as before to get the next page
@@ -0,0 +1,37 @@
+from datetime import datetime, timezone
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+from ...utils import PyObjectId
+
+
+# Playing Conditions Calculations are per course per UTC day
+def get_pcc_day(date: datetime) -> datetime:
+    if date.tzinfo is not None:
+        date = date.astimezone(timezone.utc).replace(tzinfo=None)
+    return datetime(date.year, date.month, date.day)
+
+
+# Get the PCC adjustments for many (course ID, PCC day) pairs in one query, 0 where there isn't one
+async def get_pcc_adjustments(
+    keys: set[tuple[PyObjectId, datetime]],
+    pcc_adjustments_collection: AsyncIOMotorCollection,
+) -> dict[tuple[PyObjectId, datetime], float]:
+    pcc_adjustments = {key: 0 for key in keys}
+    if not keys:
+        return pcc_adjustments
+
+    # Matches every combination of the courses and days, so only the requested pairs are kept
+    async for pcc_document in pcc_adjustments_collection.find(
+        {
+            "course_id": {"$in": list({ObjectId(course_id) for course_id, _ in keys})},
+            "date": {"$in": list({day for _, day in keys})},
+        },
+        {"course_id": 1, "date": 1, "adjustment": 1},
+    ):
+        key = (str(pcc_document["course_id"]), pcc_document["date"])
+        if key in pcc_adjustments:
+            pcc_adjustments[key] = pcc_document["adjustment"]
+
+    return pcc_adjustments
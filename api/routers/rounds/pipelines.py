@@ -0,0 +1,138 @@
+from bson import ObjectId
+
+# Rounds as their JSON response, so the output can be sent without being validated again
+ROUND_RESPONSE_PROJECTION = {
+    "_id": 0,
+    "id": {"$toString": "$_id"},
+    "user_id": {"$toString": "$user_id"},
+    "course_id": {"$toString": "$course_id"},
+    "tee_box_index": {"$ifNull": ["$tee_box_index", None]},
+    "caption": {"$ifNull": ["$caption", None]},
+    "scorecard_mode": 1,
+    "scorecard": 1,
+    "score_differential": 1,
+    "pcc_adjustment": {"$ifNull": ["$pcc_adjustment", 0]},
+    "date_posted": 1,
+}
+
+# The course fields shown alongside a round
+ROUND_COURSE_PROJECTION = {
+    "_id": 0,
+    "id": {"$toString": "$_id"},
+    "name": 1,
+    "num_holes": 1,
+    "length_format": 1,
+    "par": 1,
+    "tee_boxes": 1,
+}
+
+# Each hole without its per-tee data, except for the tee the round was played from
+ROUND_COURSE_HOLES = {
+    "$map": {
+        "input": "$scorecard",
+        "as": "hole",
+        "in": {
+            "hole_number": "$$hole.hole_number",
+            "par": "$$hole.par",
+            "handicap": "$$hole.handicap",
+            "tees": {
+                "$arrayToObject": {
+                    "$filter": {
+                        "input": {"$objectToArray": "$$hole.tees"},
+                        "cond": {"$eq": ["$$this.k", "$$tee_key"]},
+                    }
+                }
+            },
+        },
+    }
+}
+
+
+# Join each round with the fields of its course the UI needs
+def get_round_course_lookup_stages(include_hole_tees: bool) -> list[dict]:
+    return [
+        {
+            "$lookup": {
+                "from": "courses",
+                "let": {
+                    "course_id": "$course_id",
+                    # Holes key their tees as teeBox1, teeBox2, ...
+                    "tee_key": {
+                        "$concat": [
+                            "teeBox",
+                            {
+                                "$toString": {
+                                    "$add": [{"$ifNull": ["$tee_box_index", -1]}, 1]
+                                }
+                            },
+                        ]
+                    },
+                },
+                "pipeline": [
+                    {"$match": {"$expr": {"$eq": ["$_id", "$$course_id"]}}},
+                    {
+                        "$project": {
+                            **ROUND_COURSE_PROJECTION,
+                            "scorecard": (
+                                1 if include_hole_tees else ROUND_COURSE_HOLES
+                            ),
+                        }
+                    },
+                ],
+                "as": "course",
+            }
+        },
+        {"$unwind": {"path": "$course", "preserveNullAndEmptyArrays": True}},
+    ]
+
+
+# Shape rounds (and their courses, if joined) into their JSON response
+def get_round_response_stage(retrieve_course_data: bool) -> dict:
+    return {
+        "$project": {
+            **ROUND_RESPONSE_PROJECTION,
+            **({"course": 1} if retrieve_course_data else {}),
+        }
+    }
+
+
+# Rounds by ID, joined with the fields of their courses the UI needs
+def get_rounds_pipeline(
+    object_ids: list[ObjectId],
+    direction: int | None,
+    retrieve_course_data: bool,
+    include_hole_tees: bool,
+) -> list[dict]:
+    pipeline: list[dict] = [{"$match": {"_id": {"$in": object_ids}}}]
+
+    if direction is not None:
+        pipeline.append({"$sort": {"date_posted": direction}})
+
+    if retrieve_course_data:
+        pipeline += get_round_course_lookup_stages(include_hole_tees)
+
+    pipeline.append(get_round_response_stage(retrieve_course_data))
+
+    return pipeline
+
+
+# A page of a user's rounds, newest first. Served by the (user_id, date_posted, _id) index,
+#   and courses are only joined for the rounds on the page
+def get_user_rounds_pipeline(
+    query: dict,
+    limit: int,
+    retrieve_course_data: bool,
+    include_hole_tees: bool,
+) -> list[dict]:
+    pipeline: list[dict] = [
+        {"$match": query},
+        {"$sort": {"date_posted": -1, "_id": -1}},
+        {"$limit": limit},
+    ]
+
+    if retrieve_course_data:
+        pipeline += get_round_course_lookup_stages(include_hole_tees)
+
+    pipeline.append(get_round_response_stage(retrieve_course_data))
+
+    return pipeline
@@ -1,19 +1,58 @@
+import asyncio
 from datetime import datetime, timezone
 
 from bson import ObjectId
 from bson.errors import InvalidId
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, status
-from motor.motor_asyncio import AsyncIOMotorCollection
-
-from ...db import get_collection
-from ...utils import PyObjectId
-from ..courses.courses import Course, get_course
-from ..users.handicap import calculate_handicap, calculate_score_differential
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from motor.motor_asyncio import (
+    AsyncIOMotorClientSession,
+    AsyncIOMotorCollection,
+    AsyncIOMotorDatabase,
+)
+from pymongo import ReturnDocument, UpdateOne
+
+from ...db import get_collection, run_in_transaction
+from ...pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    after_cursor_query,
+    encode_cursor,
+)
+from ...utils import PyObjectId, bson_json_response
+from ...work_queue import OutboxWorkQueue
+from ..courses.courses import Course, get_cached_courses, get_course
+from ..courses.stats import add_round_to_course_stats, remove_round_from_course_stats
+from ..users.handicap import (
+    HANDICAP_WINDOW_SIZE,
+    MIN_ROUNDS_FOR_HANDICAP,
+    calculate_handicap,
+    calculate_score_differential,
+    recalculate_handicap_history,
+)
 from ..users.models import HandicapData
+from ..users.stats import add_round_to_user_stats
+from ..users.timeline import HandicapTimeline, to_naive_utc
 from ..users.users import User, get_user
-from .models import GetRound, PostRound, Round, RoundScorecard, ScorecardModeEnum
+from .export import export_rounds_as_csv, export_rounds_as_ndjson, stream_user_rounds
+from .imports import parse_import_rounds
+from .models import (
+    ExportFormatEnum,
+    GetRound,
+    ImportRound,
+    PostRound,
+    Round,
+    RoundScorecard,
+    RoundWithCourse,
+    ScorecardModeEnum,
+    UserRoundsPage,
+)
+from .pcc import get_pcc_adjustments, get_pcc_day
+from .pipelines import get_rounds_pipeline, get_user_rounds_pipeline
 
 rounds_router = APIRouter()
+# Routes under /users for a user's rounds
+user_rounds_router = APIRouter()
 
 
 async def verify_and_get_user(
@@ -28,17 +67,18 @@ async def verify_and_get_course(
     courses_collection: AsyncIOMotorCollection = Depends(get_collection("courses")),
 ) -> Course:
     course = await get_course(post_round.course_id, courses_collection)
+    validate_tee_box_index(post_round.tee_box_index, course)
+
+    return course
 
-    tee_box_index = post_round.tee_box_index
 
+def validate_tee_box_index(tee_box_index: int | None, course: Course) -> None:
     if tee_box_index is not None:
         if tee_box_index < 0 or tee_box_index >= len(course.tee_boxes):
             raise HTTPException(
                 status_code=400, detail="Provided tee box index is out of range"
             )
 
-    return course
-
 
 async def verify_and_get_round(
     round_id: PyObjectId,
@@ -89,6 +129,29 @@ def validate_scorecard(
         )
 
 
+# Only the user's current handicap is needed to post a round
+POST_ROUND_USER_PROJECTION = {"_id": 1, "handicap_data": {"$slice": -1}}
+
+
+async def get_current_user_handicap(
+    user_id: PyObjectId, users_collection: AsyncIOMotorCollection
+) -> float | None:
+    try:
+        user_object_id = ObjectId(user_id)
+    except InvalidId as exception:
+        raise HTTPException(status_code=422, detail="Invalid User ID") from exception
+
+    user = await users_collection.find_one(
+        {"_id": user_object_id}, POST_ROUND_USER_PROJECTION
+    )
+
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    handicap_data = user.get("handicap_data")
+    return handicap_data[-1]["handicap"] if handicap_data else None
+
+
 @rounds_router.post(
     "/",
     response_description="Post a new round",
@@ -96,24 +159,23 @@ def validate_scorecard(
 )
 async def post_round(
     post_round: PostRound,
-    background_tasks: BackgroundTasks,
     users_collection: AsyncIOMotorCollection = Depends(get_collection("users")),
     courses_collection: AsyncIOMotorCollection = Depends(get_collection("courses")),
     rounds_collection: AsyncIOMotorCollection = Depends(get_collection("rounds")),
-    user: User = Depends(
-        verify_and_get_user
-    ),  # Ensure the user ID provided actually exists
-    course: Course = Depends(
-        verify_and_get_course
-    ),  # Ensure the course ID provided actually exists
 ) -> dict:
 
-    validate_scorecard(
-        post_round.scorecard_mode, post_round.scorecard, course.num_holes
+    date_posted = datetime.now(tz=timezone.utc)
+
+    # The lookups don't depend on each other, so they're made concurrently.
+    #   Getting the user and course also ensures the IDs provided actually exist
+    current_user_handicap, course = await asyncio.gather(
+        get_current_user_handicap(post_round.user_id, users_collection),
+        get_course(post_round.course_id, courses_collection),
     )
 
-    current_user_handicap = (
-        user.handicap_data[-1].handicap if user.handicap_data else None
+    validate_tee_box_index(post_round.tee_box_index, course)
+    validate_scorecard(
+        post_round.scorecard_mode, post_round.scorecard, course.num_holes
     )
 
     score_differential = calculate_score_differential(
@@ -124,10 +186,10 @@ async def post_round(
         current_user_handicap,
     )
 
-    date_posted = datetime.now(tz=timezone.utc)
-
+    # No PCC adjustment is posted with the round: the PCC job only calculates a day once it's
+    #   over, then applies the day's adjustment to its rounds and recomputes their handicaps
     finalized_round = Round(
-        user_id=user.id,
+        user_id=post_round.user_id,
         course_id=course.id,
         tee_box_index=post_round.tee_box_index,
         caption=post_round.caption,
@@ -137,79 +199,80 @@ async def post_round(
         date_posted=date_posted,
     ).model_dump(exclude=["id"])
 
-    # Convert string IDs to ObjectId
-    finalized_round["user_id"] = ObjectId(user.id)
+    # Convert string IDs to ObjectId. The round's ID is set here so a retried
+    #   transaction inserts the same round
+    finalized_round["_id"] = ObjectId()
+    finalized_round["user_id"] = ObjectId(post_round.user_id)
     finalized_round["course_id"] = ObjectId(course.id)
 
-    # Add the round to the rounds collection
-    insert_round_result = await rounds_collection.insert_one(finalized_round)
-
-    background_tasks.add_task(
-        update_user_after_post,
-        user.id,
-        user.rounds,
-        PyObjectId(insert_round_result.inserted_id),
-        date_posted,
-        users_collection,
-        rounds_collection,
+    # The round, the user's rounds list and their handicap are written together
+    await run_in_transaction(
+        lambda session: insert_round_and_update_user(
+            finalized_round, users_collection, rounds_collection, session
+        )
     )
 
-    background_tasks.add_task(
-        update_course_after_post,
-        course.id,
-        PyObjectId(insert_round_result.inserted_id),
-        courses_collection,
+    add_round_to_user_stats(
+        finalized_round["user_id"],
+        post_round.scorecard,
+        post_round.scorecard_mode,
+        course,
+    )
+    add_round_to_course_stats(
+        finalized_round["_id"],
+        finalized_round["user_id"],
+        post_round.scorecard,
+        post_round.scorecard_mode,
+        course,
+        date_posted,
     )
 
     return {"detail": "success"}
 
 
-# Update the user's rounds list and handicap data after they post a round
-async def update_user_after_post(
-    user_id: PyObjectId,
-    user_round_ids: list[PyObjectId],
-    inserted_round_id: PyObjectId,
-    date_posted: datetime,
+# Add the round to the rounds collection, then update the user's rounds list and handicap data
+async def insert_round_and_update_user(
+    finalized_round: dict,
     users_collection: AsyncIOMotorCollection,
     rounds_collection: AsyncIOMotorCollection,
+    session: AsyncIOMotorClientSession | None = None,
 ) -> None:
 
-    new_round_ids = user_round_ids + [inserted_round_id]
+    await rounds_collection.insert_one(finalized_round, session=session)
+
+    # Add the round, and add its score differential to the rolling window
+    #   of the user's most recent score differentials
+    user = await users_collection.find_one_and_update(
+        {"_id": finalized_round["user_id"]},
+        {
+            "$push": {
+                "rounds": finalized_round["_id"],
+                "recent_score_differentials": {
+                    "$each": [finalized_round["score_differential"]],
+                    "$slice": -HANDICAP_WINDOW_SIZE,
+                },
+            }
+        },
+        projection={"recent_score_differentials": 1},
+        return_document=ReturnDocument.AFTER,
+        session=session,
+    )
 
-    push_query = {"rounds": {"$each": [ObjectId(inserted_round_id)]}}
+    recent_score_differentials = user["recent_score_differentials"]
 
     # Calculate the new handicap if there are at least 3 scores (required by USGA)
-    if len(new_round_ids) >= 3:
-        rounds = await get_rounds(
-            ids=new_round_ids,
-            retrieve_course_data=False,
-            rounds_collection=rounds_collection,
-        )
-        new_handicap = calculate_handicap(
-            [golf_round.score_differential for golf_round in rounds]
-        )
+    if len(recent_score_differentials) >= MIN_ROUNDS_FOR_HANDICAP:
+        new_handicap = calculate_handicap(recent_score_differentials)
 
         handicap_data = HandicapData(
-            handicap=new_handicap, date=date_posted
+            handicap=new_handicap, date=finalized_round["date_posted"]
         ).model_dump()
 
-        push_query["handicap_data"] = {"$each": [handicap_data]}
-
-    await users_collection.update_one(
-        {"_id": ObjectId(user_id)},
-        {"$push": push_query},
-    )
-
-
-async def update_course_after_post(
-    course_id: PyObjectId,
-    inserted_round_id: PyObjectId,
-    courses_collection: AsyncIOMotorCollection,
-) -> None:
-    await courses_collection.update_one(
-        {"_id": ObjectId(course_id)},
-        {"$push": {"rounds": {"$each": [ObjectId(inserted_round_id)]}}},
-    )
+        await users_collection.update_one(
+            {"_id": finalized_round["user_id"]},
+            {"$push": {"handicap_data": handicap_data}},
+            session=session,
+        )
 
 
 async def get_round(
@@ -230,41 +293,35 @@ async def get_round(
     return Round(**round)
 
 
-@rounds_router.get(
-    "/",
-    description="Get multiple rounds given their IDs",
-    response_model=list[GetRound],
-    response_model_by_alias=False,
-)
-async def get_rounds(
-    ids: list[PyObjectId] = Query(...),
-    retrieve_course_data: bool = Query(
-        False, description="Whether to retrieve course data for the rounds' courses"
-    ),
-    order: str = Query(
-        None, regex="^(asc|desc)$", description="Sort order for the rounds"
-    ),
-    rounds_collection: AsyncIOMotorCollection = Depends(get_collection("rounds")),
-    courses_collection: AsyncIOMotorCollection = Depends(get_collection("courses")),
-) -> list[GetRound]:
-
-    # Convert string/PyObjectId IDs to ObjectId
+def to_round_object_ids(ids: list[PyObjectId]) -> list[ObjectId]:
     try:
-        object_ids = [ObjectId(id) for id in ids]
+        return [ObjectId(id) for id in ids]
     except InvalidId as exception:
         raise HTTPException(status_code=422, detail="Invalid Round ID") from exception
 
+
+def to_sort_direction(order: str | None) -> int | None:
     if order == "asc":
-        direction = 1
+        return 1
     elif order == "desc":
-        direction = -1
+        return -1
     else:
-        direction = None
+        return None
+
+
+# Get rounds as models, with full courses if requested, for calculations like handicaps
+async def fetch_rounds(
+    object_ids: list[ObjectId],
+    retrieve_course_data: bool,
+    order: str | None,
+    rounds_collection: AsyncIOMotorCollection,
+    courses_collection: AsyncIOMotorCollection,
+) -> list[GetRound]:
 
     # Fetch rounds
     rounds = (
         await rounds_collection.find({"_id": {"$in": object_ids}})
-        .sort("date_posted", direction)
+        .sort("date_posted", to_sort_direction(order))
         .to_list(None)
     )
 
@@ -274,11 +331,7 @@ async def get_rounds(
             golf_round["course_id"] for golf_round in rounds
         }
 
-        courses = {}
-        for course in await courses_collection.find(
-            {"_id": {"$in": list(course_object_ids)}}
-        ).to_list():
-            courses[course["_id"]] = course
+        courses = await get_cached_courses(course_object_ids, courses_collection)
 
         for golf_round in rounds:
             golf_round["course"] = courses[golf_round["course_id"]]
@@ -286,29 +339,335 @@ async def get_rounds(
     return [GetRound(**golf_round) for golf_round in rounds]
 
 
-def get_previous_handicap(
-    handicap_data: HandicapData, round_date: datetime
-) -> float | None:
-    for index, data in enumerate(handicap_data):
-        if data.date == round_date:
-            if index - 1 >= 0:
-                return handicap_data[index - 1].handicap
-            break
-    return None
+@rounds_router.get(
+    "/",
+    description="Get multiple rounds given their IDs",
+    responses={200: {"model": list[RoundWithCourse]}},
+)
+async def get_rounds(
+    ids: list[PyObjectId] = Query(...),
+    retrieve_course_data: bool = Query(
+        False, description="Whether to retrieve course data for the rounds' courses"
+    ),
+    include_hole_tees: bool = Query(
+        False,
+        description="Whether to include every tee of the course's holes, not just the round's",
+    ),
+    order: str = Query(
+        None, regex="^(asc|desc)$", description="Sort order for the rounds"
+    ),
+    rounds_collection: AsyncIOMotorCollection = Depends(get_collection("rounds")),
+) -> Response:
+
+    # The rounds and only the course fields the UI needs in one query.
+    #   The output is already in the response's shape, so it's sent as is
+    rounds = await rounds_collection.aggregate(
+        get_rounds_pipeline(
+            to_round_object_ids(ids),
+            to_sort_direction(order),
+            retrieve_course_data,
+            include_hole_tees,
+        )
+    ).to_list(None)
+
+    return bson_json_response(rounds)
+
+
+@user_rounds_router.get(
+    "/{user_id}/rounds",
+    description="Get a page of a user's rounds, newest first",
+    responses={200: {"model": UserRoundsPage}},
+)
+async def get_user_rounds(
+    user_id: PyObjectId,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    before: str | None = Query(None, description="next_cursor of the previous page"),
+    retrieve_course_data: bool = Query(
+        True, description="Whether to retrieve course data for the rounds' courses"
+    ),
+    include_hole_tees: bool = Query(
+        False,
+        description="Whether to include every tee of the course's holes, not just the round's",
+    ),
+    rounds_collection: AsyncIOMotorCollection = Depends(get_collection("rounds")),
+) -> Response:
+
+    try:
+        user_object_id = ObjectId(user_id)
+    except InvalidId as exception:
+        raise HTTPException(status_code=422, detail="Invalid User ID") from exception
+
+    query = {"user_id": user_object_id}
+    if before is not None:
+        query.update(after_cursor_query("date_posted", before, -1))
+
+    # One extra round tells us if there's another page
+    rounds = await rounds_collection.aggregate(
+        get_user_rounds_pipeline(
+            query, limit + 1, retrieve_course_data, include_hole_tees
+        )
+    ).to_list(None)
+
+    next_cursor = None
+    if len(rounds) > limit:
+        rounds = rounds[:limit]
+        next_cursor = encode_cursor(
+            rounds[-1]["date_posted"], ObjectId(rounds[-1]["id"])
+        )
+
+    return bson_json_response({"rounds": rounds, "next_cursor": next_cursor})
+
+
+@user_rounds_router.get(
+    "/{user_id}/rounds/export",
+    description="Export all of a user's rounds, oldest first, as NDJSON or CSV",
+)
+async def export_user_rounds(
+    user_id: PyObjectId,
+    format: ExportFormatEnum = Query(ExportFormatEnum.ndjson),
+    rounds_collection: AsyncIOMotorCollection = Depends(get_collection("rounds")),
+    courses_collection: AsyncIOMotorCollection = Depends(get_collection("courses")),
+) -> StreamingResponse:
+
+    try:
+        user_object_id = ObjectId(user_id)
+    except InvalidId as exception:
+        raise HTTPException(status_code=422, detail="Invalid User ID") from exception
+
+    # Streamed straight from the cursor, so memory doesn't grow with the user's history
+    rounds = stream_user_rounds(user_object_id, rounds_collection, courses_collection)
+
+    if format == ExportFormatEnum.csv:
+        content, media_type = export_rounds_as_csv(rounds), "text/csv"
+    else:
+        content, media_type = export_rounds_as_ndjson(rounds), "application/x-ndjson"
+
+    return StreamingResponse(
+        content,
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="rounds-{user_id}.{format.value}"'
+        },
+    )
+
+
+# Validate every imported round against its course, collecting the errors of all of them
+def validate_import_rounds(
+    import_rounds: list[ImportRound], courses: dict[ObjectId, Course]
+) -> None:
+    now = datetime.now(tz=timezone.utc)
+    errors = []
+
+    for round_number, import_round in enumerate(import_rounds, start=1):
+        course = courses.get(ObjectId(import_round.course_id))
+        if course is None:
+            errors.append(f"Round {round_number}: Course not found")
+            continue
+
+        try:
+            validate_tee_box_index(import_round.tee_box_index, course)
+        except HTTPException as exception:
+            errors.append(f"Round {round_number}: {exception.detail}")
+
+        if to_naive_utc(import_round.date_posted) > to_naive_utc(now):
+            errors.append(f"Round {round_number}: Round is dated in the future")
+
+        try:
+            validate_scorecard(
+                import_round.scorecard_mode, import_round.scorecard, course.num_holes
+            )
+        except HTTPException as exception:
+            errors.append(f"Round {round_number}: {exception.detail}")
+
+    if errors:
+        raise HTTPException(status_code=422, detail=errors)
+
+
+@user_rounds_router.post(
+    "/{user_id}/rounds/import",
+    response_description="Import a user's past rounds, sent as a JSON array or a CSV in the export's format",
+    status_code=status.HTTP_201_CREATED,
+)
+async def import_user_rounds(
+    user_id: PyObjectId,
+    request: Request,
+    users_collection: AsyncIOMotorCollection = Depends(get_collection("users")),
+    rounds_collection: AsyncIOMotorCollection = Depends(get_collection("rounds")),
+    courses_collection: AsyncIOMotorCollection = Depends(get_collection("courses")),
+    pcc_adjustments_collection: AsyncIOMotorCollection = Depends(
+        get_collection("pcc_adjustments")
+    ),
+) -> dict:
+    import_rounds = parse_import_rounds(
+        request.headers.get("content-type", ""), await request.body()
+    )
+    user = await get_user(user_id, users_collection)
+
+    # Skip rounds the user already has, so importing an export again doesn't duplicate them
+    seen_round_ids = set(user.rounds)
+    new_import_rounds = []
+    for import_round in import_rounds:
+        if import_round.id is None or import_round.id not in seen_round_ids:
+            new_import_rounds.append(import_round)
+        if import_round.id is not None:
+            seen_round_ids.add(import_round.id)
+    num_skipped = len(import_rounds) - len(new_import_rounds)
+    import_rounds = new_import_rounds
+
+    if not import_rounds:
+        return {"detail": "success", "round_ids": [], "num_skipped": num_skipped}
+
+    # Every course is loaded once, however many rounds were played on it
+    courses = await get_cached_courses(
+        {ObjectId(import_round.course_id) for import_round in import_rounds},
+        courses_collection,
+    )
+    validate_import_rounds(import_rounds, courses)
+
+    pcc_adjustments = await get_pcc_adjustments(
+        {
+            (import_round.course_id, get_pcc_day(import_round.date_posted))
+            for import_round in import_rounds
+        },
+        pcc_adjustments_collection,
+    )
+
+    imported_rounds = [
+        GetRound(
+            _id=PyObjectId(ObjectId()),
+            user_id=user.id,
+            course_id=import_round.course_id,
+            tee_box_index=import_round.tee_box_index,
+            caption=import_round.caption,
+            scorecard_mode=import_round.scorecard_mode,
+            scorecard=import_round.scorecard,
+            score_differential=0,  # Calculated with the rest of the history below
+            pcc_adjustment=pcc_adjustments[
+                (import_round.course_id, get_pcc_day(import_round.date_posted))
+            ],
+            date_posted=to_naive_utc(import_round.date_posted),
+            course=courses[ObjectId(import_round.course_id)],
+        )
+        for import_round in import_rounds
+    ]
+    imported_round_ids = {golf_round.id for golf_round in imported_rounds}
+
+    existing_rounds = await fetch_rounds(
+        to_round_object_ids(user.rounds),
+        True,
+        "asc",
+        rounds_collection,
+        courses_collection,
+    )
+
+    # Merge the imported rounds into the user's history. The sort is stable,
+    #   so an imported round goes after an existing round from the same time
+    rounds = sorted(
+        existing_rounds + imported_rounds, key=lambda golf_round: golf_round.date_posted
+    )
+    first_imported_index = next(
+        i for i, golf_round in enumerate(rounds) if golf_round.id in imported_round_ids
+    )
+
+    # Recompute the history from the earliest imported round on once,
+    #   rather than once per imported round
+    score_differentials, handicaps = recalculate_handicap_history(
+        rounds, first_imported_index
+    )
+
+    new_rounds = []
+    changed_rounds = []
+    changed_score_differentials = []
+    for golf_round, score_differential in zip(
+        rounds[first_imported_index:], score_differentials[first_imported_index:]
+    ):
+        if golf_round.id in imported_round_ids:
+            new_round = golf_round.model_dump(by_alias=True, exclude={"course"})
+            new_round["_id"] = ObjectId(golf_round.id)
+            new_round["user_id"] = ObjectId(golf_round.user_id)
+            new_round["course_id"] = ObjectId(golf_round.course_id)
+            new_round["score_differential"] = score_differential
+            new_rounds.append(new_round)
+        else:
+            changed_rounds.append(golf_round)
+            changed_score_differentials.append(score_differential)
+
+    round_updates = get_score_differential_updates(
+        changed_rounds, changed_score_differentials
+    )
+
+    # The user's rounds list, handicap data and recent score differentials are replaced with
+    #   ones computed from the rounds read above, so only if no rounds were added or removed
+    #   since. The new rounds, their effect on later rounds and the user are written together
+    async def write_import(session: AsyncIOMotorClientSession | None) -> None:
+        result = await users_collection.update_one(
+            {"_id": ObjectId(user.id), "rounds": to_round_object_ids(user.rounds)},
+            {
+                "$push": {
+                    "rounds": {"$each": [new_round["_id"] for new_round in new_rounds]}
+                },
+                "$set": {
+                    "handicap_data": rebuild_handicap_data(
+                        user.handicap_data,
+                        rounds[first_imported_index].date_posted,
+                        rounds[first_imported_index:],
+                        handicaps[first_imported_index:],
+                    ),
+                    "recent_score_differentials": score_differentials[
+                        -HANDICAP_WINDOW_SIZE:
+                    ],
+                },
+            },
+            session=session,
+        )
+        if result.matched_count == 0:
+            raise HTTPException(
+                status_code=409,
+                detail="The user's rounds changed during the import, please try again",
+            )
+
+        await rounds_collection.insert_many(new_rounds, session=session)
+        if round_updates:
+            await rounds_collection.bulk_write(
+                round_updates, ordered=False, session=session
+            )
+
+    await run_in_transaction(write_import)
+
+    for golf_round in imported_rounds:
+        add_round_to_user_stats(
+            ObjectId(user.id),
+            golf_round.scorecard,
+            golf_round.scorecard_mode,
+            golf_round.course,
+        )
+        add_round_to_course_stats(
+            ObjectId(golf_round.id),
+            ObjectId(user.id),
+            golf_round.scorecard,
+            golf_round.scorecard_mode,
+            golf_round.course,
+            golf_round.date_posted,
+        )
+
+    return {
+        "detail": "success",
+        "round_ids": [str(new_round["_id"]) for new_round in new_rounds],
+        "num_skipped": num_skipped,
+    }
 
 
 @rounds_router.put(
     "/{round_id}",
     response_description="Update a round",
     response_model=Round,
+    response_model_by_alias=False,
 )
 async def update_round(
     round_id: str,
-    update_round: PostRound,
-    background_tasks: BackgroundTasks,
-    users_collection: AsyncIOMotorCollection = Depends(get_collection("users")),
-    courses_collection: AsyncIOMotorCollection = Depends(get_collection("courses")),
+    post_round: PostRound,
     rounds_collection: AsyncIOMotorCollection = Depends(get_collection("rounds")),
+    courses_collection: AsyncIOMotorCollection = Depends(get_collection("courses")),
     user: User = Depends(
         verify_and_get_user
     ),  # Ensure the user ID provided actually exists
@@ -320,29 +679,33 @@ async def update_round(
     ),  # Ensure the round ID provided actually exists
 ):
     validate_scorecard(
-        update_round.scorecard_mode, update_round.scorecard, course.num_holes
+        post_round.scorecard_mode, post_round.scorecard, course.num_holes
     )
 
     # Get the user's handicap just before the original round was posted
-    current_user_handicap = get_previous_handicap(user.handicap_data, round.date_posted)
+    current_user_handicap = HandicapTimeline(user.handicap_data).handicap_before(
+        round.date_posted
+    )
 
     score_differential = calculate_score_differential(
-        update_round.scorecard,
-        update_round.scorecard_mode,
-        update_round.tee_box_index,
+        post_round.scorecard,
+        post_round.scorecard_mode,
+        post_round.tee_box_index,
         course,
         current_user_handicap,
+        round.pcc_adjustment,
     )
 
     updated_round = Round(
         id=round.id,
         user_id=user.id,
         course_id=course.id,
-        tee_box_index=update_round.tee_box_index,
-        caption=update_round.caption,
-        scorecard_mode=update_round.scorecard_mode,
-        scorecard=update_round.scorecard,
+        tee_box_index=post_round.tee_box_index,
+        caption=post_round.caption,
+        scorecard_mode=post_round.scorecard_mode,
+        scorecard=post_round.scorecard,
         score_differential=score_differential,
+        pcc_adjustment=round.pcc_adjustment,
         date_posted=round.date_posted,
     ).model_dump(by_alias=True)
 
@@ -354,17 +717,81 @@ async def update_round(
         {"_id": updated_round["_id"]}, updated_round
     )
 
-    # UPDATE USER AND COURSE DATA
-    background_tasks.add_task(
-        update_user_and_rounds_after_update,
-        user.id,
-        user.rounds,
-        user.handicap_data,
+    # Swap the original round's scores for the updated ones in the user's and course's stats
+    original_course = (
+        course
+        if round.course_id == course.id
+        else await get_course(round.course_id, courses_collection)
+    )
+    add_round_to_user_stats(
+        ObjectId(user.id),
+        round.scorecard,
+        round.scorecard_mode,
+        original_course,
+        sign=-1,
+    )
+    add_round_to_user_stats(
+        ObjectId(user.id), post_round.scorecard, post_round.scorecard_mode, course
+    )
+    await remove_round_from_course_stats(
+        ObjectId(round.id),
+        round.scorecard,
+        round.scorecard_mode,
+        original_course,
+        round.date_posted,
+    )
+    add_round_to_course_stats(
+        ObjectId(round.id),
+        ObjectId(user.id),
+        post_round.scorecard,
+        post_round.scorecard_mode,
+        course,
         round.date_posted,
-        users_collection,
-        rounds_collection,
     )
 
+    # Recompute the user's history from the updated round on in the background
+    await handicap_recompute_queue.enqueue(ObjectId(user.id), round.date_posted)
+
+    return updated_round
+
+
+# Updates for the rounds whose recalculated score differential changed,
+#   to be written in one round trip
+def get_score_differential_updates(
+    rounds: list[GetRound], score_differentials: list[float]
+) -> list[UpdateOne]:
+    return [
+        UpdateOne(
+            {"_id": ObjectId(golf_round.id)},
+            {"$set": {"score_differential": score_differential}},
+        )
+        for golf_round, score_differential in zip(rounds, score_differentials)
+        if score_differential != golf_round.score_differential
+    ]
+
+
+# Keep the handicaps from before the recalculated rounds and replace the rest
+def rebuild_handicap_data(
+    user_handicap_data: list[HandicapData],
+    recalculated_from: datetime,
+    recalculated_rounds: list[GetRound],
+    handicaps: list[float | None],
+) -> list[dict]:
+    new_handicap_data = [
+        handicap_data.model_dump()
+        for handicap_data in user_handicap_data
+        if handicap_data.date < recalculated_from
+    ]
+    for golf_round, handicap in zip(recalculated_rounds, handicaps):
+        if handicap is not None:
+            new_handicap_data.append(
+                HandicapData(
+                    handicap=handicap, date=golf_round.date_posted
+                ).model_dump()
+            )
+
+    return new_handicap_data
+
 
 async def update_user_and_rounds_after_update(
     user_id: PyObjectId,
@@ -373,65 +800,85 @@ async def update_user_and_rounds_after_update(
     updated_round_date: datetime,
     users_collection: AsyncIOMotorCollection,
     rounds_collection: AsyncIOMotorCollection,
+    courses_collection: AsyncIOMotorCollection,
 ) -> None:
 
-    rounds = await get_rounds(user_round_ids, True, "asc", rounds_collection)
-
-    # For rounds posted after the round just updated,
-    #   update the score differentials then handicap data at the corresponding date
-    for i, golf_round in enumerate(rounds):
-        if golf_round.date_posted < updated_round_date:
-            continue
+    rounds = await fetch_rounds(
+        to_round_object_ids(user_round_ids),
+        True,
+        "asc",
+        rounds_collection,
+        courses_collection,
+    )
 
-        # Don't recompute the score differential for the round that was just updated
-        #   but do it for all rounds after
-        if golf_round.date_posted > updated_round_date:
+    updated_round_index = next(
+        (
+            i
+            for i, golf_round in enumerate(rounds)
+            if golf_round.date_posted >= updated_round_date
+        ),
+        len(rounds),
+    )
 
-            # Recompute the score differential for the round
-            previous_handicap = get_previous_handicap(
-                user_handicap_data, golf_round.date_posted
-            )
-            new_score_differential = calculate_score_differential(
-                golf_round.scorecard,
-                golf_round.scorecard_mode,
-                golf_round.tee_box_index,
-                golf_round.course,
-                previous_handicap,
-            )
+    # From the round just updated on, recompute the score differentials
+    #   then the handicaps, all in one pass
+    score_differentials, handicaps = recalculate_handicap_history(
+        rounds, updated_round_index
+    )
 
-            golf_round.score_differential = new_score_differential
+    # Only replace the user's handicap data if no rounds were added or removed since they were
+    #   read. Otherwise the job fails and is retried by the work queue with the latest rounds
+    result = await users_collection.update_one(
+        {"_id": ObjectId(user_id), "rounds": to_round_object_ids(user_round_ids)},
+        {
+            "$set": {
+                "handicap_data": rebuild_handicap_data(
+                    user_handicap_data,
+                    updated_round_date,
+                    rounds[updated_round_index:],
+                    handicaps[updated_round_index:],
+                ),
+                "recent_score_differentials": score_differentials[
+                    -HANDICAP_WINDOW_SIZE:
+                ],
+            }
+        },
+    )
+    if result.matched_count == 0:
+        raise RuntimeError(f"User {user_id}'s rounds changed during the recompute")
 
-            update_round_result = await rounds_collection.update_one(
-                {"_id": ObjectId(golf_round.id)},
-                {
-                    "$set": {
-                        "score_differential": new_score_differential,
-                    }
-                },
-            )
+    round_updates = get_score_differential_updates(
+        rounds[updated_round_index:], score_differentials[updated_round_index:]
+    )
+    if round_updates:
+        await rounds_collection.bulk_write(round_updates, ordered=False)
 
-        # With the score differential just computed, calculate the new handicap
-        if golf_round.date_posted >= updated_round_date:
 
-            # Update the handicap data for the user
-            # Include all rounds before the current round
-            score_differentials_to_include = [
-                r.score_differential for r in rounds[: i + 1]
-            ]
+# Recompute a user's score differentials and handicaps from the given date on.
+#   The user's rounds and handicap data are read when the job runs, not when it was queued,
+#   so jobs coalesced from several updates all see the latest of them
+async def recompute_user_handicaps(
+    db: AsyncIOMotorDatabase, user_id: ObjectId, since: datetime
+) -> None:
+    users_collection = db.get_collection("users")
 
-            new_handicap = calculate_handicap(score_differentials_to_include)
+    user = await users_collection.find_one(
+        {"_id": user_id}, {"rounds": 1, "handicap_data": 1}
+    )
+    if user is None:
+        return
+
+    await update_user_and_rounds_after_update(
+        PyObjectId(user_id),
+        [PyObjectId(round_id) for round_id in user.get("rounds", [])],
+        [HandicapData(**data) for data in user.get("handicap_data", [])],
+        since,
+        users_collection,
+        db.get_collection("rounds"),
+        db.get_collection("courses"),
+    )
 
-            # Set the user's handicap at the date of the current round
-            for handicap_data in user_handicap_data:
-                if handicap_data.date == golf_round.date_posted:
-                    handicap_data.handicap = new_handicap
-                    break
 
-    update_user_result = await users_collection.update_one(
-        {"_id": ObjectId(user_id)},
-        {
-            "$set": {
-                "handicap_data": user_handicap_data,
-            }
-        },
-    )
+handicap_recompute_queue = OutboxWorkQueue(
+    "handicap_recompute_jobs", recompute_user_handicaps
+)
@@ -0,0 +1,119 @@
+from dataclasses import dataclass
+from statistics import mean
+
+import numpy as np
+
+from ...cache import LRUCache
+from ..courses.models import Course
+
+COURSE_TABLES_CACHE_SIZE = 1024
+
+DEFAULT_SLOPE_RATING = 113
+DEFAULT_COURSE_RATING = 72
+DEFAULT_COURSE_PAR = 72
+
+# Course handicaps covered by the precomputed max hole score table.
+#   Anything outside the range is calculated on demand
+MIN_TABLE_COURSE_HANDICAP = -20
+MAX_TABLE_COURSE_HANDICAP = 100
+
+
+def calculate_max_hole_scores(
+    pars: np.ndarray, stroke_indexes: np.ndarray, course_handicap: int
+) -> np.ndarray:
+    """
+    "If you have an established Handicap Index®, the maximum score for each hole played
+    is limited to a net double bogey, equal to double bogey
+    plus any handicap strokes you are entitled to receive based on your Course Handicap
+    """
+    num_holes = len(pars)
+    handicap_strokes = np.where(
+        stroke_indexes <= course_handicap,
+        1 + np.floor_divide(course_handicap - stroke_indexes, num_holes),
+        0,
+    )
+    return pars + 2 + handicap_strokes
+
+
+# Everything about a course that handicap calculations need, computed once per course
+@dataclass(frozen=True)
+class CourseHandicapTables:
+    updated_at: str  # The course's updated_at when the tables were built
+    course_par: int
+    pars: np.ndarray  # By hole index
+    stroke_indexes: np.ndarray  # By hole index
+    # Slope and course rating by tee box index. None is the average of all tee boxes
+    ratings: dict[int | None, tuple[float, float]]
+    # For players posting initial scores to establish a Handicap Index, the maximum hole score is limited to par + 5
+    initial_max_hole_scores: np.ndarray
+    # Row i holds the max score of every hole for a course handicap of MIN_TABLE_COURSE_HANDICAP + i
+    max_hole_scores_table: np.ndarray
+
+    def slope_and_course_rating(self, tee_box_index: int | None) -> tuple[float, float]:
+        if tee_box_index:
+            return self.ratings[tee_box_index]
+        return self.ratings[None]
+
+    def max_hole_scores(self, course_handicap: float) -> np.ndarray:
+        # Stroke indexes are whole numbers, so only the whole part of the course handicap matters
+        course_handicap = int(np.floor(course_handicap))
+
+        if MIN_TABLE_COURSE_HANDICAP <= course_handicap <= MAX_TABLE_COURSE_HANDICAP:
+            return self.max_hole_scores_table[
+                course_handicap - MIN_TABLE_COURSE_HANDICAP
+            ]
+
+        return calculate_max_hole_scores(
+            self.pars, self.stroke_indexes, course_handicap
+        )
+
+
+def build_course_tables(course: Course) -> CourseHandicapTables:
+    pars = np.array([hole.par for hole in course.scorecard], dtype=np.int64)
+    stroke_indexes = np.array(
+        [hole.handicap for hole in course.scorecard], dtype=np.int64
+    )
+
+    ratings: dict[int | None, tuple[float, float]] = {
+        tee_box_index: (tee_box.slope_rating, tee_box.course_rating)
+        for tee_box_index, tee_box in enumerate(course.tee_boxes)
+    }
+    if course.tee_boxes:
+        # Use the average slope and course rating for all tee boxes
+        ratings[None] = (
+            mean([tee_box.slope_rating for tee_box in course.tee_boxes]),
+            mean([tee_box.course_rating for tee_box in course.tee_boxes]),
+        )
+    else:
+        # If course has no tee box data, default to standard values
+        ratings[None] = (DEFAULT_SLOPE_RATING, DEFAULT_COURSE_RATING)
+
+    course_handicaps = np.arange(
+        MIN_TABLE_COURSE_HANDICAP, MAX_TABLE_COURSE_HANDICAP + 1
+    )[:, None]
+
+    return CourseHandicapTables(
+        updated_at=course.updated_at,
+        course_par=course.par if course.par else DEFAULT_COURSE_PAR,
+        pars=pars,
+        stroke_indexes=stroke_indexes,
+        ratings=ratings,
+        initial_max_hole_scores=pars + 5,
+        max_hole_scores_table=calculate_max_hole_scores(
+            pars, stroke_indexes, course_handicaps
+        ),
+    )
+
+
+course_tables_cache = LRUCache(COURSE_TABLES_CACHE_SIZE)
+
+
+# Get the tables for a course, rebuilding them if the course has changed since they were built
+def get_course_tables(course: Course) -> CourseHandicapTables:
+    course_tables = course_tables_cache.get(course.id)
+
+    if course_tables is None or course_tables.updated_at != course.updated_at:
+        course_tables = build_course_tables(course)
+        course_tables_cache.set(course.id, course_tables)
+
+    return course_tables
@@ -1,11 +1,16 @@
-import heapq
-from math import floor
-from statistics import mean
+from array import array
+from bisect import bisect_left, insort
+from collections import deque
+from typing import Iterable
 
-from ...routers.courses.courses import Course
-from ...routers.courses.models import CourseHole
-from ...routers.rounds.models import Round
-from ..rounds.models import RoundScorecard, ScorecardModeEnum
+import numpy as np
+
+from ...routers.courses.models import Course
+from ..rounds.models import GetRound, RoundScorecard, ScorecardModeEnum
+from .course_tables import CourseHandicapTables, get_course_tables
+
+# The handicap is calculated from the most recent score differentials only
+HANDICAP_WINDOW_SIZE = 20
 
 # Maps the number of rounds the handicap is out of to the adjustment to be applied to the final handicap calculation
 HANDICAP_ADJUSTMENTS = {3: -2, 4: -1, 5: 0, 6: -1}
@@ -28,8 +33,12 @@ NUM_ROUNDS_TO_LOWEST_K = {
     17: 6,
     18: 6,
     19: 7,
+    20: 8,
 }
 
+# The USGA requires at least 3 score differentials for a handicap
+MIN_ROUNDS_FOR_HANDICAP = 3
+
 
 def calculate_course_handicap(
     player_handicap: float, slope_rating: float, course_rating: float, course_par: int
@@ -41,53 +50,29 @@ def calculate_adjusted_gross_score(
     scorecard: RoundScorecard,
     scorecard_mode: ScorecardModeEnum,
     player_handicap: float | None,
-    course_scorecard: list[CourseHole],
-    course_par: int | None,
+    course_tables: CourseHandicapTables,
     slope_rating: float,
     course_rating: float,
 ):
 
-    course_par = course_par if course_par else 72
-
-    if player_handicap:
-        course_handicap = calculate_course_handicap(
-            player_handicap, slope_rating, course_rating, course_par
-        )
-
-    adjusted_gross_score = 0
-
     if scorecard_mode == ScorecardModeEnum.all_holes:
-        for hole_number, score in scorecard.items():
-
-            hole_index = int(hole_number) - 1
-            course_hole = course_scorecard[hole_index]
-
-            if player_handicap:
+        if player_handicap:
+            course_handicap = calculate_course_handicap(
+                player_handicap, slope_rating, course_rating, course_tables.course_par
+            )
+            max_hole_scores = course_tables.max_hole_scores(course_handicap)
 
-                hole_stroke_index = course_hole.handicap
+        else:
+            max_hole_scores = course_tables.initial_max_hole_scores
 
-                """
-                "If you have an established Handicap Index®, the maximum score for each hole played
-                is limited to a net double bogey, equal to double bogey
-                plus any handicap strokes you are entitled to receive based on your Course Handicap
-                """
-                max_hole_score = course_hole.par + 2
-                if hole_stroke_index <= course_handicap:
-                    max_hole_score += 1 + floor(
-                        (course_handicap - hole_stroke_index) / len(course_scorecard)
-                    )
-                adjusted_gross_score += min(score, max_hole_score)
+        scores = np.zeros(len(max_hole_scores), dtype=np.int64)
+        for hole_number, score in scorecard.items():
+            scores[int(hole_number) - 1] = score
 
-            else:
-                """
-                For players posting initial scores to establish a Handicap Index,
-                the maximum hole score is limited to par + 5
-                """
-                adjusted_gross_score += min(score, course_hole.par + 5)
+        adjusted_gross_score = int(np.minimum(scores, max_hole_scores).sum())
 
     elif scorecard_mode == ScorecardModeEnum.front_and_back:
-        adjusted_gross_score += scorecard["front"]
-        adjusted_gross_score += scorecard["back"]
+        adjusted_gross_score = scorecard["front"] + scorecard["back"]
 
     else:
         adjusted_gross_score = scorecard["total"]
@@ -96,26 +81,7 @@ def calculate_adjusted_gross_score(
 
 
 def get_slope_and_course_rating(tee_box_index: int | None, course: Course):
-
-    if tee_box_index:
-        slope_rating = course.tee_boxes[tee_box_index].slope_rating
-        course_rating = course.tee_boxes[tee_box_index].course_rating
-
-    else:
-        if course.tee_boxes:
-            # Use the average slope and course rating for all tee boxes
-            slope_rating = mean([tee_box.slope_rating for tee_box in course.tee_boxes])
-            course_rating = mean(
-                [tee_box.course_rating for tee_box in course.tee_boxes]
-            )
-
-        # If course has no tee box data
-        else:
-            # Default to standard values
-            slope_rating = 113
-            course_rating = 72
-
-    return slope_rating, course_rating
+    return get_course_tables(course).slope_and_course_rating(tee_box_index)
 
 
 def calculate_score_differential(
@@ -126,14 +92,14 @@ def calculate_score_differential(
     player_handicap: float | None = None,
     pcc_adjustment: float = 0,
 ) -> float:
-    slope_rating, course_rating = get_slope_and_course_rating(tee_box_index, course)
+    course_tables = get_course_tables(course)
+    slope_rating, course_rating = course_tables.slope_and_course_rating(tee_box_index)
 
     adjusted_gross_score = calculate_adjusted_gross_score(
         scorecard,
         scorecard_mode,
         player_handicap,
-        course.scorecard,
-        course.par,
+        course_tables,
         slope_rating,
         course_rating,
     )
@@ -143,14 +109,146 @@ def calculate_score_differential(
     )
 
 
+# The most recent score differentials, kept in both posting order and sorted order.
+#   The sorted copy lives in a fixed-size array, so adding or replacing a differential
+#   and averaging the lowest ones never cost more than the window size
+class ScoreDifferentialWindow:
+    def __init__(self, score_differentials: Iterable[float] = ()):
+        self._chronological: deque[float] = deque(maxlen=HANDICAP_WINDOW_SIZE)
+        self._sorted = array("d")
+
+        for score_differential in score_differentials:
+            self.add(score_differential)
+
+    def __len__(self) -> int:
+        return len(self._chronological)
+
+    def add(self, score_differential: float) -> None:
+        # The oldest differential falls out of the window when it is full
+        if len(self._chronological) == HANDICAP_WINDOW_SIZE:
+            self._remove_sorted(self._chronological[0])
+
+        self._chronological.append(score_differential)
+        insort(self._sorted, score_differential)
+
+    # Replace the differential at the given position in posting order (0 is the oldest)
+    def replace(self, index: int, score_differential: float) -> None:
+        self._remove_sorted(self._chronological[index])
+
+        self._chronological[index] = score_differential
+        insort(self._sorted, score_differential)
+
+    def score_differentials(self) -> list[float]:
+        return list(self._chronological)
+
+    def handicap(self) -> float:
+        num_rounds = len(self._chronological)
+
+        if num_rounds < MIN_ROUNDS_FOR_HANDICAP:
+            raise ValueError(
+                f"At least {MIN_ROUNDS_FOR_HANDICAP} score differentials are required for a handicap"
+            )
+
+        # Average the lowest k score differentials, where k is determined by the number of score differentials used in the calculation
+        k = NUM_ROUNDS_TO_LOWEST_K[num_rounds]
+        return sum(self._sorted[:k]) / k + HANDICAP_ADJUSTMENTS.get(num_rounds, 0)
+
+    def _remove_sorted(self, score_differential: float) -> None:
+        del self._sorted[bisect_left(self._sorted, score_differential)]
+
+
 def calculate_handicap(score_differentials: list[float]) -> float:
+    return ScoreDifferentialWindow(
+        score_differentials[-HANDICAP_WINDOW_SIZE:]
+    ).handicap()
+
+
+# Recalculate the score differential of, and the handicap after, every round from rounds[start_index] on.
+#   Rounds must be in posting order and have their course data attached.
+#   Returns the score differential and handicap (None if there isn't one yet) for every round
+def recalculate_handicap_history(
+    rounds: list[GetRound], start_index: int
+) -> tuple[list[float], list[float | None]]:
+
+    num_rounds = len(rounds)
+    course_tables = [get_course_tables(golf_round.course) for golf_round in rounds]
+    max_holes = max((len(tables.pars) for tables in course_tables), default=0)
+
+    # Lay the rounds out as padded arrays of scores and initial max hole scores, one row per round.
+    #   Padding is 0 everywhere, which never changes a row's adjusted gross score
+    scores = np.zeros((num_rounds, max_holes), dtype=np.int64)
+    initial_max_hole_scores = np.zeros((num_rounds, max_holes), dtype=np.int64)
+    slope_ratings = np.empty(num_rounds)
+    course_ratings = np.empty(num_rounds)
+    pcc_adjustments = np.array([golf_round.pcc_adjustment for golf_round in rounds])
+    is_all_holes = np.zeros(num_rounds, dtype=bool)
+    other_mode_scores = np.zeros(num_rounds, dtype=np.int64)
+
+    for row, (golf_round, tables) in enumerate(zip(rounds, course_tables)):
+        slope_ratings[row], course_ratings[row] = tables.slope_and_course_rating(
+            golf_round.tee_box_index
+        )
+        initial_max_hole_scores[row, : len(tables.pars)] = (
+            tables.initial_max_hole_scores
+        )
+
+        if golf_round.scorecard_mode == ScorecardModeEnum.all_holes:
+            is_all_holes[row] = True
+            for hole_number, score in golf_round.scorecard.items():
+                scores[row, int(hole_number) - 1] = score
+
+        elif golf_round.scorecard_mode == ScorecardModeEnum.front_and_back:
+            other_mode_scores[row] = (
+                golf_round.scorecard["front"] + golf_round.scorecard["back"]
+            )
 
-    heap = []
-    for score_differential in score_differentials:
-        heapq.heappush(heap, score_differential)
+        else:
+            other_mode_scores[row] = golf_round.scorecard["total"]
+
+    # Adjusted gross scores for a player without a handicap, for every round at once
+    adjusted_gross_scores_without_handicap = np.where(
+        is_all_holes,
+        np.minimum(scores, initial_max_hole_scores).sum(axis=1),
+        other_mode_scores,
+    )
+
+    score_differentials = [golf_round.score_differential for golf_round in rounds]
+    handicaps: list[float | None] = [None] * num_rounds
+
+    window = ScoreDifferentialWindow(
+        score_differentials[max(0, start_index - HANDICAP_WINDOW_SIZE) : start_index]
+    )
+    previous_handicap = (
+        window.handicap() if len(window) >= MIN_ROUNDS_FOR_HANDICAP else None
+    )
+
+    # Each differential depends on the handicap just before its round, so the rounds
+    #   are walked in order, but each step is a table lookup and an array minimum
+    for row in range(start_index, num_rounds):
+        if is_all_holes[row] and previous_handicap:
+            tables = course_tables[row]
+            course_handicap = calculate_course_handicap(
+                previous_handicap,
+                slope_ratings[row],
+                course_ratings[row],
+                tables.course_par,
+            )
+            max_hole_scores = tables.max_hole_scores(course_handicap)
+            adjusted_gross_score = np.minimum(
+                scores[row, : len(max_hole_scores)], max_hole_scores
+            ).sum()
+
+        else:
+            adjusted_gross_score = adjusted_gross_scores_without_handicap[row]
+
+        score_differentials[row] = float(
+            (113 / slope_ratings[row])
+            * (adjusted_gross_score - course_ratings[row] - pcc_adjustments[row])
+        )
 
-    num_rounds = len(heap)
+        window.add(score_differentials[row])
+        if len(window) >= MIN_ROUNDS_FOR_HANDICAP:
+            handicaps[row] = window.handicap()
+        previous_handicap = handicaps[row]
 
-    # Average the lowest k score differentials, where k is determined by the number of score differentials used in the calculation
-    k = NUM_ROUNDS_TO_LOWEST_K.get(num_rounds, 0)
-    return mean(heap[0:k]) + HANDICAP_ADJUSTMENTS.get(num_rounds, 0)
+    return score_differentials, handicaps
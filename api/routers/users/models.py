@@ -25,6 +25,28 @@ class User(BaseModel):
     password_hash: str
     rounds: list[PyObjectId] = Field(default=[])
     handicap_data: list[HandicapData] = Field(default=[])
+    # Score differentials of the most recent rounds (oldest first), used for the handicap
+    recent_score_differentials: list[float] = Field(default=[])
+
+
+class ScoringStats(BaseModel):
+    num_rounds: int
+    scoring_average: float
+    average_to_par: float
+
+
+class ParTypeStats(BaseModel):
+    par: int
+    num_holes: int  # Holes of this par played in rounds with hole by hole scores
+    scoring_average: float
+
+
+class UserStats(BaseModel):
+    num_rounds: int
+    scoring: dict[str, ScoringStats]  # Keyed by the number of holes in the round
+    par_types: list[ParTypeStats]
+    # How many holes were played in each score relative to par, e.g. birdie
+    score_distribution: dict[str, int]
 
 
 class LoginUser(BaseModel):
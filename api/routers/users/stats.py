@@ -0,0 +1,133 @@
+from bson import ObjectId
+from fastapi import HTTPException
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+from ...write_behind import WriteBehindBuffer
+from ..courses.models import Course
+from ..rounds.models import ScorecardModeEnum
+from .models import ParTypeStats, ScoringStats, UserStats
+
+# Names for a hole's score relative to par, from 2 or more under to 3 or more over
+SCORE_NAMES = {
+    -2: "eagle_or_better",
+    -1: "birdie",
+    0: "par",
+    1: "bogey",
+    2: "double_bogey",
+    3: "triple_or_worse",
+}
+
+# A user's stats are running sums and counts, kept in one document per user and only ever
+#   changed with $inc, so posting, editing or importing a round never rescans their rounds
+user_stats_buffer = WriteBehindBuffer("user_stats")
+
+
+# The total strokes of a round, whichever scorecard mode it was posted in
+def get_total_score(scorecard: dict[str, int]) -> int:
+    if "total" in scorecard:
+        return scorecard["total"]
+    if "front" in scorecard or "back" in scorecard:
+        return scorecard.get("front", 0) + scorecard.get("back", 0)
+    return sum(score for hole, score in scorecard.items() if hole.isdigit())
+
+
+def get_score_name(score: int, par: int) -> str:
+    return SCORE_NAMES[max(-2, min(3, score - par))]
+
+
+# The changes a round makes to its player's stats, as $inc fields. A sign of -1 gives the
+#   changes that remove the round again, e.g. the old version of an edited round
+def get_round_stats_increments(
+    scorecard: dict[str, int],
+    scorecard_mode: ScorecardModeEnum,
+    course: Course,
+    sign: int = 1,
+) -> dict[str, int]:
+    total_score = get_total_score(scorecard)
+    course_par = sum(hole.par for hole in course.scorecard)
+    # 9 and 18 hole rounds are averaged separately
+    scoring = f"scoring.{course.num_holes}"
+
+    increments = {
+        "num_rounds": sign,
+        f"{scoring}.num_rounds": sign,
+        f"{scoring}.strokes": sign * total_score,
+        f"{scoring}.to_par": sign * (total_score - course_par),
+    }
+
+    # Only rounds with hole by hole scores say anything about individual holes
+    if scorecard_mode == ScorecardModeEnum.all_holes:
+        for hole in course.scorecard:
+            score = scorecard[str(hole.hole_number)]
+            par_type = f"par_types.{hole.par}"
+            score_name = f"score_distribution.{get_score_name(score, hole.par)}"
+
+            increments[f"{par_type}.num_holes"] = (
+                increments.get(f"{par_type}.num_holes", 0) + sign
+            )
+            increments[f"{par_type}.strokes"] = (
+                increments.get(f"{par_type}.strokes", 0) + sign * score
+            )
+            increments[score_name] = increments.get(score_name, 0) + sign
+
+    return increments
+
+
+def add_round_to_user_stats(
+    user_id: ObjectId,
+    scorecard: dict[str, int],
+    scorecard_mode: ScorecardModeEnum,
+    course: Course,
+    sign: int = 1,
+) -> None:
+    user_stats_buffer.update(
+        user_id,
+        {"$inc": get_round_stats_increments(scorecard, scorecard_mode, course, sign)},
+    )
+
+
+def to_user_stats(user_stats: dict) -> UserStats:
+    return UserStats(
+        num_rounds=user_stats.get("num_rounds", 0),
+        scoring={
+            num_holes: ScoringStats(
+                num_rounds=scoring["num_rounds"],
+                scoring_average=scoring["strokes"] / scoring["num_rounds"],
+                average_to_par=scoring["to_par"] / scoring["num_rounds"],
+            )
+            for num_holes, scoring in user_stats.get("scoring", {}).items()
+            if scoring.get("num_rounds")
+        },
+        par_types=[
+            ParTypeStats(
+                par=int(par),
+                num_holes=par_type["num_holes"],
+                scoring_average=par_type["strokes"] / par_type["num_holes"],
+            )
+            for par, par_type in sorted(
+                user_stats.get("par_types", {}).items(), key=lambda item: int(item[0])
+            )
+            if par_type.get("num_holes")
+        ],
+        score_distribution={
+            score_name: user_stats.get("score_distribution", {}).get(score_name, 0)
+            for score_name in SCORE_NAMES.values()
+        },
+    )
+
+
+async def get_user_stats(
+    user_object_id: ObjectId,
+    user_stats_collection: AsyncIOMotorCollection,
+    users_collection: AsyncIOMotorCollection,
+) -> UserStats:
+    user_stats = await user_stats_collection.find_one({"_id": user_object_id})
+
+    if user_stats is None:
+        # A user without stats just hasn't posted a round yet
+        if await users_collection.count_documents({"_id": user_object_id}, limit=1):
+            user_stats = {}
+        else:
+            raise HTTPException(status_code=404, detail="User not found")
+
+    return to_user_stats(user_stats)
@@ -0,0 +1,92 @@
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timezone
+
+import numpy as np
+
+from .models import HandicapData
+
+
+# Dates from MongoDB come back as naive UTC datetimes, so compare everything that way
+def to_naive_utc(date: datetime) -> datetime:
+    if date.tzinfo is None:
+        return date
+    return date.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+# A user's handicap history sorted by date, for O(log n) lookups by date
+class HandicapTimeline:
+    def __init__(self, handicap_data: list[HandicapData]):
+        handicap_data = sorted(handicap_data, key=lambda data: to_naive_utc(data.date))
+
+        self.dates = [to_naive_utc(data.date) for data in handicap_data]
+        self.handicaps = [data.handicap for data in handicap_data]
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    # The user's handicap just before the given date, or None if they didn't have one yet
+    def handicap_before(self, date: datetime) -> float | None:
+        index = bisect_left(self.dates, to_naive_utc(date))
+        return self.handicaps[index - 1] if index > 0 else None
+
+    # The handicap data between the dates, inclusive. Missing dates leave that end open
+    def between(
+        self, start: datetime | None = None, end: datetime | None = None
+    ) -> list[HandicapData]:
+        start_index = bisect_left(self.dates, to_naive_utc(start)) if start else 0
+        end_index = (
+            bisect_right(self.dates, to_naive_utc(end)) if end else len(self.dates)
+        )
+
+        return [
+            HandicapData(date=self.dates[i], handicap=self.handicaps[i])
+            for i in range(start_index, end_index)
+        ]
+
+
+# Largest-Triangle-Three-Buckets downsampling. Picks num_points of the points
+#   that best preserve the shape of the series, always keeping the first and last.
+#   Returns the indexes of the chosen points
+def downsample_lttb(x: np.ndarray, y: np.ndarray, num_points: int) -> list[int]:
+    num_total = len(x)
+    if num_points >= num_total or num_points < 3:
+        return list(range(num_total))
+
+    # Every point except the first and last falls into one of num_points - 2 buckets
+    bucket_edges = np.linspace(1, num_total - 1, num_points - 1).astype(int)
+
+    chosen = [0]
+    for bucket in range(num_points - 2):
+        start, end = bucket_edges[bucket], bucket_edges[bucket + 1]
+
+        # The average of the next bucket (or the last point) is the third triangle vertex
+        if bucket + 2 < len(bucket_edges):
+            next_start, next_end = bucket_edges[bucket + 1], bucket_edges[bucket + 2]
+        else:
+            next_start, next_end = num_total - 1, num_total
+        next_x = x[next_start:next_end].mean()
+        next_y = y[next_start:next_end].mean()
+
+        previous = chosen[-1]
+        areas = np.abs(
+            (x[previous] - next_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (next_y - y[previous])
+        )
+        chosen.append(start + int(np.argmax(areas)))
+
+    chosen.append(num_total - 1)
+    return chosen
+
+
+def downsample_handicap_data(
+    handicap_data: list[HandicapData], num_points: int
+) -> list[HandicapData]:
+    if len(handicap_data) <= num_points:
+        return handicap_data
+
+    timestamps = np.array([data.date.timestamp() for data in handicap_data])
+    handicaps = np.array([data.handicap for data in handicap_data])
+
+    return [
+        handicap_data[i] for i in downsample_lttb(timestamps, handicaps, num_points)
+    ]
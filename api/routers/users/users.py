@@ -1,4 +1,4 @@
-import heapq
+from datetime import datetime
 
 from bson import ObjectId
 from bson.errors import InvalidId
@@ -6,7 +6,9 @@ from fastapi import APIRouter, Depends, HTTPException, Query, status
 from motor.motor_asyncio import AsyncIOMotorCollection
 
 from ...db import get_collection
-from .models import LoginUser, RegisterUser, User
+from .models import HandicapData, LoginUser, RegisterUser, User, UserStats
+from .stats import get_user_stats
+from .timeline import HandicapTimeline, downsample_handicap_data
 from .utils import get_password_hash, verify_password
 
 users_router = APIRouter()
@@ -152,6 +154,65 @@ async def get_user(
     return User(**user)
 
 
+@users_router.get(
+    "/{user_id}/handicap-history",
+    response_model=list[HandicapData],
+    description="Get a user's handicap history between two dates, optionally downsampled to at most `points` points",
+)
+async def get_handicap_history(
+    user_id: str,
+    from_date: datetime | None = Query(None, alias="from"),
+    to_date: datetime | None = Query(None, alias="to"),
+    points: int | None = Query(
+        None, ge=3, description="Maximum number of points to return"
+    ),
+    users_collection: AsyncIOMotorCollection = Depends(get_collection("users")),
+):
+
+    try:
+        user_object_id = ObjectId(user_id)
+    except InvalidId as exception:
+        raise HTTPException(status_code=422, detail="Invalid User ID") from exception
+
+    user = await users_collection.find_one(
+        {"_id": user_object_id}, {"handicap_data": 1}
+    )
+
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    timeline = HandicapTimeline(
+        [HandicapData(**data) for data in user.get("handicap_data", [])]
+    )
+    handicap_data = timeline.between(from_date, to_date)
+
+    if points is not None:
+        handicap_data = downsample_handicap_data(handicap_data, points)
+
+    return handicap_data
+
+
+@users_router.get(
+    "/{user_id}/stats",
+    response_model=UserStats,
+    description="Get a user's scoring averages and score distribution",
+)
+async def get_user_stats_api(
+    user_id: str,
+    user_stats_collection: AsyncIOMotorCollection = Depends(
+        get_collection("user_stats")
+    ),
+    users_collection: AsyncIOMotorCollection = Depends(get_collection("users")),
+):
+
+    try:
+        user_object_id = ObjectId(user_id)
+    except InvalidId as exception:
+        raise HTTPException(status_code=422, detail="Invalid User ID") from exception
+
+    return await get_user_stats(user_object_id, user_stats_collection, users_collection)
+
+
 @users_router.get("/{user_id}")
 async def get_user_api(
     user_id: str,
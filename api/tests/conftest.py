@@ -0,0 +1,114 @@
+import asyncio
+import os
+
+import httpx
+import pytest
+from bson import ObjectId
+from mongomock_motor import AsyncMongoMockClient
+
+# api.db reads the URL on import. The tests use an in-memory database instead
+os.environ.setdefault("MONGODB_URL", "mongodb://localhost:27017")
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def db():
+    return AsyncMongoMockClient().get_database("fore_database")
+
+
+PARS = [4, 3, 5, 4, 4, 3, 5, 4, 4] * 2
+STROKE_INDEXES = [5, 17, 1, 9, 3, 15, 7, 11, 13, 6, 18, 2, 10, 4, 16, 8, 12, 14]
+
+
+def make_course_document(**fields) -> dict:
+    course = {
+        "_id": ObjectId(),
+        "address": "1 Main St",
+        "city": "Pebble Beach",
+        "coordinates": "36.5681, -121.9486",
+        "country": "Usa",
+        "created_at": "2020-01-01T00:00:00.000Z",
+        "fairway_grass": "",
+        "green_grass": "",
+        "num_holes": 18,
+        "length_format": "Y",
+        "name": "Pebble Beach Golf Links",
+        "par": sum(PARS),
+        "phone": "",
+        "state": "Ca",
+        "scorecard": [
+            {
+                "hole_number": hole_number,
+                "par": par,
+                "handicap": stroke_index,
+                "tees": {"teeBox1": {"color": "Blue", "yards": 400}},
+            }
+            for hole_number, (par, stroke_index) in enumerate(
+                zip(PARS, STROKE_INDEXES), start=1
+            )
+        ],
+        "tee_boxes": [
+            {
+                "tee": "Blue",
+                "slope_rating": 140,
+                "course_rating": 74.0,
+                "total_yards": 6800,
+            },
+        ],
+        "updated_at": "2020-01-01T00:00:00.000Z",
+        "website": "",
+        "zip": "93953",
+    }
+    course.update(fields)
+    return course
+
+
+@pytest.fixture
+async def course_document(db):
+    course = make_course_document()
+    await db.get_collection("courses").insert_one(course)
+    return course
+
+
+# A client for the app, using the in-memory database. The app's lifespan isn't run,
+#   so buffered stats are only written when a test flushes them
+@pytest.fixture
+async def client(db, monkeypatch):
+    from .. import db as app_db
+    from ..app import app
+    from ..work_queue import work_queues
+    from ..write_behind import write_behind_buffers
+
+    monkeypatch.setattr(app_db, "db", db)
+    for buffer in write_behind_buffers:
+        monkeypatch.setattr(buffer, "db", db)
+        monkeypatch.setattr(buffer, "pending", {})
+    # Jobs are enqueued but never worked, unless a test runs them
+    for work_queue in work_queues:
+        monkeypatch.setattr(work_queue, "db", db)
+        monkeypatch.setattr(work_queue, "queue", asyncio.Queue())
+        monkeypatch.setattr(work_queue, "queued_keys", set())
+
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        yield client
+
+
+@pytest.fixture
+async def user_id(client):
+    response = await client.post(
+        "/users/register",
+        json={
+            "name": "Test",
+            "username": "tester",
+            "email": "tester@example.com",
+            "password": "Passw0rd!",
+            "password_confirmation": "Passw0rd!",
+        },
+    )
+    return response.json()["id"]
@@ -0,0 +1,107 @@
+import pytest
+from bson import ObjectId
+
+from ..routers.courses.autocomplete import CourseSearchIndex
+
+pytestmark = pytest.mark.anyio
+
+
+def make_course(name: str, city: str, state: str, **fields) -> dict:
+    return {"_id": ObjectId(), "name": name, "city": city, "state": state, **fields}
+
+
+@pytest.fixture
+def courses() -> dict[str, dict]:
+    return {
+        "pebble": make_course("Pebble Beach Golf Links", "Pebble Beach", "CA"),
+        "spyglass": make_course("Spyglass Hill Golf Course", "Pebble Beach", "CA"),
+        "pinehurst": make_course("Pinehurst No. 2", "Pinehurst", "NC"),
+        "pine_valley": make_course("Pine Valley Golf Club", "Pine Valley", "NJ"),
+        "bethpage": make_course("Bethpage Black", "Farmingdale", "NY"),
+    }
+
+
+@pytest.fixture
+def index(courses) -> CourseSearchIndex:
+    index = CourseSearchIndex()
+    for course in courses.values():
+        index.add(course)
+    return index
+
+
+def search_names(index: CourseSearchIndex, query: str, limit: int = 10) -> list[str]:
+    return [suggestion.name for suggestion in index.search(query, limit)]
+
+
+def test_last_token_is_matched_as_a_prefix(index):
+    # An exact token match beats a completion
+    assert search_names(index, "pine") == [
+        "Pine Valley Golf Club",
+        "Pinehurst No. 2",
+    ]
+    assert search_names(index, "pine v") == ["Pine Valley Golf Club"]
+
+
+def test_name_matches_rank_above_location_matches(index):
+    assert search_names(index, "pebble") == [
+        "Pebble Beach Golf Links",
+        "Spyglass Hill Golf Course",
+    ]
+
+
+def test_every_token_has_to_match(index):
+    assert search_names(index, "golf black") == []
+
+
+def test_accents_and_case_are_ignored(index):
+    assert search_names(index, "BÉTHPAGE") == ["Bethpage Black"]
+
+
+def test_misspelled_tokens_fall_back_to_fuzzy_matches(index):
+    assert search_names(index, "spyglas hil") == ["Spyglass Hill Golf Course"]
+    assert search_names(index, "bethpgae") == ["Bethpage Black"]
+
+
+def test_results_are_limited(index):
+    assert len(index.search("golf", 2)) == 2
+
+
+def test_changed_course_replaces_its_old_entry(index, courses):
+    renamed = {**courses["bethpage"], "name": "Bethpage Red"}
+
+    index.add(renamed)
+
+    assert len(index) == len(courses)
+    assert index.num_dead == 1
+    assert search_names(index, "black") == []
+    assert search_names(index, "bethpage") == ["Bethpage Red"]
+
+
+def test_compaction_keeps_only_live_entries(index, courses):
+    index.add({**courses["bethpage"], "name": "Bethpage Red"})
+    index.add({**courses["pinehurst"], "name": "Pinehurst No. 4"})
+    expected = {query: search_names(index, query) for query in ("beth", "pine", "no")}
+
+    index.compact()
+
+    assert index.num_dead == 0
+    assert len(index.suggestions) == len(courses)
+    assert "black" not in index.name_postings.token_ids
+    assert {query: search_names(index, query) for query in expected} == expected
+
+
+async def test_refresh_indexes_only_newly_synced_courses(db, courses):
+    courses_collection = db.get_collection("courses")
+    for days, course in enumerate(courses.values(), start=1):
+        course["synced_at"] = f"2024-01-0{days}T00:00:00Z"
+    await courses_collection.insert_many(courses.values())
+    index = CourseSearchIndex()
+    await index.build(courses_collection)
+
+    await courses_collection.update_one(
+        {"_id": courses["bethpage"]["_id"]},
+        {"$set": {"name": "Bethpage Red", "synced_at": "2024-02-01T00:00:00Z"}},
+    )
+
+    assert await index.refresh(courses_collection) == 1
+    assert search_names(index, "bethpage") == ["Bethpage Red"]
@@ -0,0 +1,116 @@
+import pytest
+from fastapi import HTTPException
+
+from ..routers.autofill_scores.autofill_scores import autofill_scores
+from ..routers.autofill_scores.batch import autofill_scores_batch
+from ..routers.autofill_scores.models import MIN_HOLE_SCORE, AutofillHole
+from .conftest import PARS
+
+
+# Unfixed holes start at par, like the endpoint sets them up
+def make_scorecard(fixed_scores: dict[int, int]) -> dict[int, AutofillHole]:
+    return {
+        hole_number: AutofillHole(
+            score=fixed_scores.get(hole_number, par),
+            par=par,
+            fixed=hole_number in fixed_scores,
+        )
+        for hole_number, par in enumerate(PARS, start=1)
+    }
+
+
+@pytest.mark.parametrize("target_total", [10 + 16, 60, 72, 95, 140])
+def test_autofill_reaches_the_target_and_keeps_fixed_scores(target_total):
+    fixed_scores = {1: 7, 5: 3}
+
+    scorecard = autofill_scores(make_scorecard(fixed_scores), target_total, seed=1)
+
+    assert sum(hole.score for hole in scorecard.values()) == target_total
+    assert all(hole.score >= MIN_HOLE_SCORE for hole in scorecard.values())
+    for hole_number, score in fixed_scores.items():
+        assert scorecard[hole_number].score == score
+
+
+def test_autofill_spreads_strokes_evenly():
+    scorecard = autofill_scores(make_scorecard({}), sum(PARS) + 20, seed=1)
+
+    strokes_over_par = [hole.score - hole.par for hole in scorecard.values()]
+    assert sorted(set(strokes_over_par)) == [1, 2]
+
+
+def test_autofill_is_reproducible_with_a_seed():
+    first = autofill_scores(make_scorecard({}), 80, seed=7)
+    second = autofill_scores(make_scorecard({}), 80, seed=7)
+
+    assert first == second
+
+
+@pytest.mark.parametrize(
+    ("fixed_scores", "target_total"),
+    [
+        # The 16 unfixed holes need at least 16 strokes
+        ({1: 7, 5: 3}, 10 + 15),
+        # Every hole is fixed, and they add up to a different total
+        ({hole_number: 4 for hole_number in range(1, 19)}, 73),
+    ],
+)
+def test_autofill_rejects_unreachable_targets(fixed_scores, target_total):
+    with pytest.raises(HTTPException) as exception_info:
+        autofill_scores(make_scorecard(fixed_scores), target_total)
+
+    assert exception_info.value.status_code == 422
+
+
+# The batch endpoint takes scorecards as posted, with no score for the unfilled holes
+def make_batch_scorecard(fixed_scores: dict[int, int]) -> dict[int, AutofillHole]:
+    return {
+        hole_number: AutofillHole(
+            score=fixed_scores.get(hole_number), par=par, fixed=None
+        )
+        for hole_number, par in enumerate(PARS, start=1)
+    }
+
+
+def test_batch_autofill_fills_every_scorecard():
+    fixed_scores = [{}, {1: 7, 5: 3}, {2: 1}, {}]
+    target_totals = [72, 10 + 16, 95, 140]
+
+    results = autofill_scores_batch(
+        [make_batch_scorecard(scores) for scores in fixed_scores], target_totals, seed=1
+    )
+
+    for result, scores, target_total in zip(results, fixed_scores, target_totals):
+        assert result.error is None
+        assert sum(result.scorecard.values()) == target_total
+        assert all(score >= MIN_HOLE_SCORE for score in result.scorecard.values())
+        for hole_number, score in scores.items():
+            assert result.scorecard[str(hole_number)] == score
+
+
+def test_batch_autofill_spreads_strokes_evenly():
+    [result] = autofill_scores_batch([make_batch_scorecard({})], [sum(PARS) + 20])
+
+    strokes_over_par = [
+        score - PARS[int(hole_number) - 1]
+        for hole_number, score in result.scorecard.items()
+    ]
+    assert sorted(set(strokes_over_par)) == [1, 2]
+
+
+def test_batch_autofill_reports_unreachable_targets_in_place():
+    all_fixed = {hole_number: 4 for hole_number in range(1, 19)}
+
+    results = autofill_scores_batch(
+        [
+            make_batch_scorecard({1: 7, 5: 3}),
+            make_batch_scorecard({}),
+            make_batch_scorecard(all_fixed),
+        ],
+        [10 + 15, 80, 73],
+    )
+
+    assert results[0].scorecard is None
+    assert "too low" in results[0].error
+    assert sum(results[1].scorecard.values()) == 80
+    assert results[2].scorecard is None
+    assert "do not add up" in results[2].error
@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+
+from ..cache import AsyncLRUCache
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_concurrent_loads_share_one_call():
+    cache = AsyncLRUCache(10)
+    calls = []
+
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "value"
+
+    values = await asyncio.gather(*(cache.get_or_load("a", load) for _ in range(5)))
+
+    assert values == ["value"] * 5
+    assert len(calls) == 1
+    assert cache.stats()["coalesced"] == 4
+    assert await cache.get_or_load("a", load) == "value"
+    assert len(calls) == 1
+
+
+async def test_waiters_load_again_when_the_loading_lookup_is_cancelled():
+    cache = AsyncLRUCache(10)
+    started = asyncio.Event()
+    calls = []
+
+    async def load():
+        calls.append(1)
+        started.set()
+        await asyncio.sleep(0.01)
+        return "value"
+
+    owner = asyncio.create_task(cache.get_or_load("a", load))
+    await started.wait()
+    waiters = [asyncio.create_task(cache.get_or_load("a", load)) for _ in range(3)]
+    await asyncio.sleep(0)
+
+    owner.cancel()
+    values = await asyncio.wait_for(asyncio.gather(*waiters), timeout=1)
+
+    assert values == ["value"] * 3
+    # The first waiter loaded the value again and the rest waited on it
+    assert len(calls) == 2
+    assert owner.cancelled()
+    assert cache._in_flight == {}
+
+
+async def test_cancelling_a_waiter_leaves_the_load_running():
+    cache = AsyncLRUCache(10)
+    started = asyncio.Event()
+
+    async def load():
+        started.set()
+        await asyncio.sleep(0.01)
+        return "value"
+
+    owner = asyncio.create_task(cache.get_or_load("a", load))
+    await started.wait()
+    waiter = asyncio.create_task(cache.get_or_load("a", load))
+    await asyncio.sleep(0)
+
+    waiter.cancel()
+
+    assert await owner == "value"
+    assert waiter.cancelled()
+
+
+async def test_load_errors_reach_every_waiter_and_are_not_cached():
+    cache = AsyncLRUCache(10)
+
+    async def load():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("Load failed")
+
+    results = await asyncio.gather(
+        *(cache.get_or_load("a", load) for _ in range(3)), return_exceptions=True
+    )
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert cache._in_flight == {}
+    assert "a" not in cache._entries
@@ -0,0 +1,202 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import mongomock
+import pytest
+from bson import ObjectId
+
+from ..jobs.rebuild_course_stats import rebuild_course_stats
+from ..routers.courses.models import Course
+from ..routers.courses.stats import (
+    LEADERBOARD_DAYS,
+    LEADERBOARD_SIZE,
+    add_round_to_course_stats,
+    course_stats_buffer,
+    get_course_stats,
+    get_leaderboard_field,
+    remove_round_from_course_stats,
+)
+from ..routers.users.timeline import to_naive_utc
+
+pytestmark = pytest.mark.anyio
+
+USER_ID = ObjectId()
+
+
+@pytest.fixture
+def course(db, course_document, monkeypatch):
+    monkeypatch.setattr(course_stats_buffer, "db", db)
+    monkeypatch.setattr(course_stats_buffer, "pending", {})
+    return Course(**course_document)
+
+
+def days_ago(days: int, minutes: int = 0) -> datetime:
+    today = to_naive_utc(datetime.now(tz=timezone.utc)).replace(
+        hour=0, minute=0, second=0, microsecond=0
+    )
+    return today - timedelta(days=days) + timedelta(hours=1, minutes=minutes)
+
+
+# A total score round. Scores and dates go up together, so the leaderboard order
+#   is the same whichever of them it's sorted by
+def add_round(course: Course, total: int, date_posted: datetime) -> ObjectId:
+    round_id = ObjectId()
+    add_round_to_course_stats(
+        round_id, USER_ID, {"total": total}, "total-score", course, date_posted
+    )
+    return round_id
+
+
+async def get_leaderboard_scores(db, course: Course) -> list[int]:
+    course_stats = await get_course_stats(course, db.get_collection("course_stats"))
+    return [entry.score for entry in course_stats.leaderboard]
+
+
+async def test_leaderboard_keeps_a_days_lowest_scores(db, course):
+    for minutes, total in enumerate(range(70, 82)):
+        add_round(course, total, days_ago(3, minutes))
+    add_round(course, 85, days_ago(0))
+    await course_stats_buffer.flush()
+
+    assert await get_leaderboard_scores(db, course) == list(
+        range(70, 70 + LEADERBOARD_SIZE)
+    )
+
+
+# The lowest scores of a day before the window don't hide later ones from the same month
+async def test_leaderboard_only_has_rounds_from_its_window(db, course):
+    for minutes in range(LEADERBOARD_SIZE):
+        add_round(course, 60 + minutes, days_ago(LEADERBOARD_DAYS, minutes))
+    add_round(course, 90, days_ago(LEADERBOARD_DAYS - 1))
+    add_round(course, 95, days_ago(1))
+    await course_stats_buffer.flush()
+
+    assert await get_leaderboard_scores(db, course) == [90, 95]
+    course_stats = await get_course_stats(course, db.get_collection("course_stats"))
+    assert course_stats.num_rounds == LEADERBOARD_SIZE + 2
+
+
+async def test_adding_a_round_removes_old_month_leaderboards(db, course):
+    course_stats_collection = db.get_collection("course_stats")
+    stale_day = days_ago(3 * LEADERBOARD_DAYS)
+    await course_stats_collection.insert_one(
+        {
+            "_id": ObjectId(course.id),
+            "leaderboards": {stale_day.strftime("%Y-%m"): {"01": []}},
+        }
+    )
+
+    add_round(course, 80, days_ago(0))
+    await course_stats_buffer.flush()
+
+    course_stats = await course_stats_collection.find_one({"_id": ObjectId(course.id)})
+    assert list(course_stats["leaderboards"]) == [days_ago(0).strftime("%Y-%m")]
+
+
+async def remove_round(db, course: Course, round_id: ObjectId, total: int, date_posted):
+    await remove_round_from_course_stats(
+        round_id, {"total": total}, "total-score", course, date_posted
+    )
+
+
+async def test_removed_round_leaves_the_leaderboard(db, course):
+    round_id = add_round(course, 75, days_ago(2))
+    add_round(course, 80, days_ago(2, 1))
+    await course_stats_buffer.flush()
+
+    await remove_round(db, course, round_id, 75, days_ago(2))
+    await course_stats_buffer.flush()
+
+    assert await get_leaderboard_scores(db, course) == [80]
+
+
+async def test_removed_round_still_buffered_is_never_written(db, course):
+    round_id = add_round(course, 75, days_ago(2))
+    add_round(course, 80, days_ago(2, 1))
+
+    await remove_round(db, course, round_id, 75, days_ago(2))
+    await course_stats_buffer.flush()
+
+    assert await get_leaderboard_scores(db, course) == [80]
+
+
+async def test_removed_round_is_pulled_after_a_flush_writing_it(
+    db, course, monkeypatch
+):
+    collection_type = type(course_stats_buffer.collection)
+    bulk_write = collection_type.bulk_write
+    writing = asyncio.Event()
+    finish_writing = asyncio.Event()
+
+    async def slow_bulk_write(self, *args, **kwargs):
+        writing.set()
+        await finish_writing.wait()
+        return await bulk_write(self, *args, **kwargs)
+
+    monkeypatch.setattr(collection_type, "bulk_write", slow_bulk_write)
+
+    round_id = add_round(course, 75, days_ago(2))
+    flush = asyncio.create_task(course_stats_buffer.flush())
+    await writing.wait()
+
+    remove = asyncio.create_task(remove_round(db, course, round_id, 75, days_ago(2)))
+    await asyncio.sleep(0.01)
+    assert not remove.done()
+
+    finish_writing.set()
+    await flush
+    await remove
+    await course_stats_buffer.flush()
+
+    assert await get_leaderboard_scores(db, course) == []
+
+
+async def test_removed_round_whose_write_failed_is_never_written(
+    db, course, monkeypatch
+):
+    collection_type = type(course_stats_buffer.collection)
+
+    async def failing_bulk_write(self, *args, **kwargs):
+        raise ConnectionError("Server went away")
+
+    round_id = add_round(course, 75, days_ago(2))
+    add_round(course, 80, days_ago(2, 1))
+    with monkeypatch.context() as patch:
+        patch.setattr(collection_type, "bulk_write", failing_bulk_write)
+        await course_stats_buffer.flush()
+    assert course_stats_buffer.pending
+
+    await remove_round(db, course, round_id, 75, days_ago(2))
+    await course_stats_buffer.flush()
+
+    assert await get_leaderboard_scores(db, course) == [80]
+
+
+async def test_rebuild_matches_the_incremental_stats(db, course, course_document):
+    sync_db = mongomock.MongoClient().get_database("fore_database")
+    sync_db.get_collection("courses").insert_one(course_document)
+
+    for days, total in [(LEADERBOARD_DAYS + 5, 70), (10, 80), (2, 75), (0, 90)]:
+        round_id = add_round(course, total, days_ago(days))
+        sync_db.get_collection("rounds").insert_one(
+            {
+                "_id": round_id,
+                "user_id": USER_ID,
+                "course_id": ObjectId(course.id),
+                "scorecard_mode": "total-score",
+                "scorecard": {"total": total},
+                "date_posted": days_ago(days),
+            }
+        )
+    await course_stats_buffer.flush()
+
+    rebuild_course_stats(sync_db)
+
+    incremental = await db.get_collection("course_stats").find_one()
+    rebuilt = sync_db.get_collection("course_stats").find_one()
+    assert rebuilt == incremental
+    assert get_leaderboard_field(days_ago(LEADERBOARD_DAYS + 5)) not in [
+        f"leaderboards.{month}.{day}"
+        for month, days in rebuilt["leaderboards"].items()
+        for day in days
+    ]
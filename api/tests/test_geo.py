@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+from bson import ObjectId
+
+from ..routers.courses.geo import (
+    EARTH_RADIUS_METERS,
+    CourseLocationIndex,
+    KDTree,
+    chord_to_meters,
+    meters_to_chord,
+    parse_coordinates,
+    to_unit_vectors,
+)
+
+
+def random_unit_vectors(rng: np.random.Generator, num_points: int) -> np.ndarray:
+    latitudes = np.degrees(np.arcsin(rng.uniform(-1, 1, num_points)))
+    longitudes = rng.uniform(-180, 180, num_points)
+    return to_unit_vectors(latitudes, longitudes)
+
+
+@pytest.mark.parametrize("num_points", [0, 1, 16, 17, 1000])
+@pytest.mark.parametrize("radius_meters", [1_000, 500_000, 5_000_000, 30_000_000])
+def test_query_radius_matches_brute_force(num_points, radius_meters):
+    rng = np.random.default_rng(num_points)
+    points = random_unit_vectors(rng, num_points)
+    tree = KDTree(points)
+    radius = meters_to_chord(radius_meters)
+
+    for point in random_unit_vectors(rng, 10):
+        indexes, distances = tree.query_radius(point, radius)
+
+        brute_force_distances = np.linalg.norm(points - point, axis=1)
+        expected = np.flatnonzero(brute_force_distances <= radius)
+        assert sorted(indexes) == list(expected)
+        np.testing.assert_allclose(distances, brute_force_distances[indexes])
+
+
+def test_chord_converts_back_to_the_same_distance():
+    meters = np.array([0, 1_000, 100_000, 10_000_000, np.pi * EARTH_RADIUS_METERS])
+
+    chords = np.array([meters_to_chord(m) for m in meters])
+
+    np.testing.assert_allclose(chord_to_meters(chords), meters, atol=1e-3)
+
+
+@pytest.mark.parametrize(
+    ("coordinates", "expected"),
+    [
+        ("36.5686, -121.9505", [-121.9505, 36.5686]),
+        ("-33.9, 151", [151.0, -33.9]),
+        ("95, 10", None),
+        ("36.5686", None),
+        ("", None),
+        (None, None),
+    ],
+)
+def test_parse_coordinates(coordinates, expected):
+    point = parse_coordinates(coordinates)
+
+    if expected is None:
+        assert point is None
+    else:
+        assert point == {"type": "Point", "coordinates": expected}
+
+
+def test_nearby_courses_are_sorted_by_distance_within_the_radius():
+    index = CourseLocationIndex()
+    # Roughly 0, 11, 22 and 111 km north of the search point
+    index.build(
+        [
+            {
+                "_id": ObjectId(),
+                "name": name,
+                "location": {"type": "Point", "coordinates": [-121.95, latitude]},
+            }
+            for name, latitude in [
+                ("Far", 37.57),
+                ("Second", 36.67),
+                ("Closest", 36.57),
+                ("Third", 36.77),
+            ]
+        ]
+    )
+
+    nearby = index.nearby(36.57, -121.95, radius=50_000, limit=10)
+
+    assert [course.name for course in nearby] == ["Closest", "Second", "Third"]
+    assert nearby[0].distance == pytest.approx(0, abs=1)
+    assert nearby[1].distance == pytest.approx(11_120, rel=0.01)
+    assert [course.name for course in index.nearby(36.57, -121.95, 50_000, 2)] == [
+        "Closest",
+        "Second",
+    ]
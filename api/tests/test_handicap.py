@@ -0,0 +1,72 @@
+import random
+
+import pytest
+
+from ..routers.users.handicap import (
+    HANDICAP_ADJUSTMENTS,
+    HANDICAP_WINDOW_SIZE,
+    NUM_ROUNDS_TO_LOWEST_K,
+    ScoreDifferentialWindow,
+    calculate_handicap,
+)
+
+
+# The handicap worked out from scratch: the average of the lowest differentials in the window
+def expected_handicap(score_differentials: list[float]) -> float:
+    window = score_differentials[-HANDICAP_WINDOW_SIZE:]
+    k = NUM_ROUNDS_TO_LOWEST_K[len(window)]
+    lowest = sorted(window)[:k]
+    return sum(lowest) / k + HANDICAP_ADJUSTMENTS.get(len(window), 0)
+
+
+def test_window_keeps_the_most_recent_differentials():
+    rng = random.Random(0)
+    score_differentials = [rng.uniform(-5, 40) for _ in range(HANDICAP_WINDOW_SIZE + 7)]
+    window = ScoreDifferentialWindow()
+
+    for num_added, score_differential in enumerate(score_differentials, start=1):
+        window.add(score_differential)
+
+        added = score_differentials[:num_added]
+        assert window.score_differentials() == added[-HANDICAP_WINDOW_SIZE:]
+        if num_added >= 3:
+            assert window.handicap() == pytest.approx(expected_handicap(added))
+
+
+def test_replaced_differential_changes_the_handicap():
+    rng = random.Random(1)
+    score_differentials = [rng.uniform(-5, 40) for _ in range(12)]
+    window = ScoreDifferentialWindow(score_differentials)
+
+    for index in (0, 5, 11):
+        score_differentials[index] = rng.uniform(-5, 40)
+        window.replace(index, score_differentials[index])
+
+        assert window.score_differentials() == score_differentials
+        assert window.handicap() == pytest.approx(
+            expected_handicap(score_differentials)
+        )
+
+
+def test_repeated_differentials_are_replaced_one_at_a_time():
+    window = ScoreDifferentialWindow([10.0, 10.0, 10.0, 20.0])
+
+    window.replace(1, 30.0)
+
+    assert window.score_differentials() == [10.0, 30.0, 10.0, 20.0]
+    assert window.handicap() == pytest.approx(expected_handicap([10, 30, 10, 20]))
+
+
+def test_handicap_needs_three_differentials():
+    with pytest.raises(ValueError):
+        ScoreDifferentialWindow([10.0, 12.0]).handicap()
+
+
+@pytest.mark.parametrize("num_rounds", [3, 6, 20, 45])
+def test_calculate_handicap_only_uses_the_window(num_rounds):
+    rng = random.Random(num_rounds)
+    score_differentials = [rng.uniform(-5, 40) for _ in range(num_rounds)]
+
+    assert calculate_handicap(score_differentials) == pytest.approx(
+        expected_handicap(score_differentials)
+    )
@@ -0,0 +1,80 @@
+import pytest
+
+from ..routers.autofill_scores.autofill_scores import autofill_scores_by_difficulty
+from ..routers.autofill_scores.hole_profiles import build_hole_profile, get_hole_profile
+from ..routers.autofill_scores.models import AutofillHole
+from ..routers.courses.course_cache import invalidate_course
+from ..routers.courses.models import CourseHole
+from .conftest import PARS, STROKE_INDEXES
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_hole_profile_is_rebuilt_after_the_course_changes(db, course_document):
+    courses_collection = db.get_collection("courses")
+    course_id = str(course_document["_id"])
+
+    hole_profile = await get_hole_profile(course_id, courses_collection)
+    assert hole_profile.hole_numbers[0] == 3
+    assert await get_hole_profile(course_id, courses_collection) is hole_profile
+
+    # Make hole 1 the hardest
+    scorecard = course_document["scorecard"]
+    scorecard[0]["handicap"], scorecard[2]["handicap"] = 1, 5
+    await courses_collection.update_one(
+        {"_id": course_document["_id"]},
+        {
+            "$set": {
+                "scorecard": scorecard,
+                "updated_at": "2024-01-01T00:00:00.000Z",
+            }
+        },
+    )
+    invalidate_course(course_document["_id"])
+
+    hole_profile = await get_hole_profile(course_id, courses_collection)
+    assert hole_profile.hole_numbers[0] == 1
+
+
+# The stroke index 1 hole is a par 3 and the stroke index 2 hole a par 5
+def make_course_scorecard() -> list[CourseHole]:
+    pars = list(PARS)
+    pars[STROKE_INDEXES.index(1)] = 3
+    pars[STROKE_INDEXES.index(2)] = 5
+    return [
+        CourseHole(hole_number=hole_number, par=par, handicap=stroke_index, tees={})
+        for hole_number, (par, stroke_index) in enumerate(
+            zip(pars, STROKE_INDEXES), start=1
+        )
+    ]
+
+
+def test_stroke_index_outweighs_par():
+    hole_profile = build_hole_profile(make_course_scorecard(), "")
+
+    def by_weight(weights: dict[int, float]) -> list[int]:
+        return sorted(weights, key=lambda hole_number: -weights[hole_number])
+
+    hardest_first = [STROKE_INDEXES.index(i) + 1 for i in range(1, 19)]
+    assert list(hole_profile.hole_numbers) == hardest_first
+    assert by_weight(hole_profile.over_par_weights) == hardest_first
+    assert by_weight(hole_profile.under_par_weights) == hardest_first[::-1]
+
+
+@pytest.mark.parametrize(("delta", "stroke_index"), [(1, 1), (-1, 18)])
+def test_single_stroke_goes_to_the_hole_its_stroke_index_picks(delta, stroke_index):
+    course_scorecard = make_course_scorecard()
+    scorecard = {
+        hole.hole_number: AutofillHole(score=hole.par, par=hole.par, fixed=False)
+        for hole in course_scorecard
+    }
+    par = sum(hole.par for hole in course_scorecard)
+
+    scorecard = autofill_scores_by_difficulty(
+        scorecard, par + delta, build_hole_profile(course_scorecard, "")
+    )
+
+    changed = [
+        hole_number for hole_number, hole in scorecard.items() if hole.score != hole.par
+    ]
+    assert changed == [STROKE_INDEXES.index(stroke_index) + 1]
@@ -0,0 +1,134 @@
+import csv
+import io
+
+import pytest
+from bson import ObjectId
+
+from ..routers.rounds import rounds as rounds_module
+from ..routers.users.handicap import calculate_handicap
+
+pytestmark = pytest.mark.anyio
+
+
+def make_import_rounds(course_id: str, num_rounds: int) -> list[dict]:
+    return [
+        {
+            "course_id": course_id,
+            "tee_box_index": 0,
+            "scorecard_mode": "total-score",
+            "scorecard": {"total": 80 + i},
+            "date_posted": f"2023-01-{i + 1:02d}T12:00:00Z",
+        }
+        for i in range(num_rounds)
+    ]
+
+
+async def get_user(db, user_id: str) -> dict:
+    return await db.get_collection("users").find_one({"_id": ObjectId(user_id)})
+
+
+async def test_import_adds_rounds_and_recomputes_the_handicap(
+    client, db, user_id, course_document
+):
+    response = await client.post(
+        f"/users/{user_id}/rounds/import",
+        json=make_import_rounds(str(course_document["_id"]), 5),
+    )
+    assert response.status_code == 201, response.text
+    assert len(response.json()["round_ids"]) == 5
+
+    user = await get_user(db, user_id)
+    rounds = (
+        await db.get_collection("rounds")
+        .find({"user_id": ObjectId(user_id)})
+        .sort("date_posted", 1)
+        .to_list(None)
+    )
+    score_differentials = [golf_round["score_differential"] for golf_round in rounds]
+
+    assert user["rounds"] == [golf_round["_id"] for golf_round in rounds]
+    assert user["recent_score_differentials"] == score_differentials
+    assert [data["handicap"] for data in user["handicap_data"]] == [
+        calculate_handicap(score_differentials[:i]) for i in range(3, 6)
+    ]
+
+
+async def test_importing_an_export_skips_rounds_already_imported(
+    client, db, user_id, course_document
+):
+    rounds_collection = db.get_collection("rounds")
+    await client.post(
+        f"/users/{user_id}/rounds/import",
+        json=make_import_rounds(str(course_document["_id"]), 3),
+    )
+
+    response = await client.get(
+        f"/users/{user_id}/rounds/export", params={"format": "csv"}
+    )
+    assert response.status_code == 200
+    exported = list(csv.DictReader(io.StringIO(response.text)))
+    assert len(exported) == 3
+
+    # One new round, and the same round twice in one import
+    new_round = {**exported[0], "id": str(ObjectId()), "total_score": "99"}
+    body = io.StringIO()
+    writer = csv.DictWriter(body, fieldnames=exported[0].keys())
+    writer.writeheader()
+    writer.writerows(exported + [new_round, new_round])
+
+    response = await client.post(
+        f"/users/{user_id}/rounds/import",
+        content=body.getvalue(),
+        headers={"content-type": "text/csv"},
+    )
+    assert response.status_code == 201, response.text
+    assert len(response.json()["round_ids"]) == 1
+    assert response.json()["num_skipped"] == 4
+
+    user = await get_user(db, user_id)
+    assert len(user["rounds"]) == 4
+    assert await rounds_collection.count_documents({}) == 4
+
+
+async def test_import_is_rejected_if_the_user_changed_while_importing(
+    client, db, user_id, course_document, monkeypatch
+):
+    users_collection = db.get_collection("users")
+    get_cached_courses = rounds_module.get_cached_courses
+
+    posted_round_ids = []
+
+    # A round posted after the import read the user
+    async def get_cached_courses_then_post(*args):
+        if not posted_round_ids:
+            posted_round_ids.append(ObjectId())
+            await users_collection.update_one(
+                {"_id": ObjectId(user_id)}, {"$push": {"rounds": posted_round_ids[0]}}
+            )
+        return await get_cached_courses(*args)
+
+    monkeypatch.setattr(
+        rounds_module, "get_cached_courses", get_cached_courses_then_post
+    )
+
+    response = await client.post(
+        f"/users/{user_id}/rounds/import",
+        json=make_import_rounds(str(course_document["_id"]), 3),
+    )
+
+    assert response.status_code == 409
+    assert await db.get_collection("rounds").count_documents({}) == 0
+    user = await get_user(db, user_id)
+    assert user["rounds"] == posted_round_ids
+    assert user["handicap_data"] == []
+
+
+@pytest.mark.parametrize("field", ["id", "course_id"])
+async def test_import_rejects_malformed_ids(client, user_id, course_document, field):
+    import_round = make_import_rounds(str(course_document["_id"]), 1)[0]
+    import_round[field] = "abc"
+
+    response = await client.post(f"/users/{user_id}/rounds/import", json=[import_round])
+
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == [0, field]
@@ -0,0 +1,58 @@
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+
+from ..pagination import after_cursor_query, decode_cursor, encode_cursor
+
+pytestmark = pytest.mark.anyio
+
+
+def test_cursor_round_trips():
+    object_id = ObjectId()
+    date = datetime(2024, 6, 1, 12, 30)
+
+    assert decode_cursor(encode_cursor(date, object_id)) == (date, object_id)
+    assert decode_cursor(encode_cursor("Pebble", object_id)) == ("Pebble", object_id)
+
+
+@pytest.mark.parametrize("cursor", ["", "not a cursor", "eyJzdHIiOiJhIn0="])
+def test_invalid_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException) as exception_info:
+        decode_cursor(cursor)
+
+    assert exception_info.value.status_code == 422
+
+
+# Pages through every item once, including items that share a sort value
+@pytest.mark.parametrize("direction", [1, -1])
+async def test_pages_cover_every_item_once(db, direction):
+    collection = db.get_collection("items")
+    start = datetime(2024, 1, 1)
+    await collection.insert_many(
+        [{"_id": ObjectId(), "date": start + timedelta(days=i // 3)} for i in range(10)]
+    )
+
+    seen = []
+    query = {}
+    while True:
+        page = (
+            await collection.find(query)
+            .sort([("date", direction), ("_id", direction)])
+            .limit(4)
+            .to_list(None)
+        )
+        seen += [item["_id"] for item in page]
+        if len(page) < 4:
+            break
+        query = after_cursor_query(
+            "date", encode_cursor(page[-1]["date"], page[-1]["_id"]), direction
+        )
+
+    expected = (
+        await collection.find()
+        .sort([("date", direction), ("_id", direction)])
+        .to_list(None)
+    )
+    assert seen == [item["_id"] for item in expected]
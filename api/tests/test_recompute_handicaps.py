@@ -0,0 +1,52 @@
+from datetime import datetime, timedelta
+
+import mongomock
+from bson import ObjectId
+
+from ..jobs.recompute_handicaps import RecomputeHandicapsJob
+from .conftest import make_course_document
+
+USER_ID = ObjectId()
+
+
+def make_round_document(course_id: ObjectId, total: int, days: int) -> dict:
+    return {
+        "_id": ObjectId(),
+        "user_id": USER_ID,
+        "course_id": course_id,
+        "tee_box_index": 0,
+        "caption": None,
+        "scorecard_mode": "total-score",
+        "scorecard": {"total": total},
+        "score_differential": 0.0,
+        "date_posted": datetime(2023, 1, 1) + timedelta(days=days),
+    }
+
+
+def test_recompute_skips_rounds_on_deleted_courses():
+    db = mongomock.MongoClient().get_database("fore_database")
+    course_document = make_course_document()
+    db.get_collection("courses").insert_one(course_document)
+    db.get_collection("users").insert_one({"_id": USER_ID})
+
+    deleted_course_id = ObjectId()
+    db.get_collection("rounds").insert_many(
+        [
+            make_round_document(course_document["_id"], 90, 0),
+            make_round_document(deleted_course_id, 70, 1),
+            make_round_document(course_document["_id"], 85, 2),
+            make_round_document(course_document["_id"], 95, 3),
+        ]
+    )
+
+    RecomputeHandicapsJob(db, workers=1, chunk_size=500, cursor_batch_size=100).run(
+        restart=True
+    )
+
+    user = db.get_collection("users").find_one({"_id": USER_ID})
+    assert len(user["recent_score_differentials"]) == 3
+    assert len(user["handicap_data"]) == 1
+    skipped_round = db.get_collection("rounds").find_one(
+        {"course_id": deleted_course_id}
+    )
+    assert skipped_round["score_differential"] == 0.0
@@ -0,0 +1,150 @@
+import pytest
+from bson import ObjectId
+
+from ..routers.rounds import rounds as rounds_module
+from ..routers.rounds.rounds import recompute_user_handicaps
+from ..routers.users.handicap import HANDICAP_WINDOW_SIZE, calculate_handicap
+
+pytestmark = pytest.mark.anyio
+
+
+async def post_round(client, user_id: str, course_id: str, total: int):
+    response = await client.post(
+        "/rounds/",
+        json={
+            "user_id": user_id,
+            "course_id": course_id,
+            "tee_box_index": 0,
+            "scorecard_mode": "total-score",
+            "scorecard": {"total": total},
+        },
+    )
+    assert response.status_code == 201, response.text
+
+
+async def get_user(db, user_id: str) -> dict:
+    return await db.get_collection("users").find_one({"_id": ObjectId(user_id)})
+
+
+async def test_post_round_adds_the_round_to_the_user(
+    client, db, user_id, course_document
+):
+    await post_round(client, user_id, str(course_document["_id"]), 90)
+
+    user = await get_user(db, user_id)
+    golf_round = await db.get_collection("rounds").find_one()
+    assert golf_round["user_id"] == ObjectId(user_id)
+    assert golf_round["course_id"] == course_document["_id"]
+    assert user["rounds"] == [golf_round["_id"]]
+    assert user["recent_score_differentials"] == [golf_round["score_differential"]]
+    # A handicap needs at least 3 rounds
+    assert user["handicap_data"] == []
+
+
+async def test_post_round_adds_a_handicap_from_the_third_round(
+    client, db, user_id, course_document
+):
+    for total in (80, 85, 90):
+        await post_round(client, user_id, str(course_document["_id"]), total)
+
+    user = await get_user(db, user_id)
+    rounds = (
+        await db.get_collection("rounds").find().sort("date_posted", 1).to_list(None)
+    )
+    score_differentials = [golf_round["score_differential"] for golf_round in rounds]
+    assert user["rounds"] == [golf_round["_id"] for golf_round in rounds]
+    assert user["recent_score_differentials"] == score_differentials
+    assert len(user["handicap_data"]) == 1
+    assert user["handicap_data"][0]["handicap"] == calculate_handicap(
+        score_differentials
+    )
+    assert user["handicap_data"][0]["date"] == rounds[-1]["date_posted"]
+
+
+async def test_post_round_keeps_the_window_of_recent_differentials(
+    client, db, user_id, course_document
+):
+    for total in range(70, 70 + HANDICAP_WINDOW_SIZE + 2):
+        await post_round(client, user_id, str(course_document["_id"]), total)
+
+    user = await get_user(db, user_id)
+    rounds = (
+        await db.get_collection("rounds").find().sort("date_posted", 1).to_list(None)
+    )
+    score_differentials = [golf_round["score_differential"] for golf_round in rounds]
+    assert len(user["rounds"]) == HANDICAP_WINDOW_SIZE + 2
+    assert (
+        user["recent_score_differentials"]
+        == score_differentials[-HANDICAP_WINDOW_SIZE:]
+    )
+    assert user["handicap_data"][-1]["handicap"] == calculate_handicap(
+        score_differentials
+    )
+
+
+async def test_post_round_rejects_an_unknown_course(client, db, user_id):
+    response = await client.post(
+        "/rounds/",
+        json={
+            "user_id": user_id,
+            "course_id": str(ObjectId()),
+            "tee_box_index": 0,
+            "scorecard_mode": "total-score",
+            "scorecard": {"total": 90},
+        },
+    )
+
+    assert response.status_code == 404
+    assert await db.get_collection("rounds").count_documents({}) == 0
+
+
+async def test_recompute_updates_the_handicap_from_the_rounds(
+    client, db, user_id, course_document
+):
+    for total in (80, 85, 90):
+        await post_round(client, user_id, str(course_document["_id"]), total)
+    user = await get_user(db, user_id)
+    rounds_collection = db.get_collection("rounds")
+    first_round = await rounds_collection.find_one({"_id": user["rounds"][0]})
+    await rounds_collection.update_one(
+        {"_id": first_round["_id"]}, {"$set": {"scorecard": {"total": 70}}}
+    )
+
+    await recompute_user_handicaps(db, ObjectId(user_id), first_round["date_posted"])
+
+    user = await get_user(db, user_id)
+    rounds = await rounds_collection.find().sort("date_posted", 1).to_list(None)
+    score_differentials = [golf_round["score_differential"] for golf_round in rounds]
+    assert score_differentials[0] < first_round["score_differential"]
+    assert user["recent_score_differentials"] == score_differentials
+    assert user["handicap_data"][-1]["handicap"] == calculate_handicap(
+        score_differentials
+    )
+
+
+async def test_recompute_fails_if_a_round_is_posted_while_it_runs(
+    client, db, user_id, course_document, monkeypatch
+):
+    course_id = str(course_document["_id"])
+    for total in (80, 85, 90):
+        await post_round(client, user_id, course_id, total)
+    user_before = await get_user(db, user_id)
+    fetch_rounds = rounds_module.fetch_rounds
+
+    async def fetch_rounds_then_post(*args):
+        rounds = await fetch_rounds(*args)
+        await post_round(client, user_id, course_id, 75)
+        return rounds
+
+    monkeypatch.setattr(rounds_module, "fetch_rounds", fetch_rounds_then_post)
+
+    with pytest.raises(RuntimeError):
+        await recompute_user_handicaps(
+            db, ObjectId(user_id), user_before["handicap_data"][0]["date"]
+        )
+
+    # The posted round's handicap is kept, for the queue's retry to recompute from
+    user = await get_user(db, user_id)
+    assert len(user["rounds"]) == 4
+    assert len(user["recent_score_differentials"]) == 4
+    assert len(user["handicap_data"]) == 2
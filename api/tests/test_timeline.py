@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from ..routers.users.models import HandicapData
+from ..routers.users.timeline import (
+    HandicapTimeline,
+    downsample_handicap_data,
+    downsample_lttb,
+)
+
+
+def test_lttb_keeps_the_ends_and_the_requested_number_of_points():
+    x = np.arange(100, dtype=float)
+    y = np.sin(x / 10)
+
+    chosen = downsample_lttb(x, y, 10)
+
+    assert len(chosen) == 10
+    assert chosen[0] == 0 and chosen[-1] == 99
+    assert chosen == sorted(set(chosen))
+
+
+def test_lttb_keeps_a_spike():
+    x = np.arange(50, dtype=float)
+    y = np.zeros(50)
+    y[23] = 10
+
+    assert 23 in downsample_lttb(x, y, 5)
+
+
+def test_lttb_returns_every_point_when_there_are_few_enough():
+    x = np.arange(5, dtype=float)
+
+    assert downsample_lttb(x, x, 10) == [0, 1, 2, 3, 4]
+    assert downsample_lttb(x, x, 2) == [0, 1, 2, 3, 4]
+
+
+def test_downsample_handicap_data_keeps_the_first_and_latest_handicap():
+    start = datetime(2024, 1, 1)
+    handicap_data = [
+        HandicapData(handicap=20 - i / 10, date=start + timedelta(days=i))
+        for i in range(200)
+    ]
+
+    downsampled = downsample_handicap_data(handicap_data, 20)
+
+    assert len(downsampled) == 20
+    assert downsampled[0] == handicap_data[0]
+    assert downsampled[-1] == handicap_data[-1]
+
+
+def test_timeline_looks_up_by_date_whatever_the_input_order():
+    start = datetime(2024, 1, 1)
+    handicap_data = [
+        HandicapData(handicap=float(i), date=start + timedelta(days=i))
+        for i in (3, 1, 2)
+    ]
+    timeline = HandicapTimeline(handicap_data)
+
+    assert timeline.handicap_before(start + timedelta(days=1)) is None
+    assert timeline.handicap_before(start + timedelta(days=2, hours=1)) == 2
+    assert [
+        data.handicap for data in timeline.between(start + timedelta(days=2), None)
+    ] == [2, 3]
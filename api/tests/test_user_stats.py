@@ -0,0 +1,136 @@
+import mongomock
+import pytest
+from bson import ObjectId
+
+from ..jobs.rebuild_user_stats import rebuild_user_stats
+from ..routers.users.stats import user_stats_buffer
+from .conftest import PARS, make_course_document
+
+pytestmark = pytest.mark.anyio
+
+USER_ID = ObjectId()
+
+
+async def post_round(client, user_id: str, course_id: str, scorecard_mode, scorecard):
+    response = await client.post(
+        "/rounds/",
+        json={
+            "user_id": user_id,
+            "course_id": course_id,
+            "tee_box_index": 0,
+            "scorecard_mode": scorecard_mode,
+            "scorecard": scorecard,
+        },
+    )
+    assert response.status_code == 201, response.text
+
+
+async def get_stats(client, user_id: str) -> dict:
+    await user_stats_buffer.flush()
+    response = await client.get(f"/users/{user_id}/stats")
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+# A birdie on the 1st hole, a bogey on the 2nd and pars everywhere else
+def make_all_holes_scorecard() -> dict[str, int]:
+    scorecard = {str(hole): par for hole, par in enumerate(PARS, start=1)}
+    scorecard["1"] -= 1
+    scorecard["2"] += 1
+    return scorecard
+
+
+async def test_posted_rounds_add_to_the_stats(client, user_id, course_document):
+    course_id = str(course_document["_id"])
+    await post_round(
+        client, user_id, course_id, "all-holes", make_all_holes_scorecard()
+    )
+    await post_round(client, user_id, course_id, "total-score", {"total": 90})
+
+    stats = await get_stats(client, user_id)
+
+    par = sum(PARS)
+    assert stats["num_rounds"] == 2
+    assert stats["scoring"]["18"] == {
+        "num_rounds": 2,
+        "scoring_average": (par + 90) / 2,
+        "average_to_par": (90 - par) / 2,
+    }
+    # Only the hole by hole round counts towards the holes' stats
+    assert stats["score_distribution"]["birdie"] == 1
+    assert stats["score_distribution"]["bogey"] == 1
+    assert stats["score_distribution"]["par"] == 16
+    par_3s = next(par_type for par_type in stats["par_types"] if par_type["par"] == 3)
+    assert par_3s == {"par": 3, "num_holes": 4, "scoring_average": 13 / 4}
+
+
+async def test_edited_round_replaces_its_stats(client, db, user_id, course_document):
+    course_id = str(course_document["_id"])
+    await post_round(
+        client, user_id, course_id, "all-holes", make_all_holes_scorecard()
+    )
+    posted_round = await db.get_collection("rounds").find_one()
+
+    response = await client.put(
+        f"/rounds/{posted_round['_id']}",
+        json={
+            "user_id": user_id,
+            "course_id": course_id,
+            "tee_box_index": 0,
+            "scorecard_mode": "total-score",
+            "scorecard": {"total": 85},
+        },
+    )
+    assert response.status_code == 200, response.text
+
+    stats = await get_stats(client, user_id)
+
+    assert stats["num_rounds"] == 1
+    assert stats["scoring"]["18"]["scoring_average"] == 85
+    assert stats["par_types"] == []
+    assert sum(stats["score_distribution"].values()) == 0
+
+
+async def test_imported_rounds_add_to_the_stats(client, user_id, course_document):
+    response = await client.post(
+        f"/users/{user_id}/rounds/import",
+        json=[
+            {
+                "course_id": str(course_document["_id"]),
+                "tee_box_index": 0,
+                "scorecard_mode": "total-score",
+                "scorecard": {"total": total},
+                "date_posted": f"2023-01-0{day}T12:00:00Z",
+            }
+            for day, total in [(1, 80), (2, 84)]
+        ],
+    )
+    assert response.status_code == 201, response.text
+
+    stats = await get_stats(client, user_id)
+
+    assert stats["num_rounds"] == 2
+    assert stats["scoring"]["18"]["scoring_average"] == 82
+
+
+def test_rebuild_skips_rounds_on_deleted_courses():
+    db = mongomock.MongoClient().get_database("fore_database")
+    course_document = make_course_document()
+    db.get_collection("courses").insert_one(course_document)
+    db.get_collection("rounds").insert_many(
+        [
+            {
+                "user_id": USER_ID,
+                "course_id": course_id,
+                "scorecard_mode": "total-score",
+                "scorecard": {"total": total},
+            }
+            for course_id, total in [(course_document["_id"], 80), (ObjectId(), 70)]
+        ]
+    )
+
+    rebuild_user_stats(db)
+
+    user_stats = db.get_collection("user_stats").find_one({"_id": USER_ID})
+    assert user_stats["num_rounds"] == 1
+    assert user_stats["scoring"]["18"]["strokes"] == 80
@@ -0,0 +1,165 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from ..work_queue import MAX_ATTEMPTS, OutboxWorkQueue, utc_now, work_queues
+
+pytestmark = pytest.mark.anyio
+
+SINCE = datetime(2024, 1, 1)
+
+
+# Run the next queued job the way a worker does
+async def run_next(queue: OutboxWorkQueue) -> None:
+    key = await queue.queue.get()
+    queue.queued_keys.discard(key)
+    await queue.run(key)
+
+
+@pytest.fixture
+def handled():
+    return []
+
+
+@pytest.fixture
+def queue(db, handled):
+    async def handler(db, key, since):
+        handled.append((key, since))
+
+    queue = OutboxWorkQueue("jobs", handler)
+    work_queues.remove(queue)
+    queue.db = db
+    queue.queue = asyncio.Queue()
+    return queue
+
+
+@pytest.fixture
+def failing_queue(db):
+    async def handler(db, key, since):
+        raise RuntimeError("Handler failed")
+
+    queue = OutboxWorkQueue("jobs", handler)
+    work_queues.remove(queue)
+    queue.db = db
+    queue.queue = asyncio.Queue()
+    return queue
+
+
+async def test_enqueue_coalesces_jobs_for_a_key(queue, handled):
+    await queue.enqueue("a", SINCE + timedelta(days=3))
+    await queue.enqueue("a", SINCE)
+    await queue.enqueue("a", SINCE + timedelta(days=1))
+
+    assert await queue.collection.count_documents({}) == 1
+    assert queue.queue.qsize() == 1
+
+    await run_next(queue)
+
+    assert handled == [("a", SINCE)]
+    assert await queue.collection.count_documents({}) == 0
+    assert queue.stats()["coalescing_ratio"] == 3
+
+
+# A job left claimed by a process that stopped, or that ran past its lease
+@pytest.mark.parametrize("has_enqueued_at", [True, False])
+async def test_job_with_expired_lease_is_run_and_deleted(
+    queue, handled, has_enqueued_at
+):
+    now = utc_now()
+    job = {
+        "_id": "a",
+        "since": SINCE,
+        "version": 1,
+        "attempts": 1,
+        "available_at": now - timedelta(seconds=1),
+    }
+    if has_enqueued_at:
+        job["enqueued_at"] = now - timedelta(minutes=10)
+    await queue.collection.insert_one(job)
+
+    await queue.run("a")
+
+    assert handled == [("a", SINCE)]
+    assert await queue.collection.count_documents({}) == 0
+    assert queue.stats()["runs"] == 1
+
+
+async def test_job_with_unexpired_lease_is_not_claimed(queue, handled):
+    await queue.enqueue("a", SINCE)
+    await queue.collection.update_one(
+        {"_id": "a"}, {"$set": {"available_at": utc_now() + timedelta(minutes=1)}}
+    )
+
+    await queue.run("a")
+
+    assert handled == []
+    assert await queue.collection.count_documents({}) == 1
+
+
+async def test_job_enqueued_while_running_is_run_again(db, handled):
+    async def handler(db, key, since):
+        handled.append((key, since))
+        if len(handled) == 1:
+            await queue.enqueue(key, SINCE + timedelta(days=1))
+
+    queue = OutboxWorkQueue("jobs", handler)
+    work_queues.remove(queue)
+    queue.db = db
+    queue.queue = asyncio.Queue()
+
+    await queue.enqueue("a", SINCE)
+    await run_next(queue)
+
+    job = await queue.collection.find_one({"_id": "a"})
+    assert job["attempts"] == 0
+    assert job["available_at"] <= utc_now()
+    assert queue.queue.qsize() == 1
+
+    await run_next(queue)
+
+    assert len(handled) == 2
+    assert await queue.collection.count_documents({}) == 0
+
+
+async def test_failed_job_is_retried_then_marked_failed(failing_queue):
+    await failing_queue.enqueue("a", SINCE)
+
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        # Make the job due now instead of waiting out its retry delay
+        await failing_queue.collection.update_one(
+            {"_id": "a"}, {"$set": {"available_at": utc_now()}}
+        )
+        await failing_queue.run("a")
+
+        job = await failing_queue.collection.find_one({"_id": "a"})
+        assert job["attempts"] == attempt
+        if attempt < MAX_ATTEMPTS:
+            assert job["available_at"] > utc_now()
+            assert "failed_at" not in job
+
+    assert "failed_at" in job
+    assert failing_queue.stats()["retries"] == MAX_ATTEMPTS - 1
+    assert failing_queue.stats()["failed"] == 1
+
+    # A failed job isn't claimed again until it's enqueued again
+    await failing_queue.run("a")
+    job = await failing_queue.collection.find_one({"_id": "a"})
+    assert job["attempts"] == MAX_ATTEMPTS
+
+
+async def test_failed_job_enqueued_again_gets_its_retries_back(failing_queue):
+    await failing_queue.enqueue("a", SINCE)
+    for _ in range(MAX_ATTEMPTS):
+        await failing_queue.collection.update_one(
+            {"_id": "a"}, {"$set": {"available_at": utc_now()}}
+        )
+        await failing_queue.run("a")
+
+    await failing_queue.enqueue("a", SINCE)
+    await failing_queue.run("a")
+
+    job = await failing_queue.collection.find_one({"_id": "a"})
+    assert job["attempts"] == 1
+    assert "failed_at" not in job
+    assert job["available_at"] > utc_now()
@@ -0,0 +1,149 @@
+import pytest
+from pymongo.errors import BulkWriteError
+
+from ..write_behind import (
+    MAX_FLUSH_ATTEMPTS,
+    WriteBehindBuffer,
+    merge_update,
+    write_behind_buffers,
+)
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def buffer(db):
+    buffer = WriteBehindBuffer("counters", flush_interval=0.01)
+    write_behind_buffers.remove(buffer)
+    buffer.db = db
+    return buffer
+
+
+def test_merge_update_combines_each_operator():
+    pending = {}
+    merge_update(
+        pending,
+        {
+            "$inc": {"count": 1},
+            "$min": {"low": 5},
+            "$max": {"high": 5},
+            "$set": {"name": "first"},
+            "$setOnInsert": {"created": 1},
+            "$push": {"items": {"$each": [1], "$slice": 10}},
+        },
+    )
+    merge_update(
+        pending,
+        {
+            "$inc": {"count": 2, "other": 1},
+            "$min": {"low": 3},
+            "$max": {"high": 3},
+            "$set": {"name": "second"},
+            "$setOnInsert": {"created": 2},
+            "$push": {"items": 2},
+        },
+    )
+
+    assert pending == {
+        "$inc": {"count": 3, "other": 1},
+        "$min": {"low": 3},
+        "$max": {"high": 5},
+        "$set": {"name": "second"},
+        "$setOnInsert": {"created": 1},
+        "$push": {"items": {"$each": [1, 2], "$slice": 10}},
+    }
+
+
+def test_merge_update_rejects_operators_it_cannot_merge():
+    with pytest.raises(ValueError):
+        merge_update({}, {"$rename": {"field": "other"}})
+
+
+async def test_flush_writes_one_merged_update_per_document(buffer):
+    for _ in range(3):
+        buffer.update("a", {"$inc": {"count": 1}})
+    buffer.update("b", {"$inc": {"count": 5}})
+
+    await buffer.flush()
+
+    assert await buffer.collection.find().sort("_id", 1).to_list(None) == [
+        {"_id": "a", "count": 3},
+        {"_id": "b", "count": 5},
+    ]
+    assert buffer.pending == {}
+    assert buffer.stats()["merge_ratio"] == 2
+
+
+async def test_failed_flush_is_retried_with_updates_buffered_since(buffer, monkeypatch):
+    async def bulk_write(*args, **kwargs):
+        raise ConnectionError("Server went away")
+
+    buffer.update("a", {"$inc": {"count": 1}})
+    collection = buffer.collection
+    monkeypatch.setattr(type(collection), "bulk_write", bulk_write)
+    await buffer.flush()
+    monkeypatch.undo()
+
+    assert buffer.pending == {"a": {"$inc": {"count": 1}}}
+
+    buffer.update("a", {"$inc": {"count": 2}})
+    await buffer.flush()
+
+    assert await buffer.collection.find_one({"_id": "a"}) == {"_id": "a", "count": 3}
+    assert buffer.failed_attempts == {}
+    assert buffer.stats()["failed_writes"] == 1
+
+
+async def test_update_that_keeps_failing_is_dropped(buffer, monkeypatch):
+    collection_type = type(buffer.collection)
+    bulk_write = collection_type.bulk_write
+
+    # The server rejects every update to "bad", e.g. an $inc of a field that isn't a number
+    async def bulk_write_failing_bad(self, requests, **kwargs):
+        bad_indexes = [
+            index
+            for index, request in enumerate(requests)
+            if request._filter["_id"] == "bad"
+        ]
+        good_requests = [
+            request for request in requests if request._filter["_id"] != "bad"
+        ]
+        if good_requests:
+            await bulk_write(self, good_requests, **kwargs)
+        if bad_indexes:
+            raise BulkWriteError(
+                {
+                    "writeErrors": [
+                        {"index": index, "code": 14, "errmsg": "Cannot apply $inc"}
+                        for index in bad_indexes
+                    ]
+                }
+            )
+
+    monkeypatch.setattr(collection_type, "bulk_write", bulk_write_failing_bad)
+
+    for _ in range(MAX_FLUSH_ATTEMPTS):
+        buffer.update("bad", {"$inc": {"count": 1}})
+        buffer.update("good", {"$inc": {"count": 1}})
+        await buffer.flush()
+
+    assert buffer.pending == {}
+    assert buffer.failed_attempts == {}
+    assert buffer.stats()["dropped"] == 1
+    assert buffer.stats()["failed_writes"] == MAX_FLUSH_ATTEMPTS
+    assert await buffer.collection.find_one({"_id": "good"}) == {
+        "_id": "good",
+        "count": MAX_FLUSH_ATTEMPTS,
+    }
+
+
+async def test_drain_writes_everything_still_buffered(buffer, db):
+    buffer.start(db)
+    buffer.update("a", {"$inc": {"count": 1}})
+
+    await buffer.drain()
+    buffer.update("b", {"$inc": {"count": 1}})
+    await buffer.drain()
+
+    assert buffer.task is None
+    assert await buffer.collection.count_documents({}) == 2
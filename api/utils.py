@@ -1,5 +1,26 @@
-from typing import Annotated
+import json
+from datetime import datetime
+from typing import Annotated, Any
 
+from bson import ObjectId
+from fastapi import Response
 from pydantic import BeforeValidator
 
 PyObjectId = Annotated[str, BeforeValidator(str)]
+
+
+def encode_bson_value(value: Any) -> str:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+# Send trusted database output, already shaped like the response model, as JSON
+#   without validating it through the model again
+def bson_json_response(content: Any) -> Response:
+    return Response(
+        json.dumps(content, default=encode_bson_value, separators=(",", ":")),
+        media_type="application/json",
+    )
@@ -0,0 +1,247 @@
+import asyncio
+import logging
+import os
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Hashable
+
+from motor.motor_asyncio import AsyncIOMotorCollection, AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_NUM_WORKERS = int(os.environ.get("WORK_QUEUE_WORKERS", 4))
+# Once this many jobs are waiting, enqueueing waits for a worker to free up space
+DEFAULT_MAX_QUEUED = int(os.environ.get("WORK_QUEUE_MAX_QUEUED", 1000))
+
+# A claimed job that isn't finished within its lease is claimed again,
+#   e.g. if the process running it was restarted
+LEASE_SECONDS = 5 * 60
+MAX_ATTEMPTS = 5
+RETRY_DELAY_SECONDS = 10  # Doubled after every failed attempt
+# How often the outbox is checked for jobs to retry or left over from a restart
+POLL_INTERVAL_SECONDS = 15
+# Job latencies are kept for this many of the most recent jobs
+LATENCY_SAMPLE_SIZE = 1000
+
+# Every queue created, so the app can start and stop them with the database
+work_queues: list["OutboxWorkQueue"] = []
+
+
+def utc_now() -> datetime:
+    # MongoDB returns naive UTC datetimes, so they're compared that way
+    return datetime.now(tz=timezone.utc).replace(tzinfo=None)
+
+
+# A queue of jobs run in the background by a pool of asyncio workers. Each job is saved to an
+#   outbox collection before it's queued, so jobs aren't lost on a restart and failed jobs are
+#   retried. There's one outbox document per key, so jobs for a key that haven't run yet are
+#   coalesced into one run from the earliest "since" date any of them asked for
+class OutboxWorkQueue:
+    def __init__(
+        self,
+        collection_name: str,
+        handler: Callable[[AsyncIOMotorDatabase, Hashable, datetime], Awaitable[Any]],
+        num_workers: int = DEFAULT_NUM_WORKERS,
+        max_queued: int = DEFAULT_MAX_QUEUED,
+    ):
+        self.collection_name = collection_name
+        self.handler = handler
+        self.num_workers = num_workers
+        self.max_queued = max_queued
+
+        self.db: AsyncIOMotorDatabase | None = None
+        self.queue: asyncio.Queue | None = None
+        self.queued_keys: set[Hashable] = set()
+        self.tasks: list[asyncio.Task] = []
+
+        self.num_requested = 0
+        self.num_runs = 0
+        self.num_retries = 0
+        self.num_failed = 0
+        self.num_running = 0
+        self.latencies: deque[float] = deque(maxlen=LATENCY_SAMPLE_SIZE)
+
+        work_queues.append(self)
+
+    @property
+    def collection(self) -> AsyncIOMotorCollection:
+        return self.db.get_collection(self.collection_name)
+
+    async def start(self, db: AsyncIOMotorDatabase) -> None:
+        self.db = db
+        self.queue = asyncio.Queue(maxsize=self.max_queued)
+        await self.collection.create_index("available_at")
+
+        self.tasks = [
+            asyncio.create_task(self.work()) for _ in range(self.num_workers)
+        ] + [asyncio.create_task(self.poll())]
+
+    # Jobs still running are picked up again once their lease expires
+    async def stop(self) -> None:
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+    async def enqueue(self, key: Hashable, since: datetime) -> None:
+        now = utc_now()
+        await self.collection.update_one(
+            {"_id": key},
+            {
+                "$min": {"since": since, "enqueued_at": now},
+                # Lets a running job tell if it was enqueued again while it ran
+                "$inc": {"version": 1},
+                # A job that failed gets its retries again. A running job keeps
+                #   the attempt count it was claimed with
+                "$set": {"attempts": 0},
+                "$setOnInsert": {"available_at": now},
+                "$unset": {"failed_at": ""},
+            },
+            upsert=True,
+        )
+
+        self.num_requested += 1
+        await self.put(key)
+
+    # Queue the key unless it's queued already. Waits while the queue is full
+    async def put(self, key: Hashable) -> None:
+        if key in self.queued_keys:
+            return
+
+        self.queued_keys.add(key)
+        await self.queue.put(key)
+
+    async def work(self) -> None:
+        while True:
+            key = await self.queue.get()
+            self.queued_keys.discard(key)
+            self.num_running += 1
+            try:
+                await self.run(key)
+            except Exception:
+                logger.exception(
+                    "Work queue %s failed on %s", self.collection_name, key
+                )
+            finally:
+                self.num_running -= 1
+                self.queue.task_done()
+
+    async def run(self, key: Hashable) -> None:
+        now = utc_now()
+
+        # Only a job that's due (not already running or waiting to be retried) can be claimed.
+        #   The job is left as it was otherwise, so if this process stops or the lease runs out
+        #   before it finishes, the next claim sees the same job
+        job = await self.collection.find_one_and_update(
+            {
+                "_id": key,
+                "available_at": {"$lte": now},
+                "failed_at": {"$exists": False},
+            },
+            {
+                "$set": {"available_at": now + timedelta(seconds=LEASE_SECONDS)},
+                "$inc": {"attempts": 1},
+            },
+            return_document=ReturnDocument.AFTER,
+        )
+        if job is None:
+            return
+
+        attempts = job["attempts"]
+        try:
+            await self.handler(self.db, key, job["since"])
+        except Exception:
+            logger.exception(
+                "Work queue %s job %s failed (attempt %d)",
+                self.collection_name,
+                key,
+                attempts,
+            )
+
+            if attempts >= MAX_ATTEMPTS:
+                # Due again as soon as it's enqueued again
+                update = {"failed_at": utc_now(), "available_at": utc_now()}
+                self.num_failed += 1
+            else:
+                retry_delay = RETRY_DELAY_SECONDS * 2 ** (attempts - 1)
+                update = {"available_at": utc_now() + timedelta(seconds=retry_delay)}
+                self.num_retries += 1
+
+            await self.collection.update_one({"_id": key}, {"$set": update})
+            return
+
+        self.num_runs += 1
+        self.latencies.append((utc_now() - job.get("enqueued_at", now)).total_seconds())
+
+        # Remove the job unless it was enqueued again while it ran. The new run is timed from
+        #   when this one was claimed, since it was enqueued again some time after that
+        result = await self.collection.delete_one(
+            {"_id": key, "version": job["version"]}
+        )
+        if result.deleted_count == 0:
+            await self.collection.update_one(
+                {"_id": key},
+                {
+                    "$set": {
+                        "available_at": utc_now(),
+                        "attempts": 0,
+                        "enqueued_at": now,
+                    }
+                },
+            )
+            await self.put(key)
+
+    # Queue the jobs that are due but aren't queued in this process: ones left over
+    #   from a restart, ones whose lease expired and ones waiting to be retried
+    async def poll(self) -> None:
+        while True:
+            try:
+                async for job in self.collection.find(
+                    {
+                        "available_at": {"$lte": utc_now()},
+                        "failed_at": {"$exists": False},
+                    },
+                    {"_id": 1},
+                ).limit(self.max_queued):
+                    await self.put(job["_id"])
+            except Exception:
+                logger.exception("Failed to poll work queue %s", self.collection_name)
+
+            await asyncio.sleep(POLL_INTERVAL_SECONDS)
+
+    def stats(self) -> dict[str, int | float | None]:
+        latencies = sorted(self.latencies)
+
+        def percentile(fraction: float) -> float | None:
+            if not latencies:
+                return None
+            return latencies[min(len(latencies) - 1, int(fraction * len(latencies)))]
+
+        return {
+            "depth": self.queue.qsize() if self.queue is not None else 0,
+            "running": self.num_running,
+            "workers": self.num_workers,
+            "requested": self.num_requested,
+            "runs": self.num_runs,
+            # Jobs requested per run, above 1 when jobs for the same key were coalesced
+            "coalescing_ratio": (
+                self.num_requested / self.num_runs if self.num_runs else None
+            ),
+            "retries": self.num_retries,
+            "failed": self.num_failed,
+            # Seconds from a job being enqueued to it finishing
+            "latency_p50": percentile(0.5),
+            "latency_p95": percentile(0.95),
+            "latency_max": latencies[-1] if latencies else None,
+        }
+
+
+async def start_work_queues(db: AsyncIOMotorDatabase) -> None:
+    for work_queue in work_queues:
+        await work_queue.start(db)
+
+
+async def stop_work_queues() -> None:
+    for work_queue in work_queues:
+        await work_queue.stop()
@@ -0,0 +1,249 @@
+import asyncio
+import logging
+import time
+from typing import Any, Hashable
+
+from motor.motor_asyncio import AsyncIOMotorCollection, AsyncIOMotorDatabase
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FLUSH_INTERVAL_SECONDS = 1.0
+# Flush early once this many documents have pending updates
+DEFAULT_MAX_PENDING = 500
+# A document's updates are dropped once they've failed to write this many flushes in a row,
+#   e.g. if they can never be applied to the document
+MAX_FLUSH_ATTEMPTS = 5
+
+# Every buffer created, so the app can start and drain them with the database
+write_behind_buffers: list["WriteBehindBuffer"] = []
+
+
+# Merge an update into the pending update for the same document.
+#   Counters add up, $min/$max keep the extreme, $set keeps the latest, $setOnInsert keeps
+#   the first, $unset removes every field either removes, and $push appends to the pending
+#   items (keeping the latest $sort and $slice)
+def merge_update(pending: dict, update: dict) -> None:
+    for operator, fields in update.items():
+        pending_fields = pending.setdefault(operator, {})
+
+        for field, value in fields.items():
+            if operator == "$inc":
+                pending_fields[field] = pending_fields.get(field, 0) + value
+            elif operator == "$min":
+                pending_fields[field] = min(pending_fields.get(field, value), value)
+            elif operator == "$max":
+                pending_fields[field] = max(pending_fields.get(field, value), value)
+            elif operator == "$set":
+                pending_fields[field] = value
+            elif operator == "$setOnInsert":
+                pending_fields.setdefault(field, value)
+            elif operator == "$unset":
+                pending_fields[field] = ""
+            elif operator == "$push":
+                if not isinstance(value, dict) or "$each" not in value:
+                    value = {"$each": [value]}
+                pending_push = pending_fields.setdefault(field, {"$each": []})
+                pending_push["$each"].extend(value["$each"])
+                pending_push.update(
+                    {
+                        modifier: v
+                        for modifier, v in value.items()
+                        if modifier != "$each"
+                    }
+                )
+            else:
+                raise ValueError(f"Can't merge {operator} updates")
+
+
+# Buffers updates to the documents of a collection and writes them behind, merging the updates
+#   to each document and flushing them every flush interval (or once max_pending documents have
+#   updates) as one unordered bulk write. Updates still buffered are lost if the process dies,
+#   so only use it for data that can be rebuilt, e.g. statistics
+class WriteBehindBuffer:
+    def __init__(
+        self,
+        collection_name: str,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL_SECONDS,
+        max_pending: int = DEFAULT_MAX_PENDING,
+    ):
+        self.collection_name = collection_name
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+
+        self.db: AsyncIOMotorDatabase | None = None
+        # Maps each document's _id to its merged update
+        self.pending: dict[Hashable, dict] = {}
+        # Flushes in a row that each document's pending update has failed to write
+        self.failed_attempts: dict[Hashable, int] = {}
+        self.flush_requested = asyncio.Event()
+        # Held while a flush is writing, so flushes and pulls happen one at a time
+        self.flush_lock = asyncio.Lock()
+        self.stopping = False
+        self.task: asyncio.Task | None = None
+
+        self.num_updates = 0
+        self.num_documents_written = 0
+        self.num_flushes = 0
+        self.num_failed_writes = 0
+        self.num_dropped = 0
+        self.last_flush_seconds: float | None = None
+
+        write_behind_buffers.append(self)
+
+    @property
+    def collection(self) -> AsyncIOMotorCollection:
+        return self.db.get_collection(self.collection_name)
+
+    # Buffer an update to the document with the _id, creating the document if it doesn't exist
+    def update(self, document_id: Hashable, update: dict[str, Any]) -> None:
+        merge_update(self.pending.setdefault(document_id, {}), update)
+        self.num_updates += 1
+
+        if len(self.pending) >= self.max_pending:
+            self.flush_requested.set()
+
+    # Write the buffered updates. Waits for a flush already writing to finish first
+    async def flush(self) -> None:
+        async with self.flush_lock:
+            await self._flush()
+
+    async def _flush(self) -> None:
+        if not self.pending:
+            return
+
+        batch, self.pending = self.pending, {}
+        document_ids = list(batch)
+        start = time.perf_counter()
+
+        try:
+            await self.collection.bulk_write(
+                [
+                    UpdateOne({"_id": document_id}, batch[document_id], upsert=True)
+                    for document_id in document_ids
+                ],
+                ordered=False,
+            )
+            failed_ids = set()
+        except BulkWriteError as exception:
+            write_errors = exception.details["writeErrors"]
+            logger.warning(
+                "Failed to write %d updates to %s, e.g. %s",
+                len(write_errors),
+                self.collection_name,
+                write_errors[0].get("errmsg"),
+            )
+            failed_ids = {document_ids[error["index"]] for error in write_errors}
+        except Exception:
+            # None of the batch is known to have been written
+            logger.exception("Failed to flush %s", self.collection_name)
+            failed_ids = set(document_ids)
+
+        for document_id in document_ids:
+            if document_id not in failed_ids:
+                self.failed_attempts.pop(document_id, None)
+
+        for document_id in failed_ids:
+            update = batch[document_id]
+            if document_id in self.pending:
+                merge_update(update, self.pending[document_id])
+
+            attempts = self.failed_attempts.get(document_id, 0) + 1
+            if attempts >= MAX_FLUSH_ATTEMPTS:
+                logger.error(
+                    "Dropped the update to %s %s after %d failed writes: %s",
+                    self.collection_name,
+                    document_id,
+                    attempts,
+                    update,
+                )
+                self.pending.pop(document_id, None)
+                self.failed_attempts.pop(document_id, None)
+                self.num_dropped += 1
+            else:
+                # Put the update back in front of any buffered since, to be retried next flush
+                self.pending[document_id] = update
+                self.failed_attempts[document_id] = attempts
+
+        self.num_flushes += 1
+        self.num_documents_written += len(document_ids) - len(failed_ids)
+        self.num_failed_writes += len(failed_ids)
+        self.last_flush_seconds = time.perf_counter() - start
+
+    # Remove the items matching the condition from an array field of the document. Items still
+    #   buffered in a $push are dropped before they're written. Otherwise the items are pulled
+    #   from the document once any flush that may be writing them has finished
+    async def pull(
+        self, document_id: Hashable, field: str, condition: dict[str, Any]
+    ) -> None:
+        def matches(item: Any) -> bool:
+            return isinstance(item, dict) and all(
+                item.get(key) == value for key, value in condition.items()
+            )
+
+        async with self.flush_lock:
+            push = self.pending.get(document_id, {}).get("$push", {}).get(field)
+            if push is not None:
+                buffered_items = push["$each"]
+                push["$each"] = [item for item in buffered_items if not matches(item)]
+                if len(push["$each"]) < len(buffered_items):
+                    return
+
+            await self.collection.update_one(
+                {"_id": document_id}, {"$pull": {field: condition}}
+            )
+
+    async def run(self) -> None:
+        while not self.stopping:
+            try:
+                await asyncio.wait_for(
+                    self.flush_requested.wait(), timeout=self.flush_interval
+                )
+            except asyncio.TimeoutError:
+                pass
+
+            self.flush_requested.clear()
+            await self.flush()
+
+    def start(self, db: AsyncIOMotorDatabase) -> None:
+        self.db = db
+        self.stopping = False
+        self.task = asyncio.create_task(self.run())
+
+    # Stop flushing on an interval, then write everything still buffered
+    async def drain(self) -> None:
+        if self.task is not None:
+            self.stopping = True
+            self.flush_requested.set()
+            await self.task
+            self.task = None
+
+        await self.flush()
+
+    def stats(self) -> dict[str, int | float | None]:
+        return {
+            "pending": len(self.pending),
+            "updates": self.num_updates,
+            "flushes": self.num_flushes,
+            "documents_written": self.num_documents_written,
+            # Updates per document written, above 1 when updates to a document were merged
+            "merge_ratio": (
+                self.num_updates / self.num_documents_written
+                if self.num_documents_written
+                else None
+            ),
+            "failed_writes": self.num_failed_writes,
+            "dropped": self.num_dropped,
+            "last_flush_seconds": self.last_flush_seconds,
+        }
+
+
+def start_write_behind_buffers(db: AsyncIOMotorDatabase) -> None:
+    for buffer in write_behind_buffers:
+        buffer.start(db)
+
+
+async def drain_write_behind_buffers() -> None:
+    for buffer in write_behind_buffers:
+        await buffer.drain()
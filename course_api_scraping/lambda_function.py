@@ -1,5 +1,7 @@
 import logging
 import os
+import re
+from datetime import datetime, timezone
 
 import requests
 from bson import ObjectId
@@ -94,6 +96,23 @@ def get_courses_for_course_names(course_names: list[str]) -> list[dict]:
     return all_courses
 
 
+# Parse a "latitude, longitude" string into a GeoJSON point, or None if it isn't valid
+def parse_coordinates(coordinates: str | None) -> dict | None:
+    if not coordinates:
+        return None
+
+    numbers = re.findall(r"-?\d+(?:\.\d+)?", coordinates)
+    if len(numbers) != 2:
+        return None
+
+    latitude, longitude = float(numbers[0]), float(numbers[1])
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return None
+
+    # GeoJSON puts the longitude first
+    return {"type": "Point", "coordinates": [longitude, latitude]}
+
+
 def sanitize_course(course: dict) -> dict:
 
     if "__v" in course:
@@ -169,7 +188,10 @@ def sanitize_course(course: dict) -> dict:
                     if "color" in value:
                         value["color"] = value["color"].title().strip()
 
-    course["rounds"] = []
+    # Stored as a GeoJSON point too so courses can be searched by location
+    location = parse_coordinates(course.get("coordinates"))
+    if location is not None:
+        course["location"] = location
 
     return course
 
@@ -180,10 +202,11 @@ def upload_courses_to_mongodb(courses: list[dict]):
 
     for course in courses:
         # Add the current course to the courses collection,
-        #   overriding the existing document if it already exists
+        #   overriding the existing document if it already exists.
+        #   synced_at lets the API pick up new and changed courses
         courses_collection.update_one(
             {"_id": course["_id"]},
-            {"$set": course},
+            {"$set": {**course, "synced_at": datetime.now(tz=timezone.utc)}},
             upsert=True,
         )
 
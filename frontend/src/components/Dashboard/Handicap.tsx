@@ -1,14 +1,15 @@
 import Col from "react-bootstrap/Col";
 
-import { callGetUserApi, HandicapData } from "../../utils/users/users";
+import { HandicapData } from "../../utils/users/users";
 import HandicapChart from "./HandicapChart";
 
 interface HandicapProps {
+  userId: string;
   handicapData: HandicapData[];
   numRounds: number;
 }
 
-function Handicap({ handicapData, numRounds }: HandicapProps) {
+function Handicap({ userId, handicapData, numRounds }: HandicapProps) {
   const remainingRounds = 3 - numRounds;
   if (handicapData.length === 0) {
     return (
@@ -26,7 +27,7 @@ function Handicap({ handicapData, numRounds }: HandicapProps) {
         {handicapData[handicapData.length - 1].handicap.toFixed(2)}
       </h2>
       <Col md={6}>
-        <HandicapChart handicapData={handicapData} />
+        <HandicapChart userId={userId} />
       </Col>
     </>
   );
@@ -1,3 +1,4 @@
+import { useEffect, useState } from "react";
 import {
   CartesianGrid,
   Line,
@@ -8,10 +9,16 @@ import {
   YAxis,
 } from "recharts";
 
-import { HandicapData } from "../../utils/users/users";
+import {
+  callGetHandicapHistoryApi,
+  HandicapData,
+} from "../../utils/users/users";
+
+// The API downsamples the user's history to at most this many points
+const MAX_CHART_POINTS = 100;
 
 interface HandicapChartProps {
-  handicapData: HandicapData[];
+  userId: string;
 }
 
 // Format timestamps into "MM/DD"
@@ -22,7 +29,19 @@ const formatTime = (time: number) => {
   });
 };
 
-function HandicapChart({ handicapData }: HandicapChartProps) {
+function HandicapChart({ userId }: HandicapChartProps) {
+  const [handicapData, setHandicapData] = useState<HandicapData[]>([]);
+
+  useEffect(() => {
+    const fetchHandicapHistory = async (): Promise<void> => {
+      setHandicapData(
+        await callGetHandicapHistoryApi(userId, MAX_CHART_POINTS)
+      );
+    };
+
+    fetchHandicapHistory();
+  }, [userId]);
+
   // Convert timestamps to numbers for recharts
   const data = handicapData.map((entry) => {
     return {
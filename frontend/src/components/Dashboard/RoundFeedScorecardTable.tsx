@@ -1,13 +1,17 @@
 import Table from "react-bootstrap/Table";
 
-import { Course, Hole } from "../../utils/courses";
-import { RoundScorecard, ScorecardMode } from "../../utils/rounds";
+import { Hole } from "../../utils/courses";
+import {
+  RoundCourse,
+  RoundScorecard,
+  ScorecardMode,
+} from "../../utils/rounds";
 
 interface RoundFeedScorecardTableProps {
   roundScorecard: RoundScorecard;
   scorecardMode: ScorecardMode;
   teeBoxIndex: number;
-  course: Course;
+  course: RoundCourse;
 }
 
 function RoundFeedScorecardTable({
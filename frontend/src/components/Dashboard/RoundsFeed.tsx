@@ -1,11 +1,14 @@
+import Button from "react-bootstrap/Button";
+
 import { Round } from "../../utils/rounds";
 import RoundCard from "./RoundCard";
 
 interface RoundsFeedProps {
   rounds: Round[];
+  onLoadMore?: () => void; // Shown as a "load more" button when given
 }
 
-function RoundsFeed({ rounds }: RoundsFeedProps) {
+function RoundsFeed({ rounds, onLoadMore }: RoundsFeedProps) {
   if (!rounds || rounds.length === 0) {
     return <h4>No rounds posted</h4>;
   }
@@ -16,6 +19,13 @@ function RoundsFeed({ rounds }: RoundsFeedProps) {
       {rounds.map((round) => (
         <RoundCard key={round.id} round={round} />
       ))}
+      {onLoadMore !== undefined && (
+        <div className="d-flex justify-content-center">
+          <Button variant="outline-secondary" onClick={onLoadMore}>
+            Load more rounds
+          </Button>
+        </div>
+      )}
     </div>
   );
 }
@@ -0,0 +1,112 @@
+import { useEffect, useState } from "react";
+import Table from "react-bootstrap/Table";
+
+import { callGetUserStatsApi, UserStats } from "../../utils/users/users";
+
+const SCORE_NAMES: Record<string, string> = {
+  eagle_or_better: "Eagle or better",
+  birdie: "Birdie",
+  par: "Par",
+  bogey: "Bogey",
+  double_bogey: "Double bogey",
+  triple_or_worse: "Triple or worse",
+};
+
+interface ScoringStatsProps {
+  userId: string;
+}
+
+function formatToPar(toPar: number): string {
+  return `${toPar >= 0 ? "+" : ""}${toPar.toFixed(1)}`;
+}
+
+function ScoringStats({ userId }: ScoringStatsProps) {
+  const [stats, setStats] = useState<UserStats | null>(null);
+
+  useEffect(() => {
+    const fetchStats = async (): Promise<void> => {
+      setStats(await callGetUserStatsApi(userId));
+    };
+
+    fetchStats();
+  }, [userId]);
+
+  if (stats === null || stats.num_rounds === 0) {
+    return null;
+  }
+
+  const numHolesPlayed = Object.values(stats.score_distribution).reduce(
+    (total, count) => total + count,
+    0
+  );
+
+  return (
+    <>
+      <h4 className="mt-3">Scoring</h4>
+      <Table responsive bordered size="sm">
+        <thead>
+          <tr>
+            <th>Rounds</th>
+            <th className="text-center">Played</th>
+            <th className="text-center">Scoring average</th>
+            <th className="text-center">To par</th>
+          </tr>
+        </thead>
+        <tbody>
+          {Object.entries(stats.scoring).map(([numHoles, scoring]) => (
+            <tr key={numHoles}>
+              <td>{numHoles} holes</td>
+              <td className="text-center">{scoring.num_rounds}</td>
+              <td className="text-center">
+                {scoring.scoring_average.toFixed(1)}
+              </td>
+              <td className="text-center">
+                {formatToPar(scoring.average_to_par)}
+              </td>
+            </tr>
+          ))}
+          {stats.par_types.map((parType) => (
+            <tr key={parType.par}>
+              <td>Par {parType.par}s</td>
+              <td className="text-center">{parType.num_holes}</td>
+              <td className="text-center">
+                {parType.scoring_average.toFixed(2)}
+              </td>
+              <td className="text-center">
+                {formatToPar(parType.scoring_average - parType.par)}
+              </td>
+            </tr>
+          ))}
+        </tbody>
+      </Table>
+      {numHolesPlayed > 0 && (
+        <Table responsive bordered size="sm">
+          <thead>
+            <tr>
+              {Object.values(SCORE_NAMES).map((scoreName) => (
+                <th key={scoreName} className="text-center">
+                  {scoreName}
+                </th>
+              ))}
+            </tr>
+          </thead>
+          <tbody>
+            <tr>
+              {Object.keys(SCORE_NAMES).map((scoreName) => (
+                <td key={scoreName} className="text-center">
+                  {(
+                    (100 * stats.score_distribution[scoreName]) /
+                    numHolesPlayed
+                  ).toFixed(1)}
+                  %
+                </td>
+              ))}
+            </tr>
+          </tbody>
+        </Table>
+      )}
+    </>
+  );
+}
+
+export default ScoringStats;
@@ -1,7 +1,7 @@
-import { constructLocation, Course } from "../../utils/courses";
+import { constructLocation, CourseSuggestion } from "../../utils/courses";
 
 interface CourseCardProps {
-  course: Course;
+  course: CourseSuggestion;
 }
 
 function CourseCard({ course }: CourseCardProps) {
@@ -1,11 +1,21 @@
-import { useState } from "react";
+import { useEffect, useState } from "react";
 import Form from "react-bootstrap/Form";
 import Spinner from "react-bootstrap/Spinner";
 
 import { Status } from "../../pages/PostRound";
-import { Course, searchCourses } from "../../utils/courses";
+import {
+  autocompleteCourses,
+  Course,
+  CourseSuggestion,
+  getCourse,
+  searchCourses,
+} from "../../utils/courses";
 import ResultsDropdown from "./ResultsDropdown";
 
+// Wait for a pause in typing before fetching suggestions
+const AUTOCOMPLETE_DELAY_MS = 150;
+const MIN_AUTOCOMPLETE_LENGTH = 2;
+
 interface CourseSearchBarProps {
   status: Status;
   setStatus: (newStatus: Status) => void;
@@ -18,10 +28,36 @@ function CourseSearchBar({
   handleSelectResult,
 }: CourseSearchBarProps) {
   const [currentSearchTerm, setCurrentSearchTerm] = useState("");
-  const [results, setResults] = useState<Course[] | null>(null);
+  const [results, setResults] = useState<CourseSuggestion[] | null>(null);
   const [showResultsDropdown, setShowResultsDropdown] =
     useState<boolean>(false);
   const [submittedSearchTerm, setSubmittedSearchTerm] = useState<string>("");
+  // Cursor for the next page of full search results, if there is one
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+
+  useEffect(() => {
+    const term = currentSearchTerm.trim();
+    if (term.length < MIN_AUTOCOMPLETE_LENGTH) {
+      return;
+    }
+
+    // Ignore suggestions for a term that has since changed
+    let cancelled = false;
+    const timeout = setTimeout(async () => {
+      const suggestions = await autocompleteCourses(term);
+      if (!cancelled) {
+        setResults(suggestions);
+        setNextCursor(null);
+        setSubmittedSearchTerm(term);
+        setShowResultsDropdown(true);
+      }
+    }, AUTOCOMPLETE_DELAY_MS);
+
+    return () => {
+      cancelled = true;
+      clearTimeout(timeout);
+    };
+  }, [currentSearchTerm]);
 
   async function handleSearchSubmit(term: string): Promise<void> {
     if (term.trim() === "") {
@@ -30,13 +66,23 @@ function CourseSearchBar({
       return;
     }
     setStatus("loading-results");
-    const results = await searchCourses(term);
+    const page = await searchCourses(term);
     setStatus("none");
-    setResults(results);
+    setResults(page.courses);
+    setNextCursor(page.next_cursor);
     setSubmittedSearchTerm(term);
     setShowResultsDropdown(true);
   }
 
+  async function handleLoadMore(): Promise<void> {
+    if (nextCursor === null) {
+      return;
+    }
+    const page = await searchCourses(submittedSearchTerm, nextCursor);
+    setResults([...(results ?? []), ...page.courses]);
+    setNextCursor(page.next_cursor);
+  }
+
   function handleEnterKeyDown(event: React.KeyboardEvent<HTMLInputElement>) {
     if (event.key === "Enter") {
       event.preventDefault(); // Prevent form submission
@@ -45,11 +91,14 @@ function CourseSearchBar({
     }
   }
 
-  function onSelectResult(result: Course) {
+  async function onSelectResult(result: CourseSuggestion) {
     setCurrentSearchTerm("");
     setShowResultsDropdown(false);
-    handleSelectResult(result);
-    console.log(result);
+    // Suggestions only have what's needed to display them, so load the whole course
+    setStatus("loading-results");
+    const course: Course = await getCourse(result.id);
+    setStatus("none");
+    handleSelectResult(course);
   }
 
   return (
@@ -73,6 +122,7 @@ function CourseSearchBar({
           results={results!}
           submittedSearchTerm={submittedSearchTerm}
           onSelectResult={onSelectResult}
+          onLoadMore={nextCursor !== null ? handleLoadMore : undefined}
         />
       )}
     </>
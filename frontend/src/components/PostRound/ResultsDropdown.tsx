@@ -1,13 +1,14 @@
 import Dropdown from "react-bootstrap/Dropdown";
 
-import { Course } from "../../utils/courses";
+import { CourseSuggestion } from "../../utils/courses";
 import CourseCard from "./CourseCard";
 
 interface ResultsDropdownProps {
   show: boolean;
-  results: Course[] | null;
+  results: CourseSuggestion[] | null;
   submittedSearchTerm: string;
-  onSelectResult: (result: Course) => void;
+  onSelectResult: (result: CourseSuggestion) => void;
+  onLoadMore?: () => void; // Shown as a "more results" item when given
 }
 
 function ResultsDropdown({
@@ -15,6 +16,7 @@ function ResultsDropdown({
   results,
   submittedSearchTerm,
   onSelectResult,
+  onLoadMore,
 }: ResultsDropdownProps) {
   return (
     <Dropdown.Menu
@@ -38,6 +40,17 @@ function ResultsDropdown({
       ) : (
         <div className="m-1 text-center text-muted">No results found</div>
       )}
+      {onLoadMore !== undefined && (
+        <Dropdown.Item
+          className="text-center text-muted"
+          onMouseDown={(event) => {
+            event.preventDefault(); // Keep the search bar focused
+            onLoadMore();
+          }}
+        >
+          Show more results
+        </Dropdown.Item>
+      )}
     </Dropdown.Menu>
   );
 }
@@ -3,8 +3,9 @@ import Container from "react-bootstrap/Container";
 
 import Handicap from "../components/Dashboard/Handicap";
 import RoundsFeed from "../components/Dashboard/RoundsFeed";
+import ScoringStats from "../components/Dashboard/ScoringStats";
 import ForeNavbar from "../components/ForeNavbar";
-import { callGetRoundsApi, Round } from "../utils/rounds";
+import { callGetUserRoundsApi, Round } from "../utils/rounds";
 import {
   callGetUserApi,
   getUserData,
@@ -16,6 +17,9 @@ function Dashboard() {
   const [handicapData, setHandicapData] = useState<HandicapData[] | null>(null);
 
   const [rounds, setRounds] = useState<Round[]>([]);
+  const [numRounds, setNumRounds] = useState<number>(0);
+  // Cursor for the next page of rounds, if there is one
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
 
   // TODO: use something better than useEffect for fetching
   useEffect(() => {
@@ -23,27 +27,32 @@ function Dashboard() {
       return await callGetUserApi(userId);
     };
 
-    const fetchUserRounds = async (roundIds: string[]): Promise<Round[]> => {
-      if (!roundIds || roundIds.length === 0) {
-        return [];
-      }
-      return await callGetRoundsApi(roundIds, true);
-    };
-
     const fetchData = async (): Promise<void> => {
       const userId = getUserData().id;
 
       const user = await fetchUser(userId);
 
       setHandicapData(user.handicap_data);
+      setNumRounds(user.rounds.length);
 
-      const rounds = await fetchUserRounds(user.rounds);
-      setRounds(rounds);
+      // The most recent rounds, with more loaded as they're asked for
+      const page = await callGetUserRoundsApi(userId);
+      setRounds(page.rounds);
+      setNextCursor(page.next_cursor);
     };
 
     fetchData();
   }, []);
 
+  async function handleLoadMoreRounds(): Promise<void> {
+    if (nextCursor === null) {
+      return;
+    }
+    const page = await callGetUserRoundsApi(getUserData().id, nextCursor);
+    setRounds([...rounds, ...page.rounds]);
+    setNextCursor(page.next_cursor);
+  }
+
   return (
     <>
       <ForeNavbar pageName="Main" />
@@ -51,8 +60,16 @@ function Dashboard() {
         <h1 className="mb-3">Dashboard</h1>
         {handicapData && (
           <>
-            <Handicap handicapData={handicapData} numRounds={rounds.length} />{" "}
-            <RoundsFeed rounds={rounds} />
+            <Handicap
+              userId={getUserData().id}
+              handicapData={handicapData}
+              numRounds={numRounds}
+            />{" "}
+            <ScoringStats userId={getUserData().id} />
+            <RoundsFeed
+              rounds={rounds}
+              onLoadMore={nextCursor !== null ? handleLoadMoreRounds : undefined}
+            />
           </>
         )}
       </Container>
@@ -42,14 +42,35 @@ export type Course = {
   zip: string;
 };
 
+// Just enough of a course to show it as a search suggestion
+export type CourseSuggestion = Pick<
+  Course,
+  "id" | "name" | "city" | "state" | "country"
+>;
+
+// What list views show of a course
+export type CourseSummary = CourseSuggestion & {
+  num_holes: number;
+  par: number | null;
+  tee_names: string[];
+};
+
+export type CourseSearchPage = {
+  courses: CourseSummary[];
+  next_cursor: string | null;
+};
+
 const API_URL = getApiUrl();
 
-export async function searchCourses(courseName: string): Promise<Course[]> {
+export async function searchCourses(
+  courseName: string,
+  cursor: string | null = null
+): Promise<CourseSearchPage> {
   const endpoint: string = "courses/search";
 
   const url: string = `${API_URL}/${endpoint}`;
 
-  const request = { name: courseName };
+  const request = { name: courseName, cursor: cursor };
 
   try {
     const response: Response = await fetch(url, {
@@ -61,14 +82,59 @@ export async function searchCourses(courseName: string): Promise<Course[]> {
     });
 
     const results = await response.json();
-    return results as Course[];
+    return results as CourseSearchPage;
   } catch (error) {
     //alert("Error occured while calling register API: " + error);
     throw error;
   }
 }
 
-export function constructLocation(course: Course): string {
+export async function autocompleteCourses(
+  query: string
+): Promise<CourseSuggestion[]> {
+  const endpoint: string = "courses/autocomplete";
+
+  const params = new URLSearchParams();
+  params.append("q", query);
+
+  const url: string = `${API_URL}/${endpoint}?${params.toString()}`;
+
+  try {
+    const response: Response = await fetch(url, {
+      method: "GET",
+      headers: {
+        "Content-Type": "application/json",
+      },
+    });
+
+    const results = await response.json();
+    return results as CourseSuggestion[];
+  } catch (error) {
+    throw error;
+  }
+}
+
+export async function getCourse(courseId: string): Promise<Course> {
+  const endpoint: string = `courses/${courseId}`;
+
+  const url: string = `${API_URL}/${endpoint}`;
+
+  try {
+    const response: Response = await fetch(url, {
+      method: "GET",
+      headers: {
+        "Content-Type": "application/json",
+      },
+    });
+
+    const course = await response.json();
+    return course as Course;
+  } catch (error) {
+    throw error;
+  }
+}
+
+export function constructLocation(course: CourseSuggestion): string {
   let location: string = "";
 
   if (course.city !== "" && course.city != null) {
@@ -7,6 +7,13 @@ export type ScorecardMode = "all-holes" | "front-and-back" | "total-score";
 
 export type RoundScorecard = Record<string, number>;
 
+// The fields of a course shown alongside a round. Holes only include
+//   the tee the round was played from
+export type RoundCourse = Pick<
+  Course,
+  "id" | "name" | "num_holes" | "length_format" | "par" | "scorecard" | "tee_boxes"
+>;
+
 export type Round = {
   id: string;
   user_id: string;
@@ -17,7 +24,12 @@ export type Round = {
   scorecard: RoundScorecard;
   score_differential: number;
   date_posted: Date;
-  course?: Course;
+  course?: RoundCourse;
+};
+
+export type UserRoundsPage = {
+  rounds: Round[];
+  next_cursor: string | null;
 };
 
 export async function postRound(
@@ -88,3 +100,33 @@ export async function callGetRoundsApi(
     throw error;
   }
 }
+
+export async function callGetUserRoundsApi(
+  userId: string,
+  before: string | null = null
+): Promise<UserRoundsPage> {
+  const endpoint: string = `users/${userId}/rounds`;
+
+  const params = new URLSearchParams();
+  if (before !== null) {
+    params.append("before", before);
+  }
+
+  const url: string = `${API_URL}/${endpoint}?${params.toString()}`;
+
+  try {
+    const response: Response = await fetch(url, {
+      method: "GET",
+      headers: {
+        "Content-Type": "application/json",
+      },
+    });
+
+    const body = await response.json();
+
+    return body as UserRoundsPage;
+  } catch (error) {
+    //alert("Error occured while calling register API: " + error);
+    throw error;
+  }
+}
@@ -64,3 +64,70 @@ export async function callGetUserApi(userId: string): Promise<User> {
     throw error;
   }
 }
+
+export async function callGetHandicapHistoryApi(
+  userId: string,
+  points: number
+): Promise<HandicapData[]> {
+  const endpoint: string = `users/${userId}/handicap-history`;
+
+  const params = new URLSearchParams();
+  params.append("points", points.toString());
+
+  const url: string = `${API_URL}/${endpoint}?${params.toString()}`;
+
+  try {
+    const response: Response = await fetch(url, {
+      method: "GET",
+      headers: {
+        "Content-Type": "application/json",
+      },
+    });
+
+    const body = await response.json();
+    return body as HandicapData[];
+  } catch (error) {
+    //alert("Error occured while calling register API: " + error);
+    throw error;
+  }
+}
+
+export type ScoringStats = {
+  num_rounds: number;
+  scoring_average: number;
+  average_to_par: number;
+};
+
+export type ParTypeStats = {
+  par: number;
+  num_holes: number;
+  scoring_average: number;
+};
+
+export type UserStats = {
+  num_rounds: number;
+  // Keyed by the number of holes in the round
+  scoring: Record<string, ScoringStats>;
+  par_types: ParTypeStats[];
+  score_distribution: Record<string, number>;
+};
+
+export async function callGetUserStatsApi(userId: string): Promise<UserStats> {
+  const endpoint: string = `users/${userId}/stats`;
+
+  const url: string = `${API_URL}/${endpoint}`;
+
+  try {
+    const response: Response = await fetch(url, {
+      method: "GET",
+      headers: {
+        "Content-Type": "application/json",
+      },
+    });
+
+    const body = await response.json();
+    return body as UserStats;
+  } catch (error) {
+    throw error;
+  }
+}